@@ -20,6 +20,7 @@ from middleware.api_quota import APIQuotaMiddleware
 from middleware.asgi_logger import AccessLoggerMiddleware
 from middleware.server_timing import ServerTimingMiddleware
 from util.cache import Cache
+from util.global_cache import global_block_cache
 from util.set_proc_title import set_proc_title
 from .address_routes import address_staking_route, address_delegated_route, address_program_id_route
 from .execute_routes import preview_finalize_route
@@ -61,6 +62,7 @@ async def status_route(request: Request):
         "latest_block_timestamp": latest_block_timestamp,
         "node_height": node_height,
         "reference_height": reference_height,
+        "block_cache": global_block_cache.stats(),
     }
     return JSONResponse(res)
 
@@ -90,6 +92,7 @@ async def startup():
                   redis_password=os.environ.get("REDIS_PASS"),
                   message_callback=noop)
     await db.connect()
+    await db.load_mapping_registry()
     app.state.db = db
     app.state.program_cache = Cache()
     app.state.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=1))
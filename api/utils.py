@@ -58,10 +58,10 @@ async def parse_history_params(db: Database, height_param: Optional[str], time_p
             height = int(height_param)
         except ValueError:
             return JSONResponse({"error": "Invalid height"}, status_code=400)
-        block = await db.get_block_by_height(height)
-        if block is None:
+        header = await db.get_block_header_by_height(height)
+        if header is None:
             return JSONResponse({"error": "Invalid height"}, status_code=400)
-        block_timestamp = block.header.metadata.timestamp
+        block_timestamp = header.metadata.timestamp
     elif time_param is not None:
         try:
             timestamp = int(time_param)
@@ -70,18 +70,18 @@ async def parse_history_params(db: Database, height_param: Optional[str], time_p
                 timestamp = int(datetime.datetime.fromisoformat(time_param).timestamp())
             except ValueError:
                 return JSONResponse({"error": "Invalid time"}, status_code=400)
-        block = await db.get_block_from_timestamp(timestamp)
-        if block is None:
+        header = await db.get_block_header_from_timestamp(timestamp)
+        if header is None:
             return JSONResponse({"error": "No block found for the specified time"}, status_code=404)
-        height = block.height
-        block_timestamp = block.header.metadata.timestamp
+        height = header.metadata.height
+        block_timestamp = header.metadata.timestamp
     else:
         height = await db.get_latest_height()
         if height is None:
             return JSONResponse({"error": "Database uninitialized"}, status_code=500)
-        block = await db.get_block_by_height(height)
-        if block is None:
+        header = await db.get_block_header_by_height(height)
+        if header is None:
             return JSONResponse({"error": "Database uninitialized"}, status_code=500)
-        block_timestamp = block.header.metadata.timestamp
+        block_timestamp = header.metadata.timestamp
 
-    return height, block, block_timestamp
\ No newline at end of file
+    return height, header, block_timestamp
\ No newline at end of file
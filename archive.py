@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import decimal
+import os
+import time
+
+from dotenv import load_dotenv
+
+from aleo_types import Block
+from explorer import Explorer
+from explorer.types import Message
+from util.block_archive import read_archive_path, write_raw_block
+from util.set_proc_title import set_proc_title
+
+load_dotenv()
+
+
+async def print_messages(e: Explorer):
+    while True:
+        msg = await e.message_queue.get()
+        match msg.type:
+            case Message.Type.DatabaseConnectError:
+                print("database connect error:", msg.data)
+            case Message.Type.DatabaseError:
+                print("database error:", msg.data)
+            case _:
+                pass
+
+
+async def import_batch(e: Explorer, blocks: list[Block]):
+    height = blocks[-1].header.metadata.height
+    await e.add_blocks(blocks)
+    if e.latest_height != height:
+        raise ValueError(f"failed to import blocks {blocks[0].header.metadata.height} to {height}")
+
+
+async def import_blocks(e: Explorer, paths: list[str], batch_blocks: int):
+    start_time = time.monotonic()
+    imported = 0
+    batch: list[Block] = []
+    next_height = e.latest_height + 1
+    for path in paths:
+        for block in read_archive_path(path):
+            height = block.header.metadata.height
+            if height < next_height:
+                continue
+            if height != next_height:
+                raise ValueError(f"missing blocks between {next_height - 1} and {height}")
+            batch.append(block)
+            next_height += 1
+            if len(batch) >= batch_blocks:
+                await import_batch(e, batch)
+                imported += len(batch)
+                batch = []
+    if batch:
+        await import_batch(e, batch)
+        imported += len(batch)
+    elapsed = time.monotonic() - start_time
+    print(f"imported {imported} blocks in {elapsed:.1f}s, latest height: {e.latest_height}")
+
+
+async def export_blocks(e: Explorer, path: str, start: int, end: int | None, batch_blocks: int):
+    # only exact block bytes are exported, blocks rebuilt from the tables would not import as the same blocks
+    if end is None:
+        end = await e.db.get_latest_height()
+        if end is None:
+            raise ValueError("no block in database")
+    with open(path, "wb") as f:
+        for height in range(start, end + 1, batch_blocks):
+            batch_end = min(height + batch_blocks, end + 1)
+            data = await e.db.get_raw_block_data(height, batch_end)
+            for block_height in range(height, batch_end):
+                if block_height not in data:
+                    raise ValueError(f"block {block_height} has no raw data, fill it with backfill-raw from an archive first")
+                write_raw_block(f, data[block_height])
+    print(f"exported blocks {start} to {end} to {path}")
+
+
+async def backfill_raw_blocks(e: Explorer, paths: list[str], start: int, end: int | None, batch_blocks: int):
+    # raw blocks are read as the exact block bytes, so they only come from archives and never from the tables
+    start_time = time.monotonic()
+    saved = 0
+    batch: list[Block] = []
+    for path in paths:
+        for block in read_archive_path(path):
+            if block.header.metadata.height < start or (end is not None and block.header.metadata.height > end):
+                continue
+            batch.append(block)
+            if len(batch) >= batch_blocks:
+                saved += await e.db.save_raw_blocks(batch)
+                batch = []
+    if batch:
+        saved += await e.db.save_raw_blocks(batch)
+    elapsed = time.monotonic() - start_time
+    print(f"saved {saved} raw blocks in {elapsed:.1f}s")
+
+
+async def backfill_segments(e: Explorer, paths: list[str], end: int | None, batch_blocks: int):
+    # segments are never rewritten, so only exact block bytes go in: archive files or block_raw rows
+    block_segments = e.db.block_segments
+    if block_segments is None:
+        raise ValueError("BLOCK_SEGMENT_PATH is not set")
+    if end is None:
+        end = await e.db.get_latest_height()
+        if end is None:
+            raise ValueError("no block in database")
+    start_time = time.monotonic()
+    start = block_segments.next_height
+    if paths:
+        batch: list[Block] = []
+        for path in paths:
+            for block in read_archive_path(path):
+                if block.height < block_segments.next_height + len(batch) or block.height > end:
+                    continue
+                batch.append(block)
+                if len(batch) >= batch_blocks:
+                    block_segments.append(batch)
+                    batch = []
+                    print(f"appended blocks up to {block_segments.next_height - 1}")
+        if batch:
+            block_segments.append(batch)
+        if block_segments.next_height <= end:
+            raise ValueError(f"block {block_segments.next_height} is not in the archives")
+    else:
+        for height in range(start, end + 1, batch_blocks):
+            batch_end = min(height + batch_blocks, end + 1)
+            data = await e.db.get_raw_block_data(height, batch_end)
+            block_segments.append_raw(sorted(data.items()))
+            if block_segments.next_height != batch_end:
+                raise ValueError(f"block {block_segments.next_height} has no raw data, pass archive files that have it")
+            print(f"appended blocks up to {batch_end - 1}")
+    elapsed = time.monotonic() - start_time
+    print(f"appended blocks {start} to {end} in {elapsed:.1f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Import or export length-prefixed block archives")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="import blocks from archive files or directories")
+    import_parser.add_argument("paths", nargs="+")
+    import_parser.add_argument("--batch", type=int, default=int(os.environ.get("CATCHUP_BATCH_BLOCKS", 50)),
+                               help="blocks committed per database transaction")
+    export_parser = subparsers.add_parser("export", help="export blocks from the raw block store or block segments to an archive file, "
+                                                         "fails on blocks that are only kept in the database tables")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--start", type=int, default=0)
+    export_parser.add_argument("--end", type=int, default=None)
+    export_parser.add_argument("--batch", type=int, default=100)
+    backfill_parser = subparsers.add_parser("backfill-raw", help="fill the raw block store from archive files for blocks already in the database")
+    backfill_parser.add_argument("paths", nargs="+")
+    backfill_parser.add_argument("--start", type=int, default=0)
+    backfill_parser.add_argument("--end", type=int, default=None)
+    backfill_parser.add_argument("--batch", type=int, default=100)
+    segments_parser = subparsers.add_parser("backfill-segments", help="append blocks to the block segment store from the raw block store, "
+                                                                      "stops at blocks that are only kept in the database tables")
+    segments_parser.add_argument("paths", nargs="*", help="take the blocks from archive files instead")
+    segments_parser.add_argument("--end", type=int, default=None)
+    segments_parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    set_proc_title(f"aleo-explorer: archive {args.command}")
+    decimal.getcontext().prec = 80
+    e = Explorer()
+    _ = asyncio.create_task(print_messages(e))
+    if args.command == "import":
+        await e.prepare()
+        await import_blocks(e, args.paths, max(1, args.batch))
+    elif args.command == "export":
+        # only reads from the database, so it can run next to the explorer
+        await e.db.connect()
+        await export_blocks(e, args.path, args.start, args.end, max(1, args.batch))
+    elif args.command == "backfill-raw":
+        # existing raw block rows are skipped, so this can run next to the explorer
+        await e.db.connect()
+        await backfill_raw_blocks(e, args.paths, args.start, args.end, max(1, args.batch))
+    else:
+        # the explorer appends to the same index, stop it first
+        await e.db.connect()
+        await backfill_segments(e, args.paths, args.end, max(1, args.batch))
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -3,6 +3,9 @@ from __future__ import annotations
 
 import time
 
+import psycopg
+from psycopg.rows import DictRow
+
 from aleo_types import *
 from explorer.types import Message as ExplorerMessage
 from .base import DatabaseBase
@@ -10,6 +13,8 @@ from .base import DatabaseBase
 
 class DatabaseAddress(DatabaseBase):
 
+    network_speed_interval = 900
+
     async def get_puzzle_reward_by_address(self, address: str) -> int:
         data = await self.redis.hget("address_puzzle_reward", address)
         if data is None:
@@ -159,149 +164,129 @@ LIMIT 30
             return None
         return int(data)
 
-    async def get_address_speed(self, address: str) -> tuple[float, int]: # (speed, interval)
-        async with self.pool.connection() as conn:
-            async with conn.cursor() as cur:
-                interval_list = [900, 1800, 3600, 14400, 43200, 86400]
-                now = int(time.time())
-                try:
-                    for interval in interval_list:
-                        await cur.execute(
-                            "SELECT b.height FROM solution s "
-                            "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
-                            "JOIN block b ON ps.block_id = b.id "
-                            "WHERE address = %s AND timestamp > %s",
-                            (address, now - interval)
-                        )
-                        partial_solutions = await cur.fetchall()
-                        if len(partial_solutions) < 10:
-                            continue
-                        heights = list(map(lambda x: x['height'], partial_solutions))
-                        ref_heights = list(map(lambda x: x - 1, set(heights)))
-                        await cur.execute(
-                            "SELECT height, proof_target FROM block WHERE height = ANY(%s::bigint[])", (ref_heights,)
-                        )
-                        ref_proof_targets = await cur.fetchall()
-                        ref_proof_target_dict = dict(map(lambda x: (x['height'], x['proof_target']), ref_proof_targets))
-                        total_solutions = 0
-                        for height in heights:
-                            total_solutions += ref_proof_target_dict[height - 1]
-                        return total_solutions / interval, interval
-                    return 0, 0
-                except Exception as e:
-                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
-                    raise
-
-    async def get_network_speed(self) -> float:
+    async def _get_address_solution_buckets(self, address: str, start: int) -> list[dict[str, Any]]:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
-                interval = 900
                 try:
                     await cur.execute(
-                        "WITH last AS (SELECT timestamp FROM block ORDER BY height DESC LIMIT 1) "
-                        "SELECT b.height FROM solution s "
-                        "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
-                        "JOIN block b ON ps.block_id = b.id "
-                        "WHERE timestamp > (SELECT timestamp FROM last) - %s",
-                        (interval,)
-                    )
-                    partial_solutions = await cur.fetchall()
-                    heights = list(map(lambda x: x['height'], partial_solutions))
-                    ref_heights = list(map(lambda x: x - 1, set(heights)))
-                    await cur.execute(
-                        "SELECT height, proof_target FROM block WHERE height = ANY(%s::bigint[])", (ref_heights,)
+                        "SELECT timestamp, solution_count, work FROM address_solution_bucket "
+                        "WHERE address = %s AND timestamp >= %s",
+                        (address, start)
                     )
-                    ref_proof_targets = await cur.fetchall()
-                    ref_proof_target_dict = dict(map(lambda x: (x['height'], x['proof_target']), ref_proof_targets))
-                    total_solutions = 0
-                    for height in heights:
-                        total_solutions += ref_proof_target_dict[height - 1]
-                    return total_solutions / interval
+                    return await cur.fetchall()
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def get_total_solution_count(self) -> int:
-        async with self.pool.connection() as conn:
-            async with conn.cursor() as cur:
-                try:
-                    await cur.execute("SELECT COUNT(*) FROM solution")
-                    if (res := await cur.fetchone()) is None:
-                        return 0
-                    return res["count"]
-                except Exception as e:
-                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
-                    raise
+    async def get_address_speed_by_interval(self, address: str, interval: int) -> tuple[float, int]: # (speed, solution count)
+        buckets = await self._get_address_solution_buckets(address, int(time.time()) - interval)
+        return sum(int(b["work"]) for b in buckets) / interval, sum(b["solution_count"] for b in buckets)
 
-    async def get_average_solution_reward(self) -> float:
-        async with self.pool.connection() as conn:
-            async with conn.cursor() as cur:
-                try:
-                    await cur.execute(
-                        "SELECT AVG(reward) FROM solution"
-                    )
-                    if (res := await cur.fetchone()) is None:
-                        return 0
-                    if res["avg"] is None:
-                        return 0
-                    return res["avg"]
-                except Exception as e:
-                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
-                    raise
+    async def get_address_speed(self, address: str) -> tuple[float, int]: # (speed, interval)
+        # the shortest interval with at least 10 solutions
+        interval_list = [900, 1800, 3600, 14400, 43200, 86400]
+        now = int(time.time())
+        buckets = await self._get_address_solution_buckets(address, now - interval_list[-1])
+        for interval in interval_list:
+            in_interval = [b for b in buckets if b["timestamp"] >= now - interval]
+            if sum(b["solution_count"] for b in in_interval) < 10:
+                continue
+            return sum(int(b["work"]) for b in in_interval) / interval, interval
+        return 0, 0
 
-    async def get_incentive_address_count(self) -> int:
+    async def get_address_speed_history(self, address: str, start: int, end: int, step: int = 3600) -> list[dict[str, Any]]:
+        # step should be a multiple of the 60 second buckets
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
                     await cur.execute(
-                        "SELECT COUNT(DISTINCT address) FROM solution "
-                        "JOIN puzzle_solution ps ON solution.puzzle_solution_id = ps.id "
-                        "JOIN block b ON ps.block_id = b.id "
-                        "WHERE b.timestamp > 1719849600 AND b.timestamp < 1721059200"
+                        "SELECT timestamp - timestamp %% %s AS timestamp, sum(solution_count) AS solution_count, "
+                        "sum(work) AS work FROM address_solution_bucket "
+                        "WHERE address = %s AND timestamp >= %s AND timestamp < %s "
+                        "GROUP BY 1 ORDER BY 1",
+                        (step, address, start, end)
                     )
-                    if (res := await cur.fetchone()) is None:
-                        return 0
-                    return res["count"]
+                    return [
+                        {"timestamp": row["timestamp"], "solution_count": int(row["solution_count"]),
+                         "speed": int(row["work"]) / step}
+                        for row in await cur.fetchall()
+                    ]
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def get_incentive_addresses(self, start: int, end: int) -> list[dict[str, Any]]:
+    @staticmethod
+    async def _get_network_speed_window(cur: psycopg.AsyncCursor[DictRow]) -> tuple[Optional[DictRow], list[DictRow]]:
+        # the latest block, and the work of each block with solutions in the window before it
+        await cur.execute("SELECT height, timestamp, proof_target FROM block ORDER BY height DESC LIMIT 1")
+        if (latest := await cur.fetchone()) is None:
+            return None, []
+        await cur.execute(
+            "SELECT b.height, b.timestamp, b.partial_solution_count * p.proof_target AS work FROM block b "
+            "JOIN block p ON p.height = b.height - 1 "
+            "WHERE b.timestamp > %s AND b.partial_solution_count > 0",
+            (latest["timestamp"] - DatabaseAddress.network_speed_interval,)
+        )
+        return latest, await cur.fetchall()
+
+    async def get_network_speed(self) -> float:
+        # kept up to date in redis by the explorer, see DatabaseInsert._update_network_speed
+        data = await self.redis.hget("network_speed", "work")
+        if data is not None:
+            return int(data) / self.network_speed_interval
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
-                    await cur.execute(
-                        "SELECT s.address, sum(s.reward) as reward FROM solution s "
-                        "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
-                        "JOIN block b ON ps.block_id = b.id "
-                        "WHERE b.timestamp > 1719849600 AND b.timestamp < 1721059200 "
-                        "GROUP BY s.address "
-                        "ORDER BY reward DESC "
-                        "LIMIT %s OFFSET %s",
-                        (end - start, start)
-                    )
-                    return await cur.fetchall()
+                    _, window = await self._get_network_speed_window(cur)
+                    return sum(int(row["work"]) for row in window) / self.network_speed_interval
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def get_incentive_total_reward(self) -> Decimal:
+    @staticmethod
+    def _solution_stats_names(height: int, timestamp: int) -> list[tuple[str, str]]:
+        # (count, reward) rows in stats that a solution at this block adds to: all time, its epoch and its UTC day
+        names: list[tuple[str, str]] = [("solution_count", "solution_reward")]
+        for period, index in (("epoch", height // 360), ("day", timestamp // 86400)):
+            names.append((f"solution_count:{period}:{index}", f"solution_reward:{period}:{index}"))
+        return names
+
+    async def _get_stats(self, names: list[str]) -> dict[str, int]:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
-                    await cur.execute(
-                        "SELECT sum(reward) FROM solution s "
-                        "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
-                        "JOIN block b ON ps.block_id = b.id "
-                        "WHERE b.timestamp > 1719849600 AND b.timestamp < 1721059200"
-                    )
-                    if (res := await cur.fetchone()) is None:
-                        return Decimal(0)
-                    return res["sum"]
+                    await cur.execute("SELECT name, value FROM stats WHERE name = ANY(%s)", (names,))
+                    return {row["name"]: int(row["value"]) for row in await cur.fetchall()}
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    async def get_total_solution_count(self) -> int:
+        return (await self._get_stats(["solution_count"])).get("solution_count", 0)
+
+    async def get_average_solution_reward(self) -> float:
+        stats = await self._get_stats(["solution_count", "solution_reward"])
+        if not stats.get("solution_count"):
+            return 0
+        return stats.get("solution_reward", 0) / stats["solution_count"]
+
+    async def get_solution_stats(self, period: str, start: int, end: int) -> list[dict[str, int]]:
+        # period is "epoch" (height // 360) or "day" (timestamp // 86400), from start to end exclusive
+        if period not in ("epoch", "day"):
+            raise ValueError("invalid period")
+        names: list[str] = []
+        for index in range(start, end):
+            names += [f"solution_count:{period}:{index}", f"solution_reward:{period}:{index}"]
+        stats = await self._get_stats(names)
+        return [
+            {
+                period: index,
+                "solution_count": stats.get(f"solution_count:{period}:{index}", 0),
+                "reward": stats.get(f"solution_reward:{period}:{index}", 0),
+            }
+            for index in range(start, end)
+        ]
+
     async def get_solution_by_id(self, solution_id: str) -> dict[str, Any] | None:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
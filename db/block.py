@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from collections import defaultdict
 
 import psycopg
@@ -7,13 +8,25 @@ import psycopg.sql
 from psycopg.rows import DictRow
 
 from aleo_types import *
-from explorer.types import Message as ExplorerMessage
+from explorer.types import Message as ExplorerMessage, TipState
 from node import Network
+from util.block_segments import BlockSegmentStore
+from util.global_cache import global_block_cache
 from .base import DatabaseBase, profile
 
 
 class DatabaseBlock(DatabaseBase):
 
+    def __init__(self, *args, **kwargs): # type: ignore
+        super().__init__(*args, **kwargs)
+        # optional append-only archive of blocks that full block reads are served from
+        segment_path = os.environ.get("BLOCK_SEGMENT_PATH")
+        self.block_segments: Optional[BlockSegmentStore] = None
+        if segment_path:
+            self.block_segments = BlockSegmentStore(segment_path, int(os.environ.get("BLOCK_SEGMENT_SIZE", 1 << 30)))
+        global_block_cache.max_blocks = int(os.environ.get("BLOCK_CACHE_SIZE", global_block_cache.max_blocks))
+        global_block_cache.max_bytes = int(os.environ.get("BLOCK_CACHE_MAX_BYTES", global_block_cache.max_bytes))
+
     @staticmethod
     def _get_block_header(block: dict[str, Any]):
         return BlockHeader(
@@ -39,149 +52,204 @@ class DatabaseBlock(DatabaseBase):
 
     @staticmethod
     @profile
-    async def _load_future(conn: psycopg.AsyncConnection[DictRow], transition_output_db_id: Optional[int],
-                           future_argument_db_id: Optional[int]) -> Optional[Future]:
-        async with conn.cursor() as cur:
-            if transition_output_db_id:
-                await cur.execute(
-                    "SELECT id, program_id, function_name FROM future WHERE type = 'Output' AND "
-                    "transition_output_future_id = %s",
-                    (transition_output_db_id,)
-                )
-            elif future_argument_db_id:
-                await cur.execute(
-                    "SELECT id, program_id, function_name FROM future WHERE type = 'Argument' AND "
-                    "future_argument_id = %s",
-                    (future_argument_db_id,)
-                )
-            else:
-                raise ValueError("transition_output_db_id or future_argument_db_id must be set")
-            if (res := await cur.fetchone()) is None:
-                if transition_output_db_id:
-                    return None
-                raise RuntimeError("failed to insert row into database")
-            future_db_id = res["id"]
-            program_id = res["program_id"]
-            function_name = res["function_name"]
+    async def _load_futures(cur: psycopg.AsyncCursor[DictRow], transition_output_future_db_ids: list[int]) -> dict[int, Future]:
+        if not transition_output_future_db_ids:
+            return {}
+        # one round trip per nesting level, keyed by the row the future hangs off
+        await cur.execute(
+            "SELECT id, transition_output_future_id AS parent_id, program_id, function_name FROM future "
+            "WHERE type = 'Output' AND transition_output_future_id = ANY(%s)",
+            (transition_output_future_db_ids,)
+        )
+        levels: list[list[dict[str, Any]]] = []
+        future_arguments: dict[int, list[dict[str, Any]]] = defaultdict(list)
+        futures = await cur.fetchall()
+        while futures:
+            levels.append(futures)
             await cur.execute(
-                "SELECT id, type, plaintext FROM future_argument WHERE future_id = %s ORDER BY id",
-                (future_db_id,)
+                "SELECT id, future_id, type, plaintext FROM future_argument WHERE future_id = ANY(%s) ORDER BY id",
+                ([future["id"] for future in futures],)
             )
-            arguments: list[Argument] = []
+            future_argument_db_ids: list[int] = []
             for res in await cur.fetchall():
-                if res["type"] == "Plaintext":
-                    arguments.append(PlaintextArgument(
-                        plaintext=Plaintext.load(BytesIO(res["plaintext"]))
-                    ))
-                elif res["type"] == "Future":
-                    arguments.append(FutureArgument(
-                        future=await DatabaseBlock._load_future(conn, None, res["id"]) # type: ignore
-                    ))
-                else:
-                    raise NotImplementedError
-            return Future(
-                program_id=ProgramID.loads(program_id),
-                function_name=Identifier.loads(function_name),
-                arguments=Vec[Argument, u8](arguments)
+                future_arguments[res["future_id"]].append(res)
+                if res["type"] == "Future":
+                    future_argument_db_ids.append(res["id"])
+            if not future_argument_db_ids:
+                break
+            await cur.execute(
+                "SELECT id, future_argument_id AS parent_id, program_id, function_name FROM future "
+                "WHERE type = 'Argument' AND future_argument_id = ANY(%s)",
+                (future_argument_db_ids,)
             )
+            futures = await cur.fetchall()
 
-    @staticmethod
-    @profile
-    async def _get_transition_from_dict(transition: dict[str, Any], conn: psycopg.AsyncConnection[DictRow]):
-        async with conn.cursor() as cur:
-            await cur.execute("SELECT * FROM get_transition_inputs(%s)", (transition["id"],))
-            transition_inputs = await cur.fetchall()
-            tis: list[tuple[TransitionInput, int]] = []
-            for transition_input in transition_inputs:
-                if transition_input["type"] == TransitionInput.Type.Public.name:
-                    if transition_input["plaintext"] is None:
-                        plaintext = None
-                    else:
-                        plaintext = Plaintext.load(BytesIO(transition_input["plaintext"]))
-                    tis.append((PublicTransitionInput(
-                        plaintext_hash=Field.loads(transition_input["plaintext_hash"]),
-                        plaintext=Option[Plaintext](plaintext)
-                    ), transition_input["index"]))
-                elif transition_input["type"] == TransitionInput.Type.Private.name:
-                    if transition_input["ciphertext"] is None:
-                        ciphertext = None
+        result: dict[int, Future] = {}
+        for futures in reversed(levels):
+            inner = result
+            result = {}
+            for future in futures:
+                arguments: list[Argument] = []
+                for res in future_arguments[future["id"]]:
+                    if res["type"] == "Plaintext":
+                        arguments.append(PlaintextArgument(
+                            plaintext=Plaintext.load(BytesIO(res["plaintext"]))
+                        ))
+                    elif res["type"] == "Future":
+                        if res["id"] not in inner:
+                            raise RuntimeError("database inconsistent")
+                        arguments.append(FutureArgument(future=inner[res["id"]]))
                     else:
-                        ciphertext = Ciphertext.loads(transition_input["ciphertext"])
-                    tis.append((PrivateTransitionInput(
-                        ciphertext_hash=Field.loads(transition_input["ciphertext_hash"]),
-                        ciphertext=Option[Ciphertext](ciphertext)
-                    ), transition_input["index"]))
-                elif transition_input["type"] == TransitionInput.Type.Record.name:
-                    tis.append((RecordTransitionInput(
-                        serial_number=Field.loads(transition_input["serial_number"]),
-                        tag=Field.loads(transition_input["tag"])
-                    ), transition_input["index"]))
-                elif transition_input["type"] == TransitionInput.Type.ExternalRecord.name:
-                    tis.append((ExternalRecordTransitionInput(
-                        input_commitment=Field.loads(transition_input["commitment"]),
-                    ), transition_input["index"]))
+                        raise NotImplementedError
+                result[future["parent_id"]] = Future(
+                    program_id=ProgramID.loads(future["program_id"]),
+                    function_name=Identifier.loads(future["function_name"]),
+                    arguments=Vec[Argument, u8](arguments)
+                )
+        return result
+
+    @staticmethod
+    def _get_transition_from_rows(transition: dict[str, Any], transition_inputs: list[dict[str, Any]],
+                                  transition_outputs: list[dict[str, Any]], futures: dict[int, Future]) -> Transition:
+        tis: list[TransitionInput] = []
+        for transition_input in transition_inputs:
+            if transition_input["type"] == TransitionInput.Type.Public.name:
+                if transition_input["plaintext"] is None:
+                    plaintext = None
                 else:
-                    raise NotImplementedError
-            tis.sort(key=lambda x: x[1])
-            transition_inputs = [x[0] for x in tis]
-
-            await cur.execute("SELECT * FROM get_transition_outputs(%s)", (transition["id"],))
-            transition_outputs = await cur.fetchall()
-            tos: list[tuple[TransitionOutput, int]] = []
-            for transition_output in transition_outputs:
-                if transition_output["type"] == TransitionOutput.Type.Public.name:
-                    if transition_output["plaintext"] is None:
-                        plaintext = None
-                    else:
-                        plaintext = Plaintext.load(BytesIO(transition_output["plaintext"]))
-                    tos.append((PublicTransitionOutput(
-                        plaintext_hash=Field.loads(transition_output["plaintext_hash"]),
-                        plaintext=Option[Plaintext](plaintext)
-                    ), transition_output["index"]))
-                elif transition_output["type"] == TransitionOutput.Type.Private.name:
-                    if transition_output["ciphertext"] is None:
-                        ciphertext = None
-                    else:
-                        ciphertext = Ciphertext.loads(transition_output["ciphertext"])
-                    tos.append((PrivateTransitionOutput(
-                        ciphertext_hash=Field.loads(transition_output["ciphertext_hash"]),
-                        ciphertext=Option[Ciphertext](ciphertext)
-                    ), transition_output["index"]))
-                elif transition_output["type"] == TransitionOutput.Type.Record.name:
-                    if transition_output["record_ciphertext"] is None:
-                        record_ciphertext = None
-                    else:
-                        record_ciphertext = Record[Ciphertext].loads(transition_output["record_ciphertext"])
-                    tos.append((RecordTransitionOutput(
-                        commitment=Field.loads(transition_output["record_commitment"]),
-                        checksum=Field.loads(transition_output["checksum"]),
-                        record_ciphertext=Option[Record[Ciphertext]](record_ciphertext)
-                    ), transition_output["index"]))
-                elif transition_output["type"] == TransitionOutput.Type.ExternalRecord.name:
-                    tos.append((ExternalRecordTransitionOutput(
-                        commitment=Field.loads(transition_output["external_record_commitment"]),
-                    ), transition_output["index"]))
-                elif transition_output["type"] == TransitionOutput.Type.Future.name:
-                    future = await DatabaseBlock._load_future(conn, transition_output["future_id"], None)
-                    tos.append((FutureTransitionOutput(
-                        future_hash=Field.loads(transition_output["future_hash"]),
-                        future=Option[Future](future)
-                    ), transition_output["index"]))
+                    plaintext = Plaintext.load(BytesIO(transition_input["plaintext"]))
+                tis.append(PublicTransitionInput(
+                    plaintext_hash=Field.loads(transition_input["plaintext_hash"]),
+                    plaintext=Option[Plaintext](plaintext)
+                ))
+            elif transition_input["type"] == TransitionInput.Type.Private.name:
+                if transition_input["ciphertext"] is None:
+                    ciphertext = None
                 else:
-                    raise NotImplementedError
-            tos.sort(key=lambda x: x[1])
-            transition_outputs = [x[0] for x in tos]
-
-            return Transition(
-                id_=TransitionID.loads(transition["transition_id"]),
-                program_id=ProgramID.loads(transition["program_id"]),
-                function_name=Identifier.loads(transition["function_name"]),
-                inputs=Vec[TransitionInput, u8](transition_inputs),
-                outputs=Vec[TransitionOutput, u8](transition_outputs),
-                tpk=Group.loads(transition["tpk"]),
-                tcm=Field.loads(transition["tcm"]),
-                scm=Field.loads(transition["scm"]),
+                    ciphertext = Ciphertext.loads(transition_input["ciphertext"])
+                tis.append(PrivateTransitionInput(
+                    ciphertext_hash=Field.loads(transition_input["ciphertext_hash"]),
+                    ciphertext=Option[Ciphertext](ciphertext)
+                ))
+            elif transition_input["type"] == TransitionInput.Type.Record.name:
+                tis.append(RecordTransitionInput(
+                    serial_number=Field.loads(transition_input["serial_number"]),
+                    tag=Field.loads(transition_input["tag"])
+                ))
+            elif transition_input["type"] == TransitionInput.Type.ExternalRecord.name:
+                tis.append(ExternalRecordTransitionInput(
+                    input_commitment=Field.loads(transition_input["commitment"]),
+                ))
+            else:
+                raise NotImplementedError
+
+        tos: list[TransitionOutput] = []
+        for transition_output in transition_outputs:
+            if transition_output["type"] == TransitionOutput.Type.Public.name:
+                if transition_output["plaintext"] is None:
+                    plaintext = None
+                else:
+                    plaintext = Plaintext.load(BytesIO(transition_output["plaintext"]))
+                tos.append(PublicTransitionOutput(
+                    plaintext_hash=Field.loads(transition_output["plaintext_hash"]),
+                    plaintext=Option[Plaintext](plaintext)
+                ))
+            elif transition_output["type"] == TransitionOutput.Type.Private.name:
+                if transition_output["ciphertext"] is None:
+                    ciphertext = None
+                else:
+                    ciphertext = Ciphertext.loads(transition_output["ciphertext"])
+                tos.append(PrivateTransitionOutput(
+                    ciphertext_hash=Field.loads(transition_output["ciphertext_hash"]),
+                    ciphertext=Option[Ciphertext](ciphertext)
+                ))
+            elif transition_output["type"] == TransitionOutput.Type.Record.name:
+                if transition_output["record_ciphertext"] is None:
+                    record_ciphertext = None
+                else:
+                    record_ciphertext = Record[Ciphertext].loads(transition_output["record_ciphertext"])
+                tos.append(RecordTransitionOutput(
+                    commitment=Field.loads(transition_output["record_commitment"]),
+                    checksum=Field.loads(transition_output["checksum"]),
+                    record_ciphertext=Option[Record[Ciphertext]](record_ciphertext)
+                ))
+            elif transition_output["type"] == TransitionOutput.Type.ExternalRecord.name:
+                tos.append(ExternalRecordTransitionOutput(
+                    commitment=Field.loads(transition_output["external_record_commitment"]),
+                ))
+            elif transition_output["type"] == TransitionOutput.Type.Future.name:
+                tos.append(FutureTransitionOutput(
+                    future_hash=Field.loads(transition_output["future_hash"]),
+                    future=Option[Future](futures.get(transition_output["future_id"]))
+                ))
+            else:
+                raise NotImplementedError
+
+        return Transition(
+            id_=TransitionID.loads(transition["transition_id"]),
+            program_id=ProgramID.loads(transition["program_id"]),
+            function_name=Identifier.loads(transition["function_name"]),
+            inputs=Vec[TransitionInput, u8](tis),
+            outputs=Vec[TransitionOutput, u8](tos),
+            tpk=Group.loads(transition["tpk"]),
+            tcm=Field.loads(transition["tcm"]),
+            scm=Field.loads(transition["scm"]),
+        )
+
+    @staticmethod
+    @profile
+    async def _get_transitions_from_dicts(transitions: list[dict[str, Any]], conn: psycopg.AsyncConnection[DictRow]) -> list[Transition]:
+        if not transitions:
+            return []
+        transition_db_ids = [transition["id"] for transition in transitions]
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT ti.transition_id, ti.type, ti.index, tip.plaintext_hash, tip.plaintext, "
+                "tipr.ciphertext_hash, tipr.ciphertext, tir.serial_number, tir.tag, tier.commitment "
+                "FROM transition_input ti "
+                "LEFT JOIN transition_input_public tip ON tip.transition_input_id = ti.id "
+                "LEFT JOIN transition_input_private tipr ON tipr.transition_input_id = ti.id "
+                "LEFT JOIN transition_input_record tir ON tir.transition_input_id = ti.id "
+                "LEFT JOIN transition_input_external_record tier ON tier.transition_input_id = ti.id "
+                "WHERE ti.transition_id = ANY(%s) ORDER BY ti.index",
+                (transition_db_ids,)
+            )
+            transition_inputs: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            for res in await cur.fetchall():
+                transition_inputs[res["transition_id"]].append(res)
+
+            await cur.execute(
+                "SELECT tos.transition_id, tos.type, tos.index, top.plaintext_hash, top.plaintext, "
+                "topr.ciphertext_hash, topr.ciphertext, tor.commitment AS record_commitment, tor.checksum, "
+                "tor.record_ciphertext, toer.commitment AS external_record_commitment, "
+                "tof.id AS future_id, tof.future_hash "
+                "FROM transition_output tos "
+                "LEFT JOIN transition_output_public top ON top.transition_output_id = tos.id "
+                "LEFT JOIN transition_output_private topr ON topr.transition_output_id = tos.id "
+                "LEFT JOIN transition_output_record tor ON tor.transition_output_id = tos.id "
+                "LEFT JOIN transition_output_external_record toer ON toer.transition_output_id = tos.id "
+                "LEFT JOIN transition_output_future tof ON tof.transition_output_id = tos.id "
+                "WHERE tos.transition_id = ANY(%s) ORDER BY tos.index",
+                (transition_db_ids,)
             )
+            transition_outputs: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            future_db_ids: list[int] = []
+            for res in await cur.fetchall():
+                transition_outputs[res["transition_id"]].append(res)
+                if res["future_id"] is not None:
+                    future_db_ids.append(res["future_id"])
+            futures = await DatabaseBlock._load_futures(cur, future_db_ids)
+
+            return [
+                DatabaseBlock._get_transition_from_rows(
+                    transition, transition_inputs[transition["id"]], transition_outputs[transition["id"]], futures
+                )
+                for transition in transitions
+            ]
+
+    @staticmethod
+    async def _get_transition_from_dict(transition: dict[str, Any], conn: psycopg.AsyncConnection[DictRow]):
+        return (await DatabaseBlock._get_transitions_from_dicts([transition], conn))[0]
 
     async def get_transaction_reject_reason(self, transaction_id: TransactionID | str) -> Optional[str]:
         async with self.pool.connection() as conn:
@@ -246,7 +314,7 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def get_block_from_timestamp(self, timestamp: int) -> Block | None:
+    async def get_block_header_from_timestamp(self, timestamp: int) -> BlockHeader | None:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
@@ -257,7 +325,7 @@ class DatabaseBlock(DatabaseBase):
                     block = await cur.fetchone()
                     if block is None:
                         return None
-                    return await self._get_full_block(block, conn)
+                    return self._get_block_header(block)
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
@@ -418,9 +486,7 @@ class DatabaseBlock(DatabaseBase):
                             (execute["id"],)
                         )
                         transitions = await cur.fetchall()
-                        tss: list[Transition] = []
-                        for transition in transitions:
-                            tss.append(await self._get_transition_from_dict(transition, conn))
+                        tss = await self._get_transitions_from_dicts(transitions, conn)
                         await cur.execute(
                             "SELECT id, global_state_root, proof FROM fee WHERE transaction_id = %s",
                             (transaction["id"],)
@@ -542,193 +608,239 @@ class DatabaseBlock(DatabaseBase):
                     raise
 
     @staticmethod
-    async def get_confirmed_transaction_from_dict(conn: psycopg.AsyncConnection[DictRow], confirmed_transaction: dict[str, Any]) -> ConfirmedTransaction:
-        async with conn.cursor() as cur:
-            await cur.execute("SELECT * FROM get_finalize_operations(%s)", (confirmed_transaction["confirmed_transaction_id"],))
-            finalize_operations = await cur.fetchall()
-            f: list[FinalizeOperation] = []
-            for finalize_operation in finalize_operations:
-                if finalize_operation["type"] == FinalizeOperation.Type.InitializeMapping.name:
-                    f.append(InitializeMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
-                elif finalize_operation["type"] == FinalizeOperation.Type.InsertKeyValue.name:
-                    f.append(InsertKeyValue(
-                        mapping_id=Field.loads(finalize_operation["mapping_id"]),
-                        key_id=Field.loads(finalize_operation["key_id"]),
-                        value_id=Field.loads(finalize_operation["value_id"]),
-                    ))
-                elif finalize_operation["type"] == FinalizeOperation.Type.UpdateKeyValue.name:
-                    f.append(UpdateKeyValue(
-                        mapping_id=Field.loads(finalize_operation["mapping_id"]),
-                        key_id=Field.loads(finalize_operation["key_id"]),
-                        value_id=Field.loads(finalize_operation["value_id"]),
-                    ))
-                elif finalize_operation["type"] == FinalizeOperation.Type.RemoveKeyValue.name:
-                    f.append(RemoveKeyValue(
-                        mapping_id=Field.loads(finalize_operation["mapping_id"]),
-                        key_id=Field.loads(finalize_operation["key_id"]),
-                    ))
-                elif finalize_operation["type"] == FinalizeOperation.Type.ReplaceMapping.name:
-                    f.append(ReplaceMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
-                elif finalize_operation["type"] == FinalizeOperation.Type.RemoveMapping.name:
-                    f.append(RemoveMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
-                else:
-                    raise NotImplementedError
+    def _get_confirmed_transaction_from_rows(confirmed_transaction: dict[str, Any], finalize_operations: list[dict[str, Any]],
+                                             program_data: Optional[dict[str, Any]], transitions: list[Transition],
+                                             fee_transition: Optional[Transition]) -> ConfirmedTransaction:
+        f: list[FinalizeOperation] = []
+        for finalize_operation in finalize_operations:
+            if finalize_operation["type"] == FinalizeOperation.Type.InitializeMapping.name:
+                f.append(InitializeMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
+            elif finalize_operation["type"] == FinalizeOperation.Type.InsertKeyValue.name:
+                f.append(InsertKeyValue(
+                    mapping_id=Field.loads(finalize_operation["mapping_id"]),
+                    key_id=Field.loads(finalize_operation["key_id"]),
+                    value_id=Field.loads(finalize_operation["value_id"]),
+                ))
+            elif finalize_operation["type"] == FinalizeOperation.Type.UpdateKeyValue.name:
+                f.append(UpdateKeyValue(
+                    mapping_id=Field.loads(finalize_operation["mapping_id"]),
+                    key_id=Field.loads(finalize_operation["key_id"]),
+                    value_id=Field.loads(finalize_operation["value_id"]),
+                ))
+            elif finalize_operation["type"] == FinalizeOperation.Type.RemoveKeyValue.name:
+                f.append(RemoveKeyValue(
+                    mapping_id=Field.loads(finalize_operation["mapping_id"]),
+                    key_id=Field.loads(finalize_operation["key_id"]),
+                ))
+            elif finalize_operation["type"] == FinalizeOperation.Type.ReplaceMapping.name:
+                f.append(ReplaceMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
+            elif finalize_operation["type"] == FinalizeOperation.Type.RemoveMapping.name:
+                f.append(RemoveMapping(mapping_id=Field.loads(finalize_operation["mapping_id"])))
+            else:
+                raise NotImplementedError
 
-            transaction = confirmed_transaction
-            # TODO: store full program on rejected deploy so we dont need dummy data - should we?
-            match confirmed_transaction["confirmed_transaction_type"]:
-                case ConfirmedTransaction.Type.AcceptedDeploy.name | ConfirmedTransaction.Type.RejectedDeploy.name:
-                    deploy_transaction = transaction
-                    if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedDeploy.name:
-                        await cur.execute(
-                            "SELECT raw_data, owner, signature FROM program WHERE transaction_deploy_id = %s",
-                            (deploy_transaction["transaction_deploy_id"],)
-                        )
-                        program_data = await cur.fetchone()
-                        if program_data is None:
-                            raise RuntimeError("database inconsistent")
-                        program = program_data["raw_data"]
-                        deployment = Deployment(
-                            edition=u16(deploy_transaction["edition"]),
-                            program=Program.load(BytesIO(program)),
-                            verifying_keys=Vec[Tuple[Identifier, VerifyingKey, Certificate], u16].load(BytesIO(deploy_transaction["verifying_keys"])),
+        transaction = confirmed_transaction
+        # TODO: store full program on rejected deploy so we dont need dummy data - should we?
+        match confirmed_transaction["confirmed_transaction_type"]:
+            case ConfirmedTransaction.Type.AcceptedDeploy.name | ConfirmedTransaction.Type.RejectedDeploy.name:
+                deploy_transaction = transaction
+                if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedDeploy.name:
+                    if program_data is None:
+                        raise RuntimeError("database inconsistent")
+                    program = program_data["raw_data"]
+                    deployment = Deployment(
+                        edition=u16(deploy_transaction["edition"]),
+                        program=Program.load(BytesIO(program)),
+                        verifying_keys=Vec[Tuple[Identifier, VerifyingKey, Certificate], u16].load(BytesIO(deploy_transaction["verifying_keys"])),
+                    )
+                else:
+                    deployment = Deployment(
+                        edition=u16(deploy_transaction["edition"]),
+                        program=Program(
+                            id_=ProgramID.loads("placeholder.aleo"),
+                            imports=Vec[Import, u8]([]),
+                            mappings={},
+                            structs={},
+                            records={},
+                            closures={},
+                            functions={},
+                            identifiers={},
+                        ),
+                        verifying_keys=Vec[Tuple[Identifier, VerifyingKey, Certificate], u16]([])
+                    )
+                fee_dict = transaction
+                if not fee_dict:
+                    raise RuntimeError("database inconsistent")
+                if fee_transition is None:
+                    raise ValueError("fee transition not found")
+                proof = None
+                if fee_dict["fee_proof"] is not None:
+                    proof = Proof.loads(fee_dict["fee_proof"])
+                fee = Fee(
+                    transition=fee_transition,
+                    global_state_root=StateRoot.loads(fee_dict["fee_global_state_root"]),
+                    proof=Option[Proof](proof),
+                )
+                if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedDeploy.name:
+                    program_data = cast(dict[str, Any], program_data)
+                    tx = DeployTransaction(
+                        id_=TransactionID.loads(transaction["transaction_id"]),
+                        deployment=deployment,
+                        fee=fee,
+                        owner=ProgramOwner(
+                            address=Address.loads(program_data["owner"]),
+                            signature=Signature.loads(program_data["signature"])
                         )
-                    else:
-                        deployment = Deployment(
-                            edition=u16(deploy_transaction["edition"]),
-                            program=Program(
-                                id_=ProgramID.loads("placeholder.aleo"),
-                                imports=Vec[Import, u8]([]),
-                                mappings={},
-                                structs={},
-                                records={},
-                                closures={},
-                                functions={},
-                                identifiers={},
-                            ),
-                            verifying_keys=Vec[Tuple[Identifier, VerifyingKey, Certificate], u16]([])
+                    )
+                else:
+                    tx = DeployTransaction(
+                        id_=TransactionID.loads(transaction["transaction_id"]),
+                        deployment=deployment,
+                        fee=fee,
+                        owner=ProgramOwner(
+                            address=Address.loads(deploy_transaction["owner"]),
+                            signature=Signature(
+                                challenge=Scalar(0),
+                                response=Scalar(0),
+                                compute_key=ComputeKey(
+                                    pk_sig=Group(0),
+                                    pr_sig=Group(0),
+                                )
+                            )
                         )
-                        program_data = None
-                    fee_dict = transaction
-                    if not fee_dict:
-                        raise RuntimeError("database inconsistent")
-                    await cur.execute(
-                        "SELECT * FROM transition WHERE fee_id = %s",
-                        (fee_dict["fee_id"],)
                     )
-                    fee_transition = await cur.fetchone()
+                ctx = AcceptedDeploy(
+                    index=u32(confirmed_transaction["index"]),
+                    transaction=tx,
+                    finalize=Vec[FinalizeOperation, u16](f),
+                )
+            case ConfirmedTransaction.Type.AcceptedExecute.name | ConfirmedTransaction.Type.RejectedExecute.name:
+                execute_transaction = transaction
+                fee = transaction
+                if fee["fee_id"] is None:
+                    fee = None
+                else:
                     if fee_transition is None:
+                        print(transaction)
                         raise ValueError("fee transition not found")
                     proof = None
-                    if fee_dict["fee_proof"] is not None:
-                        proof = Proof.loads(fee_dict["fee_proof"])
+                    if fee["fee_proof"] is not None:
+                        proof = Proof.loads(fee["fee_proof"])
                     fee = Fee(
-                        transition=await DatabaseBlock._get_transition_from_dict(fee_transition, conn),
-                        global_state_root=StateRoot.loads(fee_dict["fee_global_state_root"]),
+                        transition=fee_transition,
+                        global_state_root=StateRoot.loads(fee["fee_global_state_root"]),
                         proof=Option[Proof](proof),
                     )
-                    if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedDeploy.name:
-                        program_data = cast(dict[str, Any], program_data)
-                        tx = DeployTransaction(
+                if execute_transaction["proof"] is None:
+                    proof = None
+                else:
+                    proof = Proof.loads(execute_transaction["proof"])
+                if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedExecute.name:
+                    ctx = AcceptedExecute(
+                        index=u32(confirmed_transaction["index"]),
+                        transaction=ExecuteTransaction(
                             id_=TransactionID.loads(transaction["transaction_id"]),
-                            deployment=deployment,
-                            fee=fee,
-                            owner=ProgramOwner(
-                                address=Address.loads(program_data["owner"]),
-                                signature=Signature.loads(program_data["signature"])
-                            )
-                        )
-                    else:
-                        tx = DeployTransaction(
+                            execution=Execution(
+                                transitions=Vec[Transition, u8](transitions),
+                                global_state_root=StateRoot.loads(execute_transaction["global_state_root"]),
+                                proof=Option[Proof](proof),
+                            ),
+                            fee=Option[Fee](fee),
+                        ),
+                        finalize=Vec[FinalizeOperation, u16](f),
+                    )
+                else:
+                    if fee is None:
+                        raise ValueError("fee is None")
+                    ctx = RejectedExecute(
+                        index=u32(confirmed_transaction["index"]),
+                        transaction=FeeTransaction(
                             id_=TransactionID.loads(transaction["transaction_id"]),
-                            deployment=deployment,
                             fee=fee,
-                            owner=ProgramOwner(
-                                address=Address.loads(deploy_transaction["owner"]),
-                                signature=Signature(
-                                    challenge=Scalar(0),
-                                    response=Scalar(0),
-                                    compute_key=ComputeKey(
-                                        pk_sig=Group(0),
-                                        pr_sig=Group(0),
-                                    )
-                                )
+                        ),
+                        rejected=RejectedExecution(
+                            execution=Execution(
+                                transitions=Vec[Transition, u8](transitions),
+                                global_state_root=StateRoot.loads(execute_transaction["global_state_root"]),
+                                proof=Option[Proof](proof),
                             )
-                        )
-                    ctx = AcceptedDeploy(
-                        index=u32(confirmed_transaction["index"]),
-                        transaction=tx,
+                        ),
                         finalize=Vec[FinalizeOperation, u16](f),
                     )
-                case ConfirmedTransaction.Type.AcceptedExecute.name | ConfirmedTransaction.Type.RejectedExecute.name:
-                    execute_transaction = transaction
-                    await cur.execute(
-                        "SELECT * FROM transition WHERE transaction_execute_id = %s ORDER BY id",
-                        (execute_transaction["transaction_execute_id"],)
-                    )
-                    transitions = await cur.fetchall()
-                    tss: list[Transition] = []
-                    for transition in transitions:
-                        tss.append(await DatabaseBlock._get_transition_from_dict(transition, conn))
-                    fee = transaction
-                    if fee["fee_id"] is None:
-                        fee = None
-                    else:
-                        await cur.execute(
-                            "SELECT * FROM transition WHERE fee_id = %s",
-                            (fee["fee_id"],)
-                        )
-                        fee_transition = await cur.fetchone()
-                        if fee_transition is None:
-                            print(transaction)
-                            raise ValueError("fee transition not found")
-                        proof = None
-                        if fee["fee_proof"] is not None:
-                            proof = Proof.loads(fee["fee_proof"])
-                        fee = Fee(
-                            transition=await DatabaseBlock._get_transition_from_dict(fee_transition, conn),
-                            global_state_root=StateRoot.loads(fee["fee_global_state_root"]),
-                            proof=Option[Proof](proof),
-                        )
-                    if execute_transaction["proof"] is None:
-                        proof = None
-                    else:
-                        proof = Proof.loads(execute_transaction["proof"])
-                    if confirmed_transaction["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedExecute.name:
-                        ctx = AcceptedExecute(
-                            index=u32(confirmed_transaction["index"]),
-                            transaction=ExecuteTransaction(
-                                id_=TransactionID.loads(transaction["transaction_id"]),
-                                execution=Execution(
-                                    transitions=Vec[Transition, u8](tss),
-                                    global_state_root=StateRoot.loads(execute_transaction["global_state_root"]),
-                                    proof=Option[Proof](proof),
-                                ),
-                                fee=Option[Fee](fee),
-                            ),
-                            finalize=Vec[FinalizeOperation, u16](f),
-                        )
-                    else:
-                        if fee is None:
-                            raise ValueError("fee is None")
-                        ctx = RejectedExecute(
-                            index=u32(confirmed_transaction["index"]),
-                            transaction=FeeTransaction(
-                                id_=TransactionID.loads(transaction["transaction_id"]),
-                                fee=fee,
-                            ),
-                            rejected=RejectedExecution(
-                                execution=Execution(
-                                    transitions=Vec[Transition, u8](tss),
-                                    global_state_root=StateRoot.loads(execute_transaction["global_state_root"]),
-                                    proof=Option[Proof](proof),
-                                )
-                            ),
-                            finalize=Vec[FinalizeOperation, u16](f),
-                        )
-                case _:
-                    raise NotImplementedError
-            return ctx
+            case _:
+                raise NotImplementedError
+        return ctx
+
+    @staticmethod
+    @profile
+    async def _get_confirmed_transactions_from_dicts(conn: psycopg.AsyncConnection[DictRow],
+                                                     confirmed_transactions: list[dict[str, Any]]) -> list[ConfirmedTransaction]:
+        if not confirmed_transactions:
+            return []
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT fo.confirmed_transaction_id, fo.type, fo.index, "
+                "COALESCE(im.mapping_id, ikv.mapping_id, ukv.mapping_id, rkv.mapping_id, rpm.mapping_id, rm.mapping_id) AS mapping_id, "
+                "COALESCE(ikv.key_id, ukv.key_id, rkv.key_id) AS key_id, "
+                "COALESCE(ikv.value_id, ukv.value_id) AS value_id "
+                "FROM finalize_operation fo "
+                "LEFT JOIN finalize_operation_initialize_mapping im ON im.finalize_operation_id = fo.id "
+                "LEFT JOIN finalize_operation_insert_kv ikv ON ikv.finalize_operation_id = fo.id "
+                "LEFT JOIN finalize_operation_update_kv ukv ON ukv.finalize_operation_id = fo.id "
+                "LEFT JOIN finalize_operation_remove_kv rkv ON rkv.finalize_operation_id = fo.id "
+                "LEFT JOIN finalize_operation_replace_mapping rpm ON rpm.finalize_operation_id = fo.id "
+                "LEFT JOIN finalize_operation_remove_mapping rm ON rm.finalize_operation_id = fo.id "
+                "WHERE fo.confirmed_transaction_id = ANY(%s) ORDER BY fo.id",
+                ([ct["confirmed_transaction_id"] for ct in confirmed_transactions],)
+            )
+            finalize_operations: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            for res in await cur.fetchall():
+                finalize_operations[res["confirmed_transaction_id"]].append(res)
+
+            deploy_db_ids = [
+                ct["transaction_deploy_id"] for ct in confirmed_transactions
+                if ct["confirmed_transaction_type"] == ConfirmedTransaction.Type.AcceptedDeploy.name
+            ]
+            programs: dict[int, dict[str, Any]] = {}
+            if deploy_db_ids:
+                await cur.execute(
+                    "SELECT transaction_deploy_id, raw_data, owner, signature FROM program WHERE transaction_deploy_id = ANY(%s)",
+                    (deploy_db_ids,)
+                )
+                for res in await cur.fetchall():
+                    programs[res["transaction_deploy_id"]] = res
+
+            await cur.execute(
+                "SELECT * FROM transition WHERE transaction_execute_id = ANY(%s) OR fee_id = ANY(%s) ORDER BY id",
+                (
+                    [ct["transaction_execute_id"] for ct in confirmed_transactions if ct.get("transaction_execute_id") is not None],
+                    [ct["fee_id"] for ct in confirmed_transactions if ct["fee_id"] is not None],
+                )
+            )
+            transition_rows = await cur.fetchall()
+        transitions = await DatabaseBlock._get_transitions_from_dicts(transition_rows, conn)
+        execute_transitions: dict[int, list[Transition]] = defaultdict(list)
+        fee_transitions: dict[int, Transition] = {}
+        for transition_row, transition in zip(transition_rows, transitions):
+            if transition_row["fee_id"] is not None:
+                fee_transitions[transition_row["fee_id"]] = transition
+            else:
+                execute_transitions[transition_row["transaction_execute_id"]].append(transition)
+
+        return [
+            DatabaseBlock._get_confirmed_transaction_from_rows(
+                ct,
+                finalize_operations[ct["confirmed_transaction_id"]],
+                programs.get(ct["transaction_deploy_id"]) if ct.get("transaction_deploy_id") is not None else None,
+                execute_transitions.get(ct.get("transaction_execute_id"), []),
+                fee_transitions.get(ct["fee_id"]),
+            )
+            for ct in confirmed_transactions
+        ]
+
+    @staticmethod
+    async def get_confirmed_transaction_from_dict(conn: psycopg.AsyncConnection[DictRow], confirmed_transaction: dict[str, Any]) -> ConfirmedTransaction:
+        return (await DatabaseBlock._get_confirmed_transactions_from_dicts(conn, [confirmed_transaction]))[0]
 
     async def get_confirmed_transaction(self, transaction_id: str) -> Optional[ConfirmedTransaction]:
         async with self.pool.connection() as conn:
@@ -788,198 +900,270 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    @staticmethod
+    async def _get_genesis_ratify(cur: psycopg.AsyncCursor[DictRow]) -> GenesisRatify:
+        await cur.execute("SELECT * FROM committee_history WHERE height = %s", (0,))
+        committee_history = await cur.fetchone()
+        if committee_history is None:
+            raise RuntimeError("database inconsistent")
+        await cur.execute("SELECT * FROM committee_history_member WHERE committee_id = %s", (committee_history["id"],))
+        committee_history_members = await cur.fetchall()
+        members: list[Tuple[Address, u64, bool_, u8]] = []
+        for committee_history_member in committee_history_members:
+            members.append(Tuple[Address, u64, bool_, u8]((
+                Address.loads(committee_history_member["address"]),
+                u64(committee_history_member["stake"]),
+                bool_(committee_history_member["is_open"]),
+                u8(committee_history_member["commission"]),
+            )))
+        committee = Committee(
+            id_=Field.loads(committee_history["committee_id"]),
+            starting_round=u64(committee_history["starting_round"]),
+            members=Vec[Tuple[Address, u64, bool_, u8], u16](members),
+            total_stake=u64(committee_history["total_stake"]),
+        )
+        await cur.execute("SELECT * FROM ratification_genesis_balance")
+        public_balances = await cur.fetchall()
+        balances: list[Tuple[Address, u64]] = []
+        for public_balance in public_balances:
+            balances.append(Tuple[Address, u64]((Address.loads(public_balance["address"]), u64(public_balance["amount"]))))
+        await cur.execute("SELECT * FROM ratification_genesis_bonded")
+        bonded_balances = await cur.fetchall()
+        bonded: list[Tuple[Address, Address, Address, u64]] = []
+        for bonded_balance in bonded_balances:
+            bonded.append(
+                Tuple[Address, Address, Address, u64]((
+                    Address.loads(bonded_balance["staker"]),
+                    Address.loads(bonded_balance["validator"]),
+                    Address.loads(bonded_balance["withdrawal"]),
+                    u64(bonded_balance["amount"])
+                ))
+            )
+        return GenesisRatify(
+            committee=committee,
+            public_balances=Vec[Tuple[Address, u64], u16](balances),
+            bonded_balances=Vec[Tuple[Address, Address, Address, u64], u16](bonded),
+        )
+
     @staticmethod
     @profile
-    async def _get_full_block(block: dict[str, Any], conn: psycopg.AsyncConnection[DictRow]):
+    async def _get_raw_blocks(block_db_ids: list[int], conn: psycopg.AsyncConnection[DictRow]) -> dict[int, tuple[Block, int]]:
+        # block id -> (block, serialized size)
         async with conn.cursor() as cur:
-            await cur.execute("SELECT * FROM get_confirmed_transactions(%s)", (block["id"],))
+            await cur.execute("SELECT block_id, data FROM block_raw WHERE block_id = ANY(%s)", (block_db_ids,))
+            return {res["block_id"]: (Block.load(BytesIO(res["data"])), len(res["data"])) for res in await cur.fetchall()}
+
+    @staticmethod
+    async def _get_full_blocks(blocks: list[dict[str, Any]], conn: psycopg.AsyncConnection[DictRow], cache: bool = False) -> list[Block]:
+        # only single block reads fill the cache, range reads would push the recent blocks out of it
+        if not blocks:
+            return []
+        full_blocks: dict[int, Block] = {}
+        for block in blocks:
+            if (full_block := global_block_cache.peek(block["height"])) is not None:
+                full_blocks[block["id"]] = full_block
+        uncached_blocks = [block for block in blocks if block["id"] not in full_blocks]
+        if uncached_blocks:
+            # blocks with a stored dump are decoded directly, only the rest is rebuilt from the tables
+            raw_blocks = await DatabaseBlock._get_raw_blocks([block["id"] for block in uncached_blocks], conn)
+            missing_blocks = [block for block in uncached_blocks if block["id"] not in raw_blocks]
+            for block, full_block in zip(missing_blocks, await DatabaseBlock._build_full_blocks(missing_blocks, conn)):
+                full_blocks[block["id"]] = full_block
+                if cache:
+                    global_block_cache.add(full_block, len(full_block.dump()))
+            for block_db_id, (full_block, size) in raw_blocks.items():
+                full_blocks[block_db_id] = full_block
+                if cache:
+                    global_block_cache.add(full_block, size)
+        return [full_blocks[block["id"]] for block in blocks]
+
+    @staticmethod
+    @profile
+    async def _build_full_blocks(blocks: list[dict[str, Any]], conn: psycopg.AsyncConnection[DictRow]) -> list[Block]:
+        """
+        Loads full blocks with a fixed number of queries no matter how many blocks or transactions there are,
+        child rows are fetched for all blocks at once and assembled in memory.
+        """
+        if not blocks:
+            return []
+        block_db_ids = [block["id"] for block in blocks]
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT ct.block_id, ct.id AS confirmed_transaction_id, ct.type AS confirmed_transaction_type, ct.index, "
+                "ct.reject_reason, t.transaction_id, t.type AS transaction_type, "
+                "td.id AS transaction_deploy_id, td.edition, td.verifying_keys, td.program_id, td.owner, "
+                "te.id AS transaction_execute_id, te.global_state_root, te.proof, "
+                "f.id AS fee_id, f.global_state_root AS fee_global_state_root, f.proof AS fee_proof "
+                "FROM confirmed_transaction ct "
+                "JOIN transaction t ON t.confirmed_transaction_id = ct.id "
+                "LEFT JOIN LATERAL ("
+                "  SELECT id, edition, verifying_keys, program_id, owner FROM transaction_deploy "
+                "  WHERE transaction_id = t.id ORDER BY id LIMIT 1"
+                ") td ON ct.type IN ('AcceptedDeploy', 'RejectedDeploy') "
+                "LEFT JOIN LATERAL ("
+                "  SELECT id, global_state_root, proof FROM transaction_execute "
+                "  WHERE transaction_id = t.id ORDER BY id LIMIT 1"
+                ") te ON ct.type IN ('AcceptedExecute', 'RejectedExecute') "
+                "LEFT JOIN LATERAL ("
+                "  SELECT id, global_state_root, proof FROM fee WHERE transaction_id = t.id ORDER BY id LIMIT 1"
+                ") f ON true "
+                "WHERE ct.block_id = ANY(%s) ORDER BY ct.id",
+                (block_db_ids,)
+            )
             confirmed_transactions = await cur.fetchall()
-            ctxs: list[ConfirmedTransaction] = []
-            for confirmed_transaction in confirmed_transactions:
-                ctxs.append(await DatabaseBlock.get_confirmed_transaction_from_dict(conn, confirmed_transaction))
-            await cur.execute("SELECT * FROM ratification WHERE block_id = %s ORDER BY index", (block["id"],))
-            ratifications = await cur.fetchall()
-            rs: list[Ratify] = []
-            for ratification in ratifications:
-                match ratification["type"]:
-                    case Ratify.Type.Genesis.name:
-                        await cur.execute("SELECT * FROM committee_history WHERE height = %s", (0,))
-                        committee_history = await cur.fetchone()
-                        if committee_history is None:
-                            raise RuntimeError("database inconsistent")
-                        await cur.execute("SELECT * FROM committee_history_member WHERE committee_id = %s", (committee_history["id"],))
-                        committee_history_members = await cur.fetchall()
-                        members: list[Tuple[Address, u64, bool_, u8]] = []
-                        for committee_history_member in committee_history_members:
-                            members.append(Tuple[Address, u64, bool_, u8]((
-                                Address.loads(committee_history_member["address"]),
-                                u64(committee_history_member["stake"]),
-                                bool_(committee_history_member["is_open"]),
-                                u8(committee_history_member["commission"]),
-                            )))
-                        committee = Committee(
-                            id_=Field.loads(committee_history["committee_id"]),
-                            starting_round=u64(committee_history["starting_round"]),
-                            members=Vec[Tuple[Address, u64, bool_, u8], u16](members),
-                            total_stake=u64(committee_history["total_stake"]),
-                        )
-                        await cur.execute("SELECT * FROM ratification_genesis_balance")
-                        public_balances = await cur.fetchall()
-                        balances: list[Tuple[Address, u64]] = []
-                        for public_balance in public_balances:
-                            balances.append(Tuple[Address, u64]((Address.loads(public_balance["address"]), u64(public_balance["amount"]))))
-                        await cur.execute("SELECT * FROM ratification_genesis_bonded")
-                        bonded_balances = await cur.fetchall()
-                        bonded: list[Tuple[Address, Address, Address, u64]] = []
-                        for bonded_balance in bonded_balances:
-                            bonded.append(
-                                Tuple[Address, Address, Address, u64]((
-                                    Address.loads(bonded_balance["staker"]),
-                                    Address.loads(bonded_balance["validator"]),
-                                    Address.loads(bonded_balance["withdrawal"]),
-                                    u64(bonded_balance["amount"])
-                                ))
-                            )
-                        rs.append(GenesisRatify(
-                            committee=committee,
-                            public_balances=Vec[Tuple[Address, u64], u16](balances),
-                            bonded_balances=Vec[Tuple[Address, Address, Address, u64], u16](bonded),
-                        ))
-                    case Ratify.Type.BlockReward.name:
-                        rs.append(BlockRewardRatify(
-                            amount=u64(ratification["amount"]),
-                        ))
-                    case Ratify.Type.PuzzleReward.name:
-                        rs.append(PuzzleRewardRatify(
-                            amount=u64(ratification["amount"]),
-                        ))
-                    case _:
-                        raise NotImplementedError
 
-            await cur.execute("SELECT * FROM puzzle_solution WHERE block_id = %s", (block["id"],))
-            puzzle_solution = await cur.fetchone()
-            if puzzle_solution is not None:
-                await cur.execute(
-                    "SELECT * FROM solution WHERE puzzle_solution_id = %s",
-                    (puzzle_solution["id"],)
-                )
-                solutions = await cur.fetchall()
-                ss: list[Solution] = []
-                for solution in solutions:
-                    ss.append(Solution(
-                        partial_solution=PartialSolution(
-                            solution_id=SolutionID.load(BytesIO(aleo_explorer_rust.solution_to_id(str(solution["epoch_hash"]), str(solution["address"]), int(solution["counter"])))),
-                            epoch_hash=BlockHash.loads(solution["epoch_hash"]),
-                            address=Address.loads(solution["address"]),
-                            counter=u64(solution["counter"]),
-                        ),
-                        target=u64(solution["target"]),
-                    ))
-                puzzle_solution = PuzzleSolutions(solutions=Vec[Solution, u8](ss))
-            else:
-                puzzle_solution = None
-
-            await cur.execute("SELECT * FROM authority WHERE block_id = %s", (block["id"],))
-            authority = await cur.fetchone()
-            if authority is None:
-                raise RuntimeError("database inconsistent")
-            if authority["type"] == Authority.Type.Beacon.name:
-                auth = BeaconAuthority(
-                    signature=Signature.loads(authority["signature"]),
-                )
-            elif authority["type"] == Authority.Type.Quorum.name:
-                await cur.execute(
-                    "SELECT * FROM dag_vertex WHERE authority_id = %s ORDER BY index",
-                    (authority["id"],)
-                )
-                dag_vertices = await cur.fetchall()
-                certificates: list[BatchCertificate] = []
-                for dag_vertex in dag_vertices:
-                    # await cur.execute(
-                    #     "SELECT * FROM dag_vertex_signature WHERE vertex_id = %s ORDER BY index",
-                    #     (dag_vertex["id"],)
-                    # )
-                    # dag_vertex_signatures = await cur.fetchall()
-
-                    signatures: list[Signature] = []
-                    # for signature in dag_vertex_signatures:
-                    #     signatures.append(Signature.loads(signature["signature"]))
-
-                    # await cur.execute(
-                    #     "SELECT previous_vertex_id FROM dag_vertex_adjacency WHERE vertex_id = %s ORDER BY index",
-                    #     (dag_vertex["id"],)
-                    # )
-                    # previous_ids = [x["previous_vertex_id"] for x in await cur.fetchall()]
-
-                    # TODO: use batch id after next reset - do we still want to keep this? would be way too expensive
-                    # await cur.execute(
-                    #     "SELECT batch_certificate_id FROM dag_vertex v "
-                    #     "JOIN UNNEST(%s) WITH ORDINALITY q(id, ord) ON q.id = v.id "
-                    #     "ORDER BY ord",
-                    #     (previous_ids,)
-                    # )
-                    # previous_cert_ids = [x["batch_certificate_id"] for x in await cur.fetchall()]
-                    previous_cert_ids: list[str] = []
+            await cur.execute("SELECT * FROM ratification WHERE block_id = ANY(%s) ORDER BY index", (block_db_ids,))
+            ratifications: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            for res in await cur.fetchall():
+                ratifications[res["block_id"]].append(res)
 
-                    await cur.execute(
-                        "SELECT * FROM dag_vertex_transmission_id WHERE vertex_id = %s ORDER BY index",
-                        (dag_vertex["id"],)
-                    )
-                    tids: list[TransmissionID] = []
-                    for tid in await cur.fetchall():
-                        if tid["type"] == TransmissionID.Type.Ratification:
-                            tids.append(RatificationTransmissionID())
-                        elif tid["type"] == TransmissionID.Type.Solution:
-                            tids.append(SolutionTransmissionID(id_=SolutionID.loads(tid["commitment"]), checksum=u128()))
-                        elif tid["type"] == TransmissionID.Type.Transaction:
-                            tids.append(TransactionTransmissionID(id_=TransactionID.loads(tid["transaction_id"]), checksum=u128()))
-
-                    certificates.append(
-                        BatchCertificate(
-                            batch_header=BatchHeader(
-                                batch_id=Field.loads(dag_vertex["batch_id"]),
-                                author=Address.loads(dag_vertex["author"]),
-                                round_=u64(dag_vertex["round"]),
-                                timestamp=i64(dag_vertex["timestamp"]),
-                                committee_id=Field.loads(dag_vertex["committee_id"]),
-                                transmission_ids=Vec[TransmissionID, u32](tids),
-                                previous_certificate_ids=Vec[Field, u16]([Field.loads(x) for x in previous_cert_ids]),
-                                signature=Signature.loads(dag_vertex["author_signature"]),
+            await cur.execute(
+                "SELECT ps.block_id, s.epoch_hash, s.address, s.counter, s.target FROM puzzle_solution ps "
+                "LEFT JOIN solution s ON s.puzzle_solution_id = ps.id "
+                "WHERE ps.block_id = ANY(%s) ORDER BY s.id",
+                (block_db_ids,)
+            )
+            solutions: dict[int, list[dict[str, Any]]] = {}
+            for res in await cur.fetchall():
+                block_solutions = solutions.setdefault(res["block_id"], [])
+                if res["epoch_hash"] is not None:
+                    block_solutions.append(res)
+
+            await cur.execute("SELECT * FROM authority WHERE block_id = ANY(%s)", (block_db_ids,))
+            authorities = {res["block_id"]: res for res in await cur.fetchall()}
+            await cur.execute(
+                "SELECT * FROM dag_vertex WHERE authority_id = ANY(%s) ORDER BY index",
+                ([authority["id"] for authority in authorities.values() if authority["type"] == Authority.Type.Quorum.name],)
+            )
+            dag_vertices: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            dag_vertex_db_ids: list[int] = []
+            for res in await cur.fetchall():
+                dag_vertices[res["authority_id"]].append(res)
+                dag_vertex_db_ids.append(res["id"])
+            await cur.execute(
+                "SELECT * FROM dag_vertex_transmission_id WHERE vertex_id = ANY(%s) ORDER BY index",
+                (dag_vertex_db_ids,)
+            )
+            transmission_ids: dict[int, list[dict[str, Any]]] = defaultdict(list)
+            for res in await cur.fetchall():
+                transmission_ids[res["vertex_id"]].append(res)
+
+            await cur.execute("SELECT * FROM block_aborted_solution_id WHERE block_id = ANY(%s)", (block_db_ids,))
+            aborted_solution_ids: dict[int, list[SolutionID]] = defaultdict(list)
+            for res in await cur.fetchall():
+                aborted_solution_ids[res["block_id"]].append(SolutionID.loads(res["solution_id"]))
+            await cur.execute("SELECT * FROM block_aborted_transaction_id WHERE block_id = ANY(%s)", (block_db_ids,))
+            aborted_transaction_ids: dict[int, list[TransactionID]] = defaultdict(list)
+            for res in await cur.fetchall():
+                aborted_transaction_ids[res["block_id"]].append(TransactionID.loads(res["transaction_id"]))
+
+            ctxs: dict[int, list[ConfirmedTransaction]] = defaultdict(list)
+            for confirmed_transaction, ctx in zip(
+                confirmed_transactions,
+                await DatabaseBlock._get_confirmed_transactions_from_dicts(conn, confirmed_transactions)
+            ):
+                ctxs[confirmed_transaction["block_id"]].append(ctx)
+
+            result: list[Block] = []
+            for block in blocks:
+                rs: list[Ratify] = []
+                for ratification in ratifications[block["id"]]:
+                    match ratification["type"]:
+                        case Ratify.Type.Genesis.name:
+                            rs.append(await DatabaseBlock._get_genesis_ratify(cur))
+                        case Ratify.Type.BlockReward.name:
+                            rs.append(BlockRewardRatify(
+                                amount=u64(ratification["amount"]),
+                            ))
+                        case Ratify.Type.PuzzleReward.name:
+                            rs.append(PuzzleRewardRatify(
+                                amount=u64(ratification["amount"]),
+                            ))
+                        case _:
+                            raise NotImplementedError
+
+                if block["id"] in solutions:
+                    ss: list[Solution] = []
+                    for solution in solutions[block["id"]]:
+                        ss.append(Solution(
+                            partial_solution=PartialSolution(
+                                solution_id=SolutionID.load(BytesIO(aleo_explorer_rust.solution_to_id(str(solution["epoch_hash"]), str(solution["address"]), int(solution["counter"])))),
+                                epoch_hash=BlockHash.loads(solution["epoch_hash"]),
+                                address=Address.loads(solution["address"]),
+                                counter=u64(solution["counter"]),
                             ),
-                            signatures=Vec[Signature, u16](signatures),
+                            target=u64(solution["target"]),
+                        ))
+                    puzzle_solution = PuzzleSolutions(solutions=Vec[Solution, u8](ss))
+                else:
+                    puzzle_solution = None
+
+                authority = authorities.get(block["id"])
+                if authority is None:
+                    raise RuntimeError("database inconsistent")
+                if authority["type"] == Authority.Type.Beacon.name:
+                    auth = BeaconAuthority(
+                        signature=Signature.loads(authority["signature"]),
+                    )
+                elif authority["type"] == Authority.Type.Quorum.name:
+                    certificates: list[BatchCertificate] = []
+                    for dag_vertex in dag_vertices[authority["id"]]:
+                        # signatures and previous certificate ids are not stored
+                        signatures: list[Signature] = []
+                        previous_cert_ids: list[str] = []
+
+                        tids: list[TransmissionID] = []
+                        for tid in transmission_ids[dag_vertex["id"]]:
+                            if tid["type"] == TransmissionID.Type.Ratification:
+                                tids.append(RatificationTransmissionID())
+                            elif tid["type"] == TransmissionID.Type.Solution:
+                                tids.append(SolutionTransmissionID(id_=SolutionID.loads(tid["commitment"]), checksum=u128()))
+                            elif tid["type"] == TransmissionID.Type.Transaction:
+                                tids.append(TransactionTransmissionID(id_=TransactionID.loads(tid["transaction_id"]), checksum=u128()))
+
+                        certificates.append(
+                            BatchCertificate(
+                                batch_header=BatchHeader(
+                                    batch_id=Field.loads(dag_vertex["batch_id"]),
+                                    author=Address.loads(dag_vertex["author"]),
+                                    round_=u64(dag_vertex["round"]),
+                                    timestamp=i64(dag_vertex["timestamp"]),
+                                    committee_id=Field.loads(dag_vertex["committee_id"]),
+                                    transmission_ids=Vec[TransmissionID, u32](tids),
+                                    previous_certificate_ids=Vec[Field, u16]([Field.loads(x) for x in previous_cert_ids]),
+                                    signature=Signature.loads(dag_vertex["author_signature"]),
+                                ),
+                                signatures=Vec[Signature, u16](signatures),
+                            )
                         )
+                    subdags: dict[u64, Vec[BatchCertificate, u16]] = defaultdict(lambda: Vec[BatchCertificate, u16]([]))
+                    for certificate in certificates:
+                        subdags[certificate.batch_header.round].append(certificate)
+                    subdag = Subdag(
+                        subdag=subdags
                     )
-                subdags: dict[u64, Vec[BatchCertificate, u16]] = defaultdict(lambda: Vec[BatchCertificate, u16]([]))
-                for certificate in certificates:
-                    subdags[certificate.batch_header.round].append(certificate)
-                subdag = Subdag(
-                    subdag=subdags
-                )
-                auth = QuorumAuthority(subdag=subdag)
-            else:
-                raise NotImplementedError
+                    auth = QuorumAuthority(subdag=subdag)
+                else:
+                    raise NotImplementedError
 
-            await cur.execute("SELECT * FROM block_aborted_solution_id WHERE block_id = %s", (block["id"],))
-            aborted_solution_ids = await cur.fetchall()
-            aborted_solution_ids = [SolutionID.loads(x["solution_id"]) for x in aborted_solution_ids]
-
-            await cur.execute("SELECT * FROM block_aborted_transaction_id WHERE block_id = %s", (block["id"],))
-            aborted_transaction_ids = await cur.fetchall()
-            aborted_transaction_ids = [TransactionID.loads(x["transaction_id"]) for x in aborted_transaction_ids]
-
-            return Block(
-                block_hash=BlockHash.loads(block['block_hash']),
-                previous_hash=BlockHash.loads(block['previous_hash']),
-                header=DatabaseBlock._get_block_header(block),
-                authority=auth,
-                transactions=Transactions(
-                    transactions=Vec[ConfirmedTransaction, u32](ctxs),
-                ),
-                ratifications=Ratifications(ratifications=Vec[Ratify, u32](rs)),
-                solutions=Solutions(solutions=Option[PuzzleSolutions](puzzle_solution)),
-                aborted_solution_ids=Vec[SolutionID, u32](aborted_solution_ids),
-                aborted_transaction_ids=Vec[TransactionID, u32](aborted_transaction_ids),
-            )
+                result.append(Block(
+                    block_hash=BlockHash.loads(block['block_hash']),
+                    previous_hash=BlockHash.loads(block['previous_hash']),
+                    header=DatabaseBlock._get_block_header(block),
+                    authority=auth,
+                    transactions=Transactions(
+                        transactions=Vec[ConfirmedTransaction, u32](ctxs[block["id"]]),
+                    ),
+                    ratifications=Ratifications(ratifications=Vec[Ratify, u32](rs)),
+                    solutions=Solutions(solutions=Option[PuzzleSolutions](puzzle_solution)),
+                    aborted_solution_ids=Vec[SolutionID, u32](aborted_solution_ids[block["id"]]),
+                    aborted_transaction_ids=Vec[TransactionID, u32](aborted_transaction_ids[block["id"]]),
+                ))
+            return result
+
+    @staticmethod
+    async def _get_full_block(block: dict[str, Any], conn: psycopg.AsyncConnection[DictRow]):
+        return (await DatabaseBlock._get_full_blocks([block], conn, cache=True))[0]
 
     @staticmethod
     async def get_full_block_range(start: int, end: int, conn: psycopg.AsyncConnection[DictRow]):
@@ -989,33 +1173,7 @@ class DatabaseBlock(DatabaseBase):
                 (start, end)
             )
             blocks = await cur.fetchall()
-            return [await DatabaseBlock._get_full_block(block, conn) for block in blocks]
-
-    @staticmethod
-    async def _get_fast_block(block: dict[str, Any], conn: psycopg.AsyncConnection[DictRow]) -> dict[str, Any]:
-        async with conn.cursor() as cur:
-            await cur.execute(
-                "SELECT COUNT(*) FROM confirmed_transaction WHERE block_id = %s",
-                (block["id"],)
-            )
-            if (res := await cur.fetchone()) is None:
-                transaction_count = 0
-            else:
-                transaction_count = res["count"]
-            await cur.execute(
-                "WITH ps AS (SELECT ps.id FROM puzzle_solution ps WHERE ps.block_id = %s LIMIT 1) "
-                "SELECT COUNT(*) FROM solution s, ps WHERE s.puzzle_solution_id = ps.id",
-                (block["id"],)
-            )
-            if (res := await cur.fetchone()) is None:
-                partial_solution_count = 0
-            else:
-                partial_solution_count = res["count"]
-            return {
-                **block,
-                "transaction_count": transaction_count,
-                "partial_solution_count": partial_solution_count,
-            }
+            return await DatabaseBlock._get_full_blocks(blocks, conn)
 
     @staticmethod
     async def _get_fast_block_range(start: int, end: int, conn: psycopg.AsyncConnection[DictRow]):
@@ -1024,8 +1182,8 @@ class DatabaseBlock(DatabaseBase):
                 "SELECT * FROM block WHERE height <= %s AND height > %s ORDER BY height DESC",
                 (start, end)
             )
-            blocks = await cur.fetchall()
-            return [await DatabaseBlock._get_fast_block(block, conn) for block in blocks]
+            # transaction_count and partial_solution_count are stored on the block row
+            return await cur.fetchall()
 
     async def get_latest_height(self) -> Optional[int]:
         async with self.pool.connection() as conn:
@@ -1040,6 +1198,28 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    @staticmethod
+    async def get_tip_state_with_cur(cur: psycopg.AsyncCursor[DictRow]) -> Optional[TipState]:
+        await cur.execute(
+            "SELECT height, block_hash, timestamp, coinbase_target, cumulative_proof_target, proof_target, total_supply "
+            "FROM block ORDER BY height DESC LIMIT 1"
+        )
+        if (res := await cur.fetchone()) is None:
+            return None
+        return TipState(
+            res["height"], BlockHash.loads(res["block_hash"]), res["timestamp"], res["coinbase_target"],
+            res["cumulative_proof_target"], res["proof_target"], res["total_supply"]
+        )
+
+    async def get_tip_state(self) -> Optional[TipState]:
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    return await self.get_tip_state_with_cur(cur)
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
+
     async def get_latest_block_timestamp(self) -> int:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -1067,6 +1247,19 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    async def get_latest_block_header(self) -> BlockHeader:
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    await cur.execute("SELECT * FROM block ORDER BY height DESC LIMIT 1")
+                    block = await cur.fetchone()
+                    if block is None:
+                        raise RuntimeError("no blocks in database")
+                    return self._get_block_header(block)
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
+
     async def get_latest_coinbase_target(self) -> int:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -1094,6 +1287,12 @@ class DatabaseBlock(DatabaseBase):
                     raise
 
     async def get_block_by_height(self, height: int) -> Block | None:
+        if (block := global_block_cache.get(height)) is not None:
+            return block
+        if self.block_segments is not None and (record := self.block_segments.get_with_size(height)) is not None:
+            block, size = record
+            global_block_cache.add(block, size)
+            return block
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
@@ -1119,7 +1318,9 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def get_block_header_by_height(self, height: int):
+    async def get_block_header_by_height(self, height: int) -> BlockHeader | None:
+        if (block := global_block_cache.peek(height)) is not None:
+            return block.header
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
@@ -1133,6 +1334,8 @@ class DatabaseBlock(DatabaseBase):
                     raise
 
     async def get_block_by_hash(self, block_hash: BlockHash | str) -> Block | None:
+        if (block := global_block_cache.get_by_hash(str(block_hash))) is not None:
+            return block
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
@@ -1158,6 +1361,27 @@ class DatabaseBlock(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    async def get_block_summary_by_height(self, height: int) -> Optional[dict[str, Any]]:
+        # the block row: header fields, rewards, supply and the per-block counters
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    await cur.execute("SELECT * FROM block WHERE height = %s", (height,))
+                    return await cur.fetchone()
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
+
+    async def get_block_summary_by_hash(self, block_hash: BlockHash | str) -> Optional[dict[str, Any]]:
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    await cur.execute("SELECT * FROM block WHERE block_hash = %s", (str(block_hash),))
+                    return await cur.fetchone()
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
+
     async def get_recent_blocks_fast(self, limit: int = 30):
         async with self.pool.connection() as conn:
             try:
@@ -1170,9 +1394,17 @@ class DatabaseBlock(DatabaseBase):
                 raise
 
     async def get_blocks_range(self, start: int, end: int):
+        archived: list[Block] = []
+        if self.block_segments is not None:
+            archived = self.block_segments.get_range(start, end)
+            if archived:
+                if archived[0].height == start:
+                    return archived
+                # blocks above the archive still come from the database
+                end = archived[0].height
         async with self.pool.connection() as conn:
             try:
-                return await DatabaseBlock.get_full_block_range(start, end, conn)
+                return await DatabaseBlock.get_full_block_range(start, end, conn) + archived
             except Exception as e:
                 await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                 raise
@@ -1185,6 +1417,35 @@ class DatabaseBlock(DatabaseBase):
                 await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                 raise
 
+    @staticmethod
+    async def _get_raw_block_data(start: int, end: int, conn: psycopg.AsyncConnection[DictRow]) -> dict[int, bytes]:
+        async with conn.cursor() as cur:
+            await cur.execute(
+                "SELECT b.height, r.data FROM block b JOIN block_raw r ON r.block_id = b.id "
+                "WHERE b.height >= %s AND b.height < %s",
+                (start, end)
+            )
+            return {res["height"]: res["data"] for res in await cur.fetchall()}
+
+    async def get_raw_block_data(self, start: int, end: int) -> dict[int, bytes]:
+        # exact Block.dump() bytes of heights [start, end) from the segment store or block_raw,
+        # blocks only kept in the tables are left out as rebuilding them loses signatures and checksums
+        data: dict[int, bytes] = {}
+        if self.block_segments is not None:
+            for height in range(start, min(end, self.block_segments.next_height)):
+                if (record := self.block_segments.get_raw(height)) is not None:
+                    data[height] = record
+        if len(data) == end - start:
+            return data
+        async with self.pool.connection() as conn:
+            try:
+                for height, record in (await DatabaseBlock._get_raw_block_data(start, end, conn)).items():
+                    data.setdefault(height, record)
+                return data
+            except Exception as e:
+                await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                raise
+
     async def get_block_coinbase_reward_by_height(self, height: int) -> Optional[int]:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -4,7 +4,8 @@ from __future__ import annotations
 import os
 import signal
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import AbstractAsyncContextManager, nullcontext
 
 import psycopg.sql
 from psycopg.rows import DictRow
@@ -13,9 +14,15 @@ from redis.asyncio import Redis
 from aleo_types import *
 from aleo_types.cached import cached_get_key_id, cached_get_mapping_id, cached_compute_key_to_address
 from disasm.utils import value_type_to_mode_type_str, plaintext_type_to_str
-from explorer.types import Message as ExplorerMessage
-from util.global_cache import global_mapping_cache
+from explorer.types import Message as ExplorerMessage, TipState
+from util.block_segments import BlockSegmentStore
+from util.global_cache import global_mapping_cache, global_mapping_registry, global_program_cache, MappingCacheDict
+from util.redis_journal import RedisJournal
+from .address import DatabaseAddress
 from .base import DatabaseBase, profile
+from .block import DatabaseBlock
+from .leaderboard import DatabaseLeaderboard
+from .mapping import MappingBuffer
 from .util import DatabaseUtil
 
 
@@ -39,11 +46,326 @@ class _SupplyTracker:
         self.supply -= delta
 
 
+class _AddressStats:
+    # Changes to the address_* redis hashes of a block, summed per address and written with one pipeline,
+    # together with their all time and daily leaderboards.
+
+    def __init__(self):
+        self.deltas: defaultdict[str, defaultdict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, key: str, address: str, amount: int):
+        self.deltas[key][address] += amount
+
+    async def apply(self, redis_conn: Redis[str], journal: RedisJournal, timestamp: int):
+        if not self.deltas:
+            return
+        day = timestamp // 86400
+        for key, deltas in self.deltas.items():
+            await journal.save(key, deltas)
+            await journal.save_scores(DatabaseLeaderboard.leaderboard_key(key), deltas)
+            await journal.save_scores(DatabaseLeaderboard.leaderboard_key(key, day), deltas)
+        pipe = redis_conn.pipeline()
+        for key, deltas in self.deltas.items():
+            for address, amount in deltas.items():
+                pipe.hincrby(key, address, amount)
+                pipe.zincrby(DatabaseLeaderboard.leaderboard_key(key), amount, address)
+                pipe.zincrby(DatabaseLeaderboard.leaderboard_key(key, day), amount, address)
+        await pipe.execute() # type: ignore
+
+
+class _CopyBuffer:
+    # Rows are collected here with ids reserved from the sequences, and written with COPY
+    # in flush() instead of one INSERT ... RETURNING per row.
+
+    sequences: dict[str, str] = {}
+
+    def __init__(self):
+        self.ids: dict[str, deque[int]] = {table: deque() for table in self.sequences}
+
+    async def _reserve(self, cur: psycopg.AsyncCursor[DictRow], counts: dict[str, int]):
+        counts = {table: count for table, count in counts.items() if count > 0}
+        if not counts:
+            return
+        # noinspection SqlResolve
+        query = psycopg.sql.SQL("SELECT {}").format(psycopg.sql.SQL(", ").join(
+            psycopg.sql.SQL("ARRAY(SELECT nextval({}) FROM generate_series(1, %s)) AS {}").format(
+                psycopg.sql.Literal(self.sequences[table]), psycopg.sql.Identifier(table)
+            ) for table in counts
+        ))
+        await cur.execute(query, list(counts.values()))
+        if (res := await cur.fetchone()) is None:
+            raise RuntimeError("failed to reserve ids")
+        for table in counts:
+            self.ids[table].extend(res[table])
+
+    async def next_id(self, cur: psycopg.AsyncCursor[DictRow], table: str) -> int:
+        if not self.ids[table]:
+            await self._reserve(cur, {table: 1})
+        return self.ids[table].popleft()
+
+    @staticmethod
+    async def _copy(cur: psycopg.AsyncCursor[DictRow], statement: str, rows: list[Any]):
+        if not rows:
+            return
+        async with cur.copy(statement) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+class _FinalizeOperationBuffer(_CopyBuffer):
+
+    sequences = {
+        "finalize_operation": "finalize_operation_id_seq",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.finalize_operation: list[tuple[int, int, str, int]] = []
+        self.initialize_mapping: list[tuple[int, str]] = []
+        self.insert_kv: list[tuple[int, str, str, str]] = []
+        self.update_kv: list[tuple[int, str, str, str]] = []
+        self.remove_kv: list[tuple[int, str, str]] = []
+        self.replace_mapping: list[tuple[int, str]] = []
+        self.remove_mapping: list[tuple[int, str]] = []
+
+    async def reserve(self, cur: psycopg.AsyncCursor[DictRow], block: Block):
+        await self._reserve(cur, {"finalize_operation": sum(len(ct.finalize) for ct in block.transactions)})
+
+    async def add(self, cur: psycopg.AsyncCursor[DictRow], confirmed_transaction_db_id: int, index: int,
+                  finalize_operation: FinalizeOperation):
+        finalize_operation_db_id = await self.next_id(cur, "finalize_operation")
+        self.finalize_operation.append((finalize_operation_db_id, confirmed_transaction_db_id, finalize_operation.type.name, index))
+        if isinstance(finalize_operation, InitializeMapping):
+            self.initialize_mapping.append((finalize_operation_db_id, str(finalize_operation.mapping_id)))
+        elif isinstance(finalize_operation, InsertKeyValue):
+            self.insert_kv.append((
+                finalize_operation_db_id, str(finalize_operation.mapping_id),
+                str(finalize_operation.key_id), str(finalize_operation.value_id)
+            ))
+        elif isinstance(finalize_operation, UpdateKeyValue):
+            self.update_kv.append((
+                finalize_operation_db_id, str(finalize_operation.mapping_id),
+                str(finalize_operation.key_id), str(finalize_operation.value_id)
+            ))
+        elif isinstance(finalize_operation, RemoveKeyValue):
+            self.remove_kv.append((
+                finalize_operation_db_id, str(finalize_operation.mapping_id), str(finalize_operation.key_id)
+            ))
+        elif isinstance(finalize_operation, ReplaceMapping):
+            self.replace_mapping.append((finalize_operation_db_id, str(finalize_operation.mapping_id)))
+        elif isinstance(finalize_operation, RemoveMapping):
+            self.remove_mapping.append((finalize_operation_db_id, str(finalize_operation.mapping_id)))
+
+    async def flush(self, cur: psycopg.AsyncCursor[DictRow]):
+        await self._copy(cur, "COPY finalize_operation (id, confirmed_transaction_id, type, index) FROM STDIN", self.finalize_operation)
+        await self._copy(
+            cur, "COPY finalize_operation_initialize_mapping (finalize_operation_id, mapping_id) FROM STDIN",
+            self.initialize_mapping
+        )
+        await self._copy(
+            cur, "COPY finalize_operation_insert_kv (finalize_operation_id, mapping_id, key_id, value_id) FROM STDIN",
+            self.insert_kv
+        )
+        await self._copy(
+            cur, "COPY finalize_operation_update_kv (finalize_operation_id, mapping_id, key_id, value_id) FROM STDIN",
+            self.update_kv
+        )
+        await self._copy(
+            cur, "COPY finalize_operation_remove_kv (finalize_operation_id, mapping_id, key_id) FROM STDIN",
+            self.remove_kv
+        )
+        await self._copy(
+            cur, "COPY finalize_operation_replace_mapping (finalize_operation_id, mapping_id) FROM STDIN",
+            self.replace_mapping
+        )
+        await self._copy(
+            cur, "COPY finalize_operation_remove_mapping (finalize_operation_id, mapping_id) FROM STDIN",
+            self.remove_mapping
+        )
+
+
+class _TransitionBuffer(_CopyBuffer):
+
+    sequences = {
+        "transition": "transition_id_seq",
+        "transition_input": "transition_input_id_seq",
+        "transition_output": "transition_output_id_seq",
+        "transition_output_future": "transition_finalize_future_id_seq",
+        "future": "future_id_seq",
+        "future_argument": "transition_finalize_future_argument_id_seq",
+        "confirmed_transaction": "confirmed_transaction_id_seq",
+        "transaction": "transaction_id_seq",
+        "transaction_deploy": "transaction_deployment_id_seq",
+        "transaction_execute": "execute_transaction_id_seq",
+        "fee": "fee_id_seq",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.transition: list[tuple[int, str, Optional[int], Optional[int], str, str, str, str, int, str]] = []
+        self.transition_input: list[tuple[int, int, str, int]] = []
+        self.transition_input_public: list[tuple[int, str, Optional[bytes]]] = []
+        self.transition_input_private: list[tuple[int, str, Optional[str]]] = []
+        self.transition_input_record: list[tuple[int, str, str]] = []
+        self.transition_input_external_record: list[tuple[int, str]] = []
+        self.transition_output: list[tuple[int, int, str, int]] = []
+        self.transition_output_public: list[tuple[int, str, Optional[bytes]]] = []
+        self.transition_output_private: list[tuple[int, str, Optional[str]]] = []
+        self.transition_output_record: list[tuple[int, str, str, Optional[str]]] = []
+        self.transition_output_external_record: list[tuple[int, str]] = []
+        self.transition_output_future: list[tuple[int, int, str]] = []
+        # futures and their arguments reference each other, so they are written level by level
+        self.future: list[list[tuple[int, str, Optional[int], Optional[int], str, str]]] = []
+        self.future_argument: list[list[tuple[int, int, str, Optional[bytes]]]] = []
+        self.address_transition: list[tuple[str, int]] = []
+        self.function_calls: dict[tuple[str, str], int] = defaultdict(int)
+        # transition ids already in the database, loaded for the whole block so each transaction doesn't query them
+        self.existing_transitions: Optional[set[str]] = None
+
+    @staticmethod
+    def _count_futures(future: Future, counts: dict[str, int]):
+        counts["future"] += 1
+        counts["future_argument"] += len(future.arguments)
+        for argument in future.arguments:
+            if isinstance(argument, FutureArgument):
+                _TransitionBuffer._count_futures(argument.future, counts)
+
+    @staticmethod
+    def transaction_transitions(transaction: Transaction, confirmed_transaction: Optional[ConfirmedTransaction] = None) -> list[Transition]:
+        transitions: list[Transition] = []
+        if isinstance(transaction, DeployTransaction):
+            transitions.append(cast(Fee, transaction.fee).transition)
+        elif isinstance(transaction, ExecuteTransaction):
+            transitions.extend(transaction.execution.transitions)
+            if (fee := cast(Option[Fee], transaction.fee).value) is not None:
+                transitions.append(fee.transition)
+        elif isinstance(transaction, FeeTransaction):
+            transitions.append(cast(Fee, transaction.fee).transition)
+            if isinstance(confirmed_transaction, RejectedExecute):
+                transitions.extend(cast(RejectedExecution, confirmed_transaction.rejected).execution.transitions)
+        return transitions
+
+    async def reserve(self, cur: psycopg.AsyncCursor[DictRow], transitions: list[Transition],
+                      confirmed_transactions: Optional[list[ConfirmedTransaction]] = None):
+        counts: dict[str, int] = {table: 0 for table in self.sequences}
+        # rows of transactions seen before are not inserted again, their ids are left unused
+        for ct in confirmed_transactions or []:
+            counts["confirmed_transaction"] += 1
+            counts["transaction"] += 1
+            transaction = ct.transaction
+            if isinstance(transaction, DeployTransaction) or isinstance(ct, RejectedDeploy):
+                counts["transaction_deploy"] += 1
+                counts["fee"] += 1
+            elif isinstance(transaction, ExecuteTransaction):
+                counts["transaction_execute"] += 1
+                if cast(Option[Fee], transaction.fee).value is not None:
+                    counts["fee"] += 1
+            elif isinstance(ct, RejectedExecute):
+                counts["transaction_execute"] += 1
+                counts["fee"] += 1
+        for transition in transitions:
+            counts["transition"] += 1
+            counts["transition_input"] += len(transition.inputs)
+            counts["transition_output"] += len(transition.outputs)
+            for output in transition.outputs:
+                if isinstance(output, FutureTransitionOutput):
+                    counts["transition_output_future"] += 1
+                    if output.future.value is not None:
+                        self._count_futures(output.future.value, counts)
+        await self._reserve(cur, counts)
+
+    async def load_existing_transitions(self, cur: psycopg.AsyncCursor[DictRow], transitions: list[Transition]):
+        await cur.execute(
+            "SELECT transition_id FROM transition WHERE transition_id = ANY(%s::text[])",
+            ([str(transition.id) for transition in transitions],)
+        )
+        self.existing_transitions = {res["transition_id"] for res in await cur.fetchall()}
+
+    def add_addresses(self, plaintext: Plaintext, transition_db_id: int):
+        if isinstance(plaintext, LiteralPlaintext) and plaintext.literal.type == Literal.Type.Address:
+            self.address_transition.append((str(plaintext.literal.primitive), transition_db_id))
+        elif isinstance(plaintext, StructPlaintext):
+            for address in DatabaseUtil.get_addresses_from_struct(plaintext):
+                self.address_transition.append((address, transition_db_id))
+
+    async def flush(self, cur: psycopg.AsyncCursor[DictRow]):
+        async def copy(statement: str, rows: list[Any]):
+            await self._copy(cur, statement, rows)
+
+        await copy(
+            "COPY transition (id, transition_id, transaction_execute_id, fee_id, program_id, "
+            "function_name, tpk, tcm, index, scm) FROM STDIN",
+            self.transition
+        )
+        await copy("COPY transition_input (id, transition_id, type, index) FROM STDIN", self.transition_input)
+        await copy(
+            "COPY transition_input_public (transition_input_id, plaintext_hash, plaintext) FROM STDIN",
+            self.transition_input_public
+        )
+        await copy(
+            "COPY transition_input_private (transition_input_id, ciphertext_hash, ciphertext) FROM STDIN",
+            self.transition_input_private
+        )
+        await copy(
+            "COPY transition_input_record (transition_input_id, serial_number, tag) FROM STDIN",
+            self.transition_input_record
+        )
+        await copy(
+            "COPY transition_input_external_record (transition_input_id, commitment) FROM STDIN",
+            self.transition_input_external_record
+        )
+        await copy("COPY transition_output (id, transition_id, type, index) FROM STDIN", self.transition_output)
+        await copy(
+            "COPY transition_output_public (transition_output_id, plaintext_hash, plaintext) FROM STDIN",
+            self.transition_output_public
+        )
+        await copy(
+            "COPY transition_output_private (transition_output_id, ciphertext_hash, ciphertext) FROM STDIN",
+            self.transition_output_private
+        )
+        await copy(
+            "COPY transition_output_record (transition_output_id, commitment, checksum, record_ciphertext) FROM STDIN",
+            self.transition_output_record
+        )
+        await copy(
+            "COPY transition_output_external_record (transition_output_id, commitment) FROM STDIN",
+            self.transition_output_external_record
+        )
+        await copy(
+            "COPY transition_output_future (id, transition_output_id, future_hash) FROM STDIN",
+            self.transition_output_future
+        )
+        for depth, futures in enumerate(self.future):
+            await copy(
+                "COPY future (id, type, transition_output_future_id, future_argument_id, program_id, function_name) FROM STDIN",
+                futures
+            )
+            # every argument has a reserved id, readers order arguments by id
+            await copy(
+                "COPY future_argument (id, future_id, type, plaintext) FROM STDIN",
+                self.future_argument[depth] if depth < len(self.future_argument) else []
+            )
+        await copy("COPY address_transition (address, transition_id) FROM STDIN", self.address_transition)
+
+        if self.function_calls:
+            program_ids = list({program_id for program_id, _ in self.function_calls})
+            await cur.execute("SELECT program_id FROM program WHERE program_id = ANY(%s::text[])", (program_ids,))
+            if len(await cur.fetchall()) != len(program_ids):
+                raise RuntimeError("program in transition does not exist - unconfirmed transaction?")
+            await cur.execute(
+                "UPDATE program_function pf SET called = pf.called + c.count "
+                "FROM program p, unnest(%s::text[], %s::text[], %s::int[]) AS c(program_id, name, count) "
+                "WHERE pf.program_id = p.id AND p.program_id = c.program_id AND pf.name = c.name",
+                ([k[0] for k in self.function_calls], [k[1] for k in self.function_calls], list(self.function_calls.values()))
+            )
+
+
 class DatabaseInsert(DatabaseBase):
 
+    block_segments: Optional[BlockSegmentStore]
+
     def __init__(self, *args, **kwargs): # type: ignore
         super().__init__(*args, **kwargs)
-        self.redis_last_history_time = time.monotonic() - 10800
         self.redis_keys = [
             "credits.aleo:bonded",
             "credits.aleo:delegated",
@@ -54,97 +376,53 @@ class DatabaseInsert(DatabaseBase):
             "address_transfer_out",
             "address_fee",
         ]
+        self.redis_journal = RedisJournal(self.redis_keys)
+        # DB_PIPELINE=0 sends every statement of the block insert path and waits for it, for comparison
+        self.use_pipeline = os.environ.get("DB_PIPELINE", "1") == "1"
+        # keep Block.dump() of every block so full block reads don't rebuild it from the tables
+        self.store_raw_blocks = os.environ.get("DB_STORE_RAW_BLOCKS", "1") == "1"
+
+    def _pipeline(self, cur: psycopg.AsyncCursor[DictRow]) -> AbstractAsyncContextManager[Any]:
+        # statements that don't fetch results are sent without waiting for the previous ones
+        if self.use_pipeline:
+            return cur.connection.pipeline()
+        return nullcontext()
 
     @staticmethod
-    async def _insert_future(cur: psycopg.AsyncCursor[DictRow], future: Future,
-                             transition_output_future_db_id: Optional[int] = None, argument_db_id: Optional[int] = None,):
+    async def _insert_future(cur: psycopg.AsyncCursor[DictRow], buffer: _TransitionBuffer, future: Future, transition_db_id: int,
+                             transition_output_future_db_id: Optional[int] = None, argument_db_id: Optional[int] = None,
+                             depth: int = 0):
+        future_db_id = await buffer.next_id(cur, "future")
         if transition_output_future_db_id:
-            await cur.execute(
-                "INSERT INTO future (type, transition_output_future_id, program_id, function_name) "
-                "VALUES ('Output', %s, %s, %s) RETURNING id",
-                (transition_output_future_db_id, str(future.program_id), str(future.function_name))
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("failed to insert row into database")
-            future_db_id = res["id"]
-            await cur.execute(
-                "SELECT t.id FROM transition t "
-                "JOIN transition_output o on t.id = o.transition_id "
-                "JOIN transition_output_future tof on o.id = tof.transition_output_id "
-                "WHERE tof.id = %s",
-                (transition_output_future_db_id,)
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("database inconsistent")
-            transition_db_id = res["id"]
+            future_type = "Output"
         elif argument_db_id:
-            await cur.execute(
-                "INSERT INTO future (type, future_argument_id, program_id, function_name) "
-                "VALUES ('Argument', %s, %s, %s) RETURNING id",
-                (argument_db_id, str(future.program_id), str(future.function_name))
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("failed to insert row into database")
-            future_db_id = res["id"]
-            while True:
-                await cur.execute(
-                    "SELECT f.id, f.transition_output_future_id, f.future_argument_id FROM future f "
-                    "JOIN future_argument a on f.id = a.future_id "
-                    "WHERE a.id = %s",
-                    (argument_db_id,)
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise RuntimeError("database inconsistent")
-                if res["transition_output_future_id"]:
-                    transition_output_future_db_id = res["transition_output_future_id"]
-                    break
-                argument_db_id = res["future_argument_id"]
-            await cur.execute(
-                "SELECT t.id FROM transition t "
-                "JOIN transition_output o on t.id = o.transition_id "
-                "JOIN transition_output_future tof on o.id = tof.transition_output_id "
-                "WHERE tof.id = %s",
-                (transition_output_future_db_id,)
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("database inconsistent")
-            transition_db_id = res["id"]
+            future_type = "Argument"
         else:
             raise ValueError("transition_output_db_id or argument_db_id must be set")
+        while len(buffer.future) <= depth:
+            buffer.future.append([])
+            buffer.future_argument.append([])
+        buffer.future[depth].append((
+            future_db_id, future_type, transition_output_future_db_id, argument_db_id,
+            str(future.program_id), str(future.function_name)
+        ))
         for argument in future.arguments:
             if isinstance(argument, PlaintextArgument):
                 plaintext = argument.plaintext
-                await cur.execute(
-                    "INSERT INTO future_argument (future_id, type, plaintext) VALUES (%s, %s, %s)",
-                    (future_db_id, argument.type.name, plaintext.dump())
-                )
-                if isinstance(plaintext, LiteralPlaintext) and plaintext.literal.type == Literal.Type.Address:
-                    address = str(plaintext.literal.primitive)
-                    await cur.execute(
-                        "INSERT INTO address_transition (address, transition_id) VALUES (%s, %s)",
-                        (address, transition_db_id)
-                    )
-                elif isinstance(plaintext, StructPlaintext):
-                    addresses = DatabaseUtil.get_addresses_from_struct(plaintext)
-                    for address in addresses:
-                        await cur.execute(
-                            "INSERT INTO address_transition (address, transition_id) VALUES (%s, %s)",
-                            (address, transition_db_id)
-                        )
+                argument_db_id = await buffer.next_id(cur, "future_argument")
+                buffer.future_argument[depth].append((argument_db_id, future_db_id, argument.type.name, plaintext.dump()))
+                buffer.add_addresses(plaintext, transition_db_id)
 
             elif isinstance(argument, FutureArgument):
-                await cur.execute(
-                    "INSERT INTO future_argument (future_id, type) VALUES (%s, %s) RETURNING id",
-                    (future_db_id, argument.type.name)
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise RuntimeError("failed to insert row into database")
-                argument_db_id = res["id"]
-                await DatabaseInsert._insert_future(cur, argument.future, argument_db_id=argument_db_id)
+                argument_db_id = await buffer.next_id(cur, "future_argument")
+                buffer.future_argument[depth].append((argument_db_id, future_db_id, argument.type.name, None))
+                await DatabaseInsert._insert_future(cur, buffer, argument.future, transition_db_id,
+                                                    argument_db_id=argument_db_id, depth=depth + 1)
             else:
                 raise NotImplementedError
 
-    async def _update_address_stats(self, transaction: Transaction):
+    async def _update_address_stats(self, cur: psycopg.AsyncCursor[DictRow], address_stats: _AddressStats,
+                                    transaction: Transaction):
 
         if isinstance(transaction, DeployTransaction):
             transitions = [cast(Fee, transaction.fee).transition]
@@ -198,17 +476,17 @@ class DatabaseInsert(DatabaseBase):
                     output = cast(FutureTransitionOutput, transition.outputs[0])
                     future = cast(Future, output.future.value)
                     staker_plaintext = cast(LiteralPlaintext, cast(PlaintextArgument, future.arguments[0]).plaintext)
-                    unbonding_key_id = cached_get_key_id("credits.aleo", "unbonding", staker_plaintext.dump())
-                    withdraw_key_id = cached_get_key_id("credits.aleo", "withdraw", staker_plaintext.dump())
-                    from db.mapping import DatabaseMapping
-                    unbonding_bytes = await cast(DatabaseMapping, self).get_mapping_value("credits.aleo", "unbonding", unbonding_key_id)
-                    if unbonding_bytes is None:
+                    unbonding_key_id = Field.loads(cached_get_key_id("credits.aleo", "unbonding", staker_plaintext.dump()))
+                    withdraw_key_id = Field.loads(cached_get_key_id("credits.aleo", "withdraw", staker_plaintext.dump()))
+                    # runs before the block is finalized, so the cache still has the unbonding entry
+                    unbonding_data = (await self._get_credits_mapping_cache(cur, "unbonding")).get(unbonding_key_id)
+                    if unbonding_data is None:
                         raise RuntimeError("unbonding key not found")
-                    unbonding = cast(StructPlaintext, cast(PlaintextValue, Value.load(BytesIO(unbonding_bytes))).plaintext)
-                    withdraw_bytes = await cast(DatabaseMapping, self).get_mapping_value("credits.aleo", "withdraw", withdraw_key_id)
-                    if withdraw_bytes is None:
+                    unbonding = cast(StructPlaintext, cast(PlaintextValue, unbonding_data["value"]).plaintext)
+                    withdraw_data = (await self._get_credits_mapping_cache(cur, "withdraw")).get(withdraw_key_id)
+                    if withdraw_data is None:
                         raise RuntimeError("withdraw key not found")
-                    withdraw = cast(LiteralPlaintext, cast(PlaintextValue, Value.load(BytesIO(withdraw_bytes))).plaintext)
+                    withdraw = cast(LiteralPlaintext, cast(PlaintextValue, withdraw_data["value"]).plaintext)
                     transfer_to = str(withdraw.literal.primitive)
                     amount = int(cast(u64, cast(LiteralPlaintext, unbonding["microcredits"]).literal.primitive))
                 else:
@@ -216,290 +494,194 @@ class DatabaseInsert(DatabaseBase):
 
                 if transfer_from != transfer_to:
                     if transfer_from is not None:
-                        await self.redis.hincrby("address_transfer_out", transfer_from, amount) # type: ignore
+                        address_stats.add("address_transfer_out", transfer_from, amount)
                     if transfer_to is not None:
-                        await self.redis.hincrby("address_transfer_in", transfer_to, amount) # type: ignore
+                        address_stats.add("address_transfer_in", transfer_to, amount)
 
                 if fee_from is not None:
-                    await self.redis.hincrby("address_fee", fee_from, amount) # type: ignore
+                    address_stats.add("address_fee", fee_from, amount)
+
+    async def _get_credits_mapping_cache(self, cur: psycopg.AsyncCursor[DictRow], mapping: str) -> MappingCacheDict:
+        mapping_id = Field.loads(cached_get_mapping_id("credits.aleo", mapping))
+        if mapping_id not in global_mapping_cache:
+            from interpreter.finalizer import mapping_cache_read_with_cur
+            global_mapping_cache[mapping_id] = await mapping_cache_read_with_cur(cast("Database", self), cur, "credits.aleo", mapping)
+        return global_mapping_cache[mapping_id]
+
+    @staticmethod
+    async def _insert_transitions(cur: psycopg.AsyncCursor[DictRow], buffer: _TransitionBuffer,
+                                  exe_tx_db_id: Optional[int], fee_db_id: Optional[int],
+                                  transitions: list[Transition], is_rejected: bool = False, should_exist: bool = False):
+        if buffer.existing_transitions is None:
+            await cur.execute(
+                "SELECT transition_id FROM transition WHERE transition_id = ANY(%s::text[])",
+                ([str(transition.id) for transition in transitions],)
+            )
+            existing = {res["transition_id"] for res in await cur.fetchall()}
+        else:
+            existing = buffer.existing_transitions
+        for ts_index, transition in enumerate(transitions):
+            if str(transition.id) in existing:
+                if not is_rejected or not should_exist:
+                    raise RuntimeError("transition already exists in database")
+                continue
+            await DatabaseInsert._insert_transition(cur, buffer, exe_tx_db_id, fee_db_id, transition, ts_index)
 
     @staticmethod
-    async def _insert_transition(cur: psycopg.AsyncCursor[DictRow], redis_conn: Redis[str],
+    async def _insert_transition(cur: psycopg.AsyncCursor[DictRow], buffer: _TransitionBuffer,
                                  exe_tx_db_id: Optional[int], fee_db_id: Optional[int],
-                                 transition: Transition, ts_index: int, is_rejected: bool = False, should_exist: bool = False):
-        await cur.execute(
-            "SELECT id FROM transition WHERE transition_id = %s", (str(transition.id),)
-        )
-        if await cur.fetchone() is not None:
-            if not is_rejected or not should_exist:
-                raise RuntimeError("transition already exists in database")
-            else:
-                return
-        await cur.execute(
-            "INSERT INTO transition (transition_id, transaction_execute_id, fee_id, program_id, "
-            "function_name, tpk, tcm, index, scm) "
-            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
-            (str(transition.id), exe_tx_db_id, fee_db_id, str(transition.program_id),
-             str(transition.function_name), str(transition.tpk), str(transition.tcm), ts_index, str(transition.scm))
-        )
-        if (res := await cur.fetchone()) is None:
-            raise RuntimeError("failed to insert row into database")
-        transition_db_id = res["id"]
+                                 transition: Transition, ts_index: int):
+        transition_db_id = await buffer.next_id(cur, "transition")
+        buffer.transition.append((
+            transition_db_id, str(transition.id), exe_tx_db_id, fee_db_id, str(transition.program_id),
+            str(transition.function_name), str(transition.tpk), str(transition.tcm), ts_index, str(transition.scm)
+        ))
 
         transition_input: TransitionInput
         for input_index, transition_input in enumerate(transition.inputs):
-            await cur.execute(
-                "INSERT INTO transition_input (transition_id, type, index) VALUES (%s, %s, %s) RETURNING id",
-                (transition_db_id, transition_input.type.name, input_index)
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("failed to insert row into database")
-            transition_input_db_id = res["id"]
+            transition_input_db_id = await buffer.next_id(cur, "transition_input")
+            buffer.transition_input.append((transition_input_db_id, transition_db_id, transition_input.type.name, input_index))
             if isinstance(transition_input, PublicTransitionInput):
-                await cur.execute(
-                    "INSERT INTO transition_input_public (transition_input_id, plaintext_hash, plaintext) "
-                    "VALUES (%s, %s, %s)",
-                    (transition_input_db_id, str(transition_input.plaintext_hash),
-                     transition_input.plaintext.dump_nullable())
-                )
+                buffer.transition_input_public.append((
+                    transition_input_db_id, str(transition_input.plaintext_hash), transition_input.plaintext.dump_nullable()
+                ))
                 if transition_input.plaintext.value is not None:
-                    plaintext = transition_input.plaintext.value
-                    if isinstance(plaintext, LiteralPlaintext) and plaintext.literal.type == Literal.Type.Address:
-                        address = str(plaintext.literal.primitive)
-                        await cur.execute(
-                            "INSERT INTO address_transition (address, transition_id) VALUES (%s, %s)",
-                            (address, transition_db_id)
-                        )
-                    elif isinstance(plaintext, StructPlaintext):
-                        addresses = DatabaseUtil.get_addresses_from_struct(plaintext)
-                        for address in addresses:
-                            await cur.execute(
-                                "INSERT INTO address_transition (address, transition_id) VALUES (%s, %s)",
-                                (address, transition_db_id)
-                            )
+                    buffer.add_addresses(transition_input.plaintext.value, transition_db_id)
             elif isinstance(transition_input, PrivateTransitionInput):
-                await cur.execute(
-                    "INSERT INTO transition_input_private (transition_input_id, ciphertext_hash, ciphertext) "
-                    "VALUES (%s, %s, %s)",
-                    (transition_input_db_id, str(transition_input.ciphertext_hash),
-                     transition_input.ciphertext.dumps())
-                )
+                buffer.transition_input_private.append((
+                    transition_input_db_id, str(transition_input.ciphertext_hash), transition_input.ciphertext.dumps()
+                ))
             elif isinstance(transition_input, RecordTransitionInput):
-                await cur.execute(
-                    "INSERT INTO transition_input_record (transition_input_id, serial_number, tag) "
-                    "VALUES (%s, %s, %s)",
-                    (transition_input_db_id, str(transition_input.serial_number),
-                     str(transition_input.tag))
-                )
+                buffer.transition_input_record.append((
+                    transition_input_db_id, str(transition_input.serial_number), str(transition_input.tag)
+                ))
             elif isinstance(transition_input, ExternalRecordTransitionInput):
-                await cur.execute(
-                    "INSERT INTO transition_input_external_record (transition_input_id, commitment) "
-                    "VALUES (%s, %s)",
-                    (transition_input_db_id, str(transition_input.input_commitment))
-                )
+                buffer.transition_input_external_record.append((
+                    transition_input_db_id, str(transition_input.input_commitment)
+                ))
 
             else:
                 raise NotImplementedError
 
         transition_output: TransitionOutput
         for output_index, transition_output in enumerate(transition.outputs):
-            await cur.execute(
-                "INSERT INTO transition_output (transition_id, type, index) VALUES (%s, %s, %s) RETURNING id",
-                (transition_db_id, transition_output.type.name, output_index)
-            )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("failed to insert row into database")
-            transition_output_db_id = res["id"]
+            transition_output_db_id = await buffer.next_id(cur, "transition_output")
+            buffer.transition_output.append((transition_output_db_id, transition_db_id, transition_output.type.name, output_index))
             if isinstance(transition_output, PublicTransitionOutput):
-                await cur.execute(
-                    "INSERT INTO transition_output_public (transition_output_id, plaintext_hash, plaintext) "
-                    "VALUES (%s, %s, %s)",
-                    (transition_output_db_id, str(transition_output.plaintext_hash),
-                     transition_output.plaintext.dump_nullable())
-                )
+                buffer.transition_output_public.append((
+                    transition_output_db_id, str(transition_output.plaintext_hash), transition_output.plaintext.dump_nullable()
+                ))
             elif isinstance(transition_output, PrivateTransitionOutput):
-                await cur.execute(
-                    "INSERT INTO transition_output_private (transition_output_id, ciphertext_hash, ciphertext) "
-                    "VALUES (%s, %s, %s)",
-                    (transition_output_db_id, str(transition_output.ciphertext_hash),
-                     transition_output.ciphertext.dumps())
-                )
+                buffer.transition_output_private.append((
+                    transition_output_db_id, str(transition_output.ciphertext_hash), transition_output.ciphertext.dumps()
+                ))
             elif isinstance(transition_output, RecordTransitionOutput):
-                await cur.execute(
-                    "INSERT INTO transition_output_record (transition_output_id, commitment, checksum, record_ciphertext) "
-                    "VALUES (%s, %s, %s, %s)",
-                    (transition_output_db_id, str(transition_output.commitment),
-                     str(transition_output.checksum), transition_output.record_ciphertext.dumps())
-                )
+                buffer.transition_output_record.append((
+                    transition_output_db_id, str(transition_output.commitment), str(transition_output.checksum),
+                    transition_output.record_ciphertext.dumps()
+                ))
             elif isinstance(transition_output, ExternalRecordTransitionOutput):
-                await cur.execute(
-                    "INSERT INTO transition_output_external_record (transition_output_id, commitment) "
-                    "VALUES (%s, %s)",
-                    (transition_output_db_id, str(transition_output.commitment))
-                )
+                buffer.transition_output_external_record.append((transition_output_db_id, str(transition_output.commitment)))
             elif isinstance(transition_output, FutureTransitionOutput):
-                await cur.execute(
-                    "INSERT INTO transition_output_future (transition_output_id, future_hash) "
-                    "VALUES (%s, %s) RETURNING id",
-                    (transition_output_db_id, str(transition_output.future_hash))
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise Exception("failed to insert row into database")
-                transition_output_future_db_id = res["id"]
+                transition_output_future_db_id = await buffer.next_id(cur, "transition_output_future")
+                buffer.transition_output_future.append((
+                    transition_output_future_db_id, transition_output_db_id, str(transition_output.future_hash)
+                ))
                 if transition_output.future.value is not None:
-                    await DatabaseInsert._insert_future(cur, transition_output.future.value, transition_output_future_db_id)
+                    await DatabaseInsert._insert_future(cur, buffer, transition_output.future.value, transition_db_id,
+                                                        transition_output_future_db_id)
             else:
                 raise NotImplementedError
 
-        await cur.execute(
-            "SELECT id FROM program WHERE program_id = %s", (str(transition.program_id),)
-        )
-        if (res := await cur.fetchone()) is None:
-            raise RuntimeError("program in transition does not exist - unconfirmed transaction?")
-        program_db_id = res["id"]
-        await cur.execute(
-            "UPDATE program_function SET called = called + 1 WHERE program_id = %s AND name = %s",
-            (program_db_id, str(transition.function_name))
-        )
+        buffer.function_calls[(str(transition.program_id), str(transition.function_name))] += 1
 
 
     @staticmethod
-    async def _insert_deploy_transaction(cur: psycopg.AsyncCursor[DictRow], redis: Redis[str],
+    async def _insert_deploy_transaction(cur: psycopg.AsyncCursor[DictRow], redis: Redis[str], buffer: _TransitionBuffer,
                                          deployment: Deployment, owner: ProgramOwner, fee: Fee, transaction_db_id: int,
-                                         is_unconfirmed: bool = False, is_rejected: bool = False, fee_should_exist: bool = False):
+                                         is_unconfirmed: bool = False, is_rejected: bool = False, fee_should_exist: bool = False,
+                                         new_transaction: bool = False) -> Optional[int]:
+        # returns the transaction_deploy id, or None if it existed already
         if is_unconfirmed or is_rejected:
             program_id = str(deployment.program.id)
             owner_db = str(owner.address)
         else:
             program_id = None
             owner_db = None
+        if not new_transaction:
+            await cur.execute(
+                "SELECT id FROM transaction_deploy WHERE transaction_id = %s", (transaction_db_id,)
+            )
+            if await cur.fetchone() is not None:
+                if not fee_should_exist:
+                    raise RuntimeError("transaction deploy already exists in database")
+                else:
+                    return None
+        deploy_db_id = await buffer.next_id(cur, "transaction_deploy")
         await cur.execute(
-            "SELECT id FROM transaction_deploy WHERE transaction_id = %s", (transaction_db_id,)
-        )
-        if await cur.fetchone() is not None:
-            if not fee_should_exist:
-                raise RuntimeError("transaction deploy already exists in database")
-            else:
-                return
-        await cur.execute(
-            "INSERT INTO transaction_deploy (transaction_id, edition, verifying_keys, program_id, owner) "
-            "VALUES (%s, %s, %s, %s, %s) RETURNING id",
-            (transaction_db_id, deployment.edition, deployment.verifying_keys.dump(), program_id, owner_db)
+            "INSERT INTO transaction_deploy (id, transaction_id, edition, verifying_keys, program_id, owner) "
+            "VALUES (%s, %s, %s, %s, %s, %s)",
+            (deploy_db_id, transaction_db_id, deployment.edition, deployment.verifying_keys.dump(), program_id, owner_db)
         )
-        if await cur.fetchone() is None:
-            raise RuntimeError("failed to insert row into database")
 
+        fee_db_id = await buffer.next_id(cur, "fee")
         await cur.execute(
-            "INSERT INTO fee (transaction_id, global_state_root, proof) "
-            "VALUES (%s, %s, %s) RETURNING id",
-            (transaction_db_id, str(fee.global_state_root), fee.proof.dumps())
+            "INSERT INTO fee (id, transaction_id, global_state_root, proof) VALUES (%s, %s, %s, %s)",
+            (fee_db_id, transaction_db_id, str(fee.global_state_root), fee.proof.dumps())
         )
-        if (res := await cur.fetchone()) is None:
-            raise RuntimeError("failed to insert row into database")
-        fee_db_id = res["id"]
 
-        await DatabaseInsert._insert_transition(cur, redis, None, fee_db_id, fee.transition, 0, is_rejected, fee_should_exist)
+        await DatabaseInsert._insert_transitions(cur, buffer, None, fee_db_id, [fee.transition], is_rejected, fee_should_exist)
+        return deploy_db_id
 
     @staticmethod
-    async def _insert_execute_transaction(cur: psycopg.AsyncCursor[DictRow], redis: Redis[str],
+    async def _insert_execute_transaction(cur: psycopg.AsyncCursor[DictRow], redis: Redis[str], buffer: _TransitionBuffer,
                                           execution: Execution, fee: Optional[Fee], transaction_db_id: int,
-                                          is_rejected: bool = False, ts_should_exist: bool = False):
-        await cur.execute(
-            "SELECT id FROM transaction_execute WHERE transaction_id = %s", (transaction_db_id,)
-        )
-        if await cur.fetchone() is not None:
-            if not ts_should_exist:
-                raise RuntimeError("transaction execute already exists in database")
-            else:
-                return
+                                          is_rejected: bool = False, ts_should_exist: bool = False,
+                                          new_transaction: bool = False):
+        if not new_transaction:
+            await cur.execute(
+                "SELECT id FROM transaction_execute WHERE transaction_id = %s", (transaction_db_id,)
+            )
+            if await cur.fetchone() is not None:
+                if not ts_should_exist:
+                    raise RuntimeError("transaction execute already exists in database")
+                else:
+                    return
+        execute_transaction_db_id = await buffer.next_id(cur, "transaction_execute")
         await cur.execute(
-            "INSERT INTO transaction_execute (transaction_id, global_state_root, proof) "
-            "VALUES (%s, %s, %s) RETURNING id",
-            (transaction_db_id, str(execution.global_state_root),
-             execution.proof.dumps())
+            "INSERT INTO transaction_execute (id, transaction_id, global_state_root, proof) VALUES (%s, %s, %s, %s)",
+            (execute_transaction_db_id, transaction_db_id, str(execution.global_state_root), execution.proof.dumps())
         )
-        if (res := await cur.fetchone()) is None:
-            raise RuntimeError("failed to insert row into database")
-        execute_transaction_db_id = res["id"]
 
-        for ts_index, transition in enumerate(execution.transitions):
-            await DatabaseInsert._insert_transition(cur, redis, execute_transaction_db_id, None, transition, ts_index, is_rejected, ts_should_exist)
+        await DatabaseInsert._insert_transitions(cur, buffer, execute_transaction_db_id, None, list(execution.transitions), is_rejected, ts_should_exist)
 
         if fee:
+            fee_db_id = await buffer.next_id(cur, "fee")
             await cur.execute(
-                "INSERT INTO fee (transaction_id, global_state_root, proof) "
-                "VALUES (%s, %s, %s) RETURNING id",
-                (transaction_db_id, str(fee.global_state_root), fee.proof.dumps())
+                "INSERT INTO fee (id, transaction_id, global_state_root, proof) VALUES (%s, %s, %s, %s)",
+                (fee_db_id, transaction_db_id, str(fee.global_state_root), fee.proof.dumps())
             )
-            if (res := await cur.fetchone()) is None:
-                raise RuntimeError("failed to insert row into database")
-            fee_db_id = res["id"]
-            await DatabaseInsert._insert_transition(cur, redis, None, fee_db_id, fee.transition, 0, is_rejected, ts_should_exist)
+            await DatabaseInsert._insert_transitions(cur, buffer, None, fee_db_id, [fee.transition], is_rejected, ts_should_exist)
 
-    async def _insert_transaction(self, cur: psycopg.AsyncCursor[DictRow], redis: Redis[str], transaction: Transaction,
+    async def _insert_transaction(self, cur: psycopg.AsyncCursor[DictRow], redis: Redis[str], buffer: _TransitionBuffer, transaction: Transaction,
                                   confirmed_transaction: Optional[ConfirmedTransaction] = None, ct_index: Optional[int] = None,
                                   ignore_deploy_txids: Optional[list[str]] = None, confirmed_transaction_db_id: Optional[int] = None,
-                                  reject_reasons: Optional[list[Optional[str]]] = None):
+                                  reject_reasons: Optional[list[Optional[str]]] = None, first_seen: Optional[bool] = None):
         optionals = (confirmed_transaction, ct_index, confirmed_transaction_db_id, reject_reasons)
         if not (all(x is None for x in optionals) or all(x is not None for x in optionals)):
             raise ValueError("expected all or none of confirmed_transaction, ct_index, confirmed_transaction_db_id, reject_reasons to be set")
 
-        await cur.execute(
-            "SELECT transaction_id FROM transaction WHERE transaction_id = %s",
-            (str(transaction.id),)
-        )
-        if (await cur.fetchone()) is None: # first seen
+        # blocks pass first_seen from a batched lookup, with strange unconfirmed transactions already removed
+        if first_seen is None:
+            await cur.execute(
+                "SELECT transaction_id FROM transaction WHERE transaction_id = %s",
+                (str(transaction.id),)
+            )
+            first_seen = (await cur.fetchone()) is None
+        deploy_transaction_db_id: Optional[int] = None
+        if first_seen:
             prior_tx = False
             transaction_db_id: int = -1
-            # check for existing transactions and remove unconfirmed transactions
-            # wasteful for now, just a strange edge case avoidance
-            # TODO: refactor
-            if confirmed_transaction is not None:
-                if isinstance(confirmed_transaction, AcceptedDeploy):
-                    if not isinstance(transaction, DeployTransaction):
-                        raise RuntimeError("expected a deploy transaction for accepted deploy")
-                    fee = cast(Fee, transaction.fee)
-                    find_transition_id = fee.transition.id
-                    await cur.execute(
-                        "SELECT tx.id, tx.transaction_id FROM transaction tx "
-                        "JOIN fee f on tx.id = f.transaction_id "
-                        "JOIN transition t on f.id = t.fee_id "
-                        "WHERE t.transition_id = %s AND tx.confirmed_transaction_id IS NULL",
-                        (str(find_transition_id),)
-                    )
-                    res = await cur.fetchall()
-                elif isinstance(confirmed_transaction, AcceptedExecute):
-                    if not isinstance(transaction, ExecuteTransaction):
-                        raise RuntimeError("expected an execute transaction for accepted execute")
-                    find_transition_ids = list(map(lambda x: str(x.id), transaction.execution.transitions))
-                    await cur.execute(
-                        "SELECT tx.id, tx.transaction_id FROM transaction tx "
-                        "JOIN transaction_execute te on tx.id = te.transaction_id "
-                        "JOIN transition t on te.id = t.transaction_execute_id "
-                        "WHERE t.transition_id = ANY(%s::text[]) AND tx.confirmed_transaction_id IS NULL",
-                        (find_transition_ids,)
-                    )
-                    res = await cur.fetchall()
-                    fee = cast(Option[Fee], transaction.fee)
-                    if (fee := fee.value) is not None:
-                        await cur.execute(
-                            "SELECT tx.id, tx.transaction_id FROM transaction tx "
-                            "JOIN fee f on tx.id = f.transaction_id "
-                            "JOIN transition t on f.id = t.fee_id "
-                            "WHERE t.transition_id = %s AND tx.confirmed_transaction_id IS NULL",
-                            (str(fee.transition.id),)
-                        )
-                        for row in await cur.fetchall():
-                            if row not in res:
-                                res.append(row)
-                else:
-                    res = []
-                for row in res:
-                    print("removing strange unconfirmed transaction:", row["transaction_id"])
-                    await cur.execute(
-                        "DELETE FROM transaction WHERE id = %s",
-                        (row["id"],)
-                    )
 
             if isinstance(transaction, FeeTransaction): # check probable rejected unconfirmed transaction
                 if confirmed_transaction is None:
@@ -523,7 +705,7 @@ class DatabaseInsert(DatabaseBase):
                             "UPDATE transaction SET transaction_id = %s, original_transaction_id = %s, type = 'Fee' WHERE id = %s",
                             (str(transaction.id), original_transaction_id, transaction_db_id)
                         )
-                        await DatabaseInsert._insert_deploy_transaction(cur, redis, rejected_deployment.deploy, rejected_deployment.program_owner, fee, transaction_db_id, is_rejected=True, fee_should_exist=True)
+                        await DatabaseInsert._insert_deploy_transaction(cur, redis, buffer, rejected_deployment.deploy, rejected_deployment.program_owner, fee, transaction_db_id, is_rejected=True, fee_should_exist=True)
 
                 elif isinstance(confirmed_transaction, RejectedExecute):
                     rejected_execution = cast(RejectedExecution, confirmed_transaction.rejected)
@@ -543,7 +725,7 @@ class DatabaseInsert(DatabaseBase):
                             "UPDATE transaction SET transaction_id = %s, original_transaction_id = %s, type = 'Fee' WHERE id = %s",
                             (str(transaction.id), original_transaction_id, transaction_db_id)
                         )
-                        await DatabaseInsert._insert_execute_transaction(cur, redis, rejected_execution.execution,
+                        await DatabaseInsert._insert_execute_transaction(cur, redis, buffer, rejected_execution.execution,
                                                                          cast(Fee, transaction.fee),
                                                                          transaction_db_id, is_rejected=True,
                                                                          ts_should_exist=True)
@@ -552,37 +734,34 @@ class DatabaseInsert(DatabaseBase):
                 original_transaction_id = None
                 if confirmed_transaction is not None:
                     original_transaction_id = aleo_explorer_rust.rejected_tx_original_id(confirmed_transaction.dump())
+                transaction_db_id = await buffer.next_id(cur, "transaction")
                 await cur.execute(
-                    "INSERT INTO transaction (transaction_id, type, original_transaction_id) "
-                    "VALUES (%s, %s, %s) RETURNING id",
-                    (str(transaction.id), transaction.type.name, original_transaction_id)
+                    "INSERT INTO transaction (id, transaction_id, type, original_transaction_id) VALUES (%s, %s, %s, %s)",
+                    (transaction_db_id, str(transaction.id), transaction.type.name, original_transaction_id)
                 )
-                if (res := await cur.fetchone()) is None:
-                    raise RuntimeError("failed to insert row into database")
-                transaction_db_id = res["id"]
             if transaction_db_id == -1:
                 raise RuntimeError("failed to get transaction id")
 
             if isinstance(transaction, DeployTransaction): # accepted deploy / unconfirmed
-                await DatabaseInsert._insert_deploy_transaction(
-                    cur, redis, transaction.deployment, transaction.owner, cast(Fee, transaction.fee), transaction_db_id,
-                    is_unconfirmed=(confirmed_transaction is None)
+                deploy_transaction_db_id = await DatabaseInsert._insert_deploy_transaction(
+                    cur, redis, buffer, transaction.deployment, transaction.owner, cast(Fee, transaction.fee), transaction_db_id,
+                    is_unconfirmed=(confirmed_transaction is None), new_transaction=True
                 )
 
             elif isinstance(transaction, ExecuteTransaction): # accepted execute / unconfirmed
-                await DatabaseInsert._insert_execute_transaction(cur, redis, transaction.execution,
+                await DatabaseInsert._insert_execute_transaction(cur, redis, buffer, transaction.execution,
                                                                  cast(Option[Fee], transaction.fee).value,
-                                                                 transaction_db_id)
+                                                                 transaction_db_id, new_transaction=True)
 
             elif isinstance(transaction, FeeTransaction) and not prior_tx: # first seen rejected tx
                 if isinstance(confirmed_transaction, RejectedDeploy):
                     rejected_deployment = cast(RejectedDeployment, confirmed_transaction.rejected)
-                    await DatabaseInsert._insert_deploy_transaction(cur, redis, rejected_deployment.deploy, rejected_deployment.program_owner, cast(Fee, transaction.fee), transaction_db_id, is_rejected=True)
+                    await DatabaseInsert._insert_deploy_transaction(cur, redis, buffer, rejected_deployment.deploy, rejected_deployment.program_owner, cast(Fee, transaction.fee), transaction_db_id, is_rejected=True, new_transaction=True)
                 elif isinstance(confirmed_transaction, RejectedExecute):
                     rejected_execution = cast(RejectedExecution, confirmed_transaction.rejected)
-                    await DatabaseInsert._insert_execute_transaction(cur, redis, rejected_execution.execution,
+                    await DatabaseInsert._insert_execute_transaction(cur, redis, buffer, rejected_execution.execution,
                                                                      cast(Fee, transaction.fee), transaction_db_id,
-                                                                     is_rejected=True)
+                                                                     is_rejected=True, new_transaction=True)
 
         # confirming tx
         if confirmed_transaction is not None:
@@ -596,16 +775,19 @@ class DatabaseInsert(DatabaseBase):
                 transaction = cast(DeployTransaction, transaction)
                 if reject_reasons[ct_index] is not None:
                     raise RuntimeError("expected no rejected reason for accepted deploy transaction")
-                await cur.execute(
-                    "SELECT td.id FROM transaction_deploy td "
-                    "JOIN transaction t on td.transaction_id = t.id "
-                    "WHERE t.transaction_id = %s",
-                    (str(transaction.id),)
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise RuntimeError("database inconsistent")
-                deploy_transaction_db_id = res["id"]
+                if deploy_transaction_db_id is None:
+                    await cur.execute(
+                        "SELECT td.id FROM transaction_deploy td "
+                        "JOIN transaction t on td.transaction_id = t.id "
+                        "WHERE t.transaction_id = %s",
+                        (str(transaction.id),)
+                    )
+                    if (res := await cur.fetchone()) is None:
+                        raise RuntimeError("database inconsistent")
+                    deploy_transaction_db_id = res["id"]
                 await DatabaseInsert._save_program(cur, transaction.deployment.program, deploy_transaction_db_id, transaction)
+                # not visible to other connections before the transaction commits
+                global_program_cache[str(transaction.deployment.program.id)] = transaction.deployment.program
 
             elif isinstance(confirmed_transaction, AcceptedExecute):
                 if reject_reasons[ct_index] is not None:
@@ -616,8 +798,6 @@ class DatabaseInsert(DatabaseBase):
                     raise RuntimeError("expected a rejected reason for rejected transaction")
                 await cur.execute("UPDATE confirmed_transaction SET reject_reason = %s WHERE id = %s",
                                   (reject_reasons[ct_index], confirmed_transaction_db_id))
-
-            await self._update_address_stats(transaction)
         else:
             # check if tx is already aborted
             await cur.execute(
@@ -746,10 +926,7 @@ class DatabaseInsert(DatabaseBase):
                 "key": key,
                 "value": value,
             }
-        await self.redis.execute_command("MULTI") # type: ignore
-        await self.redis.delete("credits.aleo:committee")
-        await self.redis.hset("credits.aleo:committee", mapping={k: json.dumps(v) for k, v in committee_mapping.items()})
-        await self.redis.execute_command("EXEC") # type: ignore
+        await self.redis_journal.replace("credits.aleo:committee", {k: json.dumps(v) for k, v in committee_mapping.items()})
         await cur.execute(
             "INSERT INTO mapping_committee_history (height, content) VALUES (%s, %s) RETURNING id",
             (height, json.dumps({str(i["key"]): i["value"].dump().hex() for i in global_mapping_cache[committee_mapping_id].values()}))
@@ -781,10 +958,7 @@ class DatabaseInsert(DatabaseBase):
                 "key": key,
                 "value": value,
             }
-        await self.redis.execute_command("MULTI") # type: ignore
-        await self.redis.delete("credits.aleo:bonded")
-        await self.redis.hset("credits.aleo:bonded", mapping={k: json.dumps(v) for k, v in bonded_mapping.items()})
-        await self.redis.execute_command("EXEC") # type: ignore
+        await self.redis_journal.replace("credits.aleo:bonded", {k: json.dumps(v) for k, v in bonded_mapping.items()})
         await cur.execute(
             "INSERT INTO mapping_bonded_history (height, content) VALUES (%s, %s) RETURNING id",
             (height, json.dumps({str(i["key"]): i["value"].dump().hex() for i in global_mapping_cache[bonded_mapping_id].values()}))
@@ -804,10 +978,7 @@ class DatabaseInsert(DatabaseBase):
                 "key": key,
                 "value": value,
             }
-        await self.redis.execute_command("MULTI") # type: ignore
-        await self.redis.delete("credits.aleo:delegated")
-        await self.redis.hset("credits.aleo:delegated", mapping={k: json.dumps(v) for k, v in delegated_mapping.items()})
-        await self.redis.execute_command("EXEC") # type: ignore
+        await self.redis_journal.replace("credits.aleo:delegated", {k: json.dumps(v) for k, v in delegated_mapping.items()})
         await cur.execute(
             "INSERT INTO mapping_delegated_history (height, content) VALUES (%s, %s) RETURNING id",
             (height, json.dumps({str(i["key"]): str(i["value"]) for i in global_mapping_cache[delegated_mapping_id].values()}))
@@ -840,8 +1011,8 @@ class DatabaseInsert(DatabaseBase):
                 delegated[validator] = amount
         return delegated
 
-    async def _pre_ratify(self, cur: psycopg.AsyncCursor[dict[str, Any]], ratification: GenesisRatify,
-                          supply_tracker: _SupplyTracker):
+    async def _pre_ratify(self, cur: psycopg.AsyncCursor[dict[str, Any]], mapping_buffer: MappingBuffer,
+                          ratification: GenesisRatify, supply_tracker: _SupplyTracker):
         from interpreter.interpreter import global_mapping_cache
         committee = ratification.committee
         await DatabaseInsert._save_committee_history(cur, 0, committee)
@@ -966,7 +1137,7 @@ class DatabaseInsert(DatabaseBase):
         })
 
         from interpreter.interpreter import execute_operations
-        await execute_operations(cast("Database", self), cur, operations)
+        await execute_operations(cast("Database", self), cur, mapping_buffer, operations)
 
     @staticmethod
     async def _get_committee_mapping_unchecked(redis_conn: Redis[str]) -> dict[Address, tuple[bool_, u8]]:
@@ -1104,8 +1275,9 @@ class DatabaseInsert(DatabaseBase):
         return delegated
 
     @profile
-    async def _post_ratify(self, cur: psycopg.AsyncCursor[dict[str, Any]], redis_conn: Redis[str], height: int, round_: int,
-                           ratifications: list[Ratify], address_puzzle_rewards: dict[str, int], supply_tracker: _SupplyTracker):
+    async def _post_ratify(self, cur: psycopg.AsyncCursor[dict[str, Any]], redis_conn: Redis[str], mapping_buffer: MappingBuffer,
+                           height: int, round_: int, ratifications: list[Ratify], address_puzzle_rewards: dict[str, int], supply_tracker: _SupplyTracker,
+                           address_stats: _AddressStats):
         from interpreter.interpreter import global_mapping_cache
 
         for ratification in ratifications:
@@ -1133,12 +1305,10 @@ class DatabaseInsert(DatabaseBase):
                 delegated = self._next_delegated(stakers)
                 committee_members = self._next_committee_members(committee_members, stakers)
 
-                pipe = self.redis.pipeline()
                 for address, amount in stake_rewards.items():
-                    pipe.hincrby("address_stake_reward", str(address), amount)
+                    address_stats.add("address_stake_reward", str(address), amount)
                     supply_tracker.mint(amount)
                     supply_tracker.tally_block_reward(amount)
-                await pipe.execute() # type: ignore
 
                 await self._update_committee_bonded_delegated_map(cur, committee_members, stakers, delegated, height)
                 starting_round = u64(round_)
@@ -1158,8 +1328,8 @@ class DatabaseInsert(DatabaseBase):
                 account_mapping_id = Field.loads(cached_get_mapping_id("credits.aleo", "account"))
 
                 if account_mapping_id not in global_mapping_cache:
-                    from interpreter.finalizer import mapping_cache_read
-                    global_mapping_cache[account_mapping_id] = await mapping_cache_read(cast("Database", self), "credits.aleo", "account")
+                    from interpreter.finalizer import mapping_cache_read_with_cur
+                    global_mapping_cache[account_mapping_id] = await mapping_cache_read_with_cur(cast("Database", self), cur, "credits.aleo", "account")
 
                 current_balances: dict[Field, dict[str, Any]] = global_mapping_cache[account_mapping_id]
 
@@ -1200,517 +1370,658 @@ class DatabaseInsert(DatabaseBase):
                     supply_tracker.mint(amount)
                     supply_tracker.tally_puzzle_reward(amount)
                 from interpreter.interpreter import execute_operations
-                await execute_operations(cast("Database", self), cur, operations)
-
-    @staticmethod
-    async def _backup_redis_hash_key(redis_conn: Redis[str], keys: list[str], height: int):
-        if height != 0:
-            for key in keys:
-                backup_key = f"{key}:rollback_backup:{height}"
-                if await redis_conn.exists(backup_key) == 0:
-                    if await redis_conn.exists(key) == 1:
-                        await redis_conn.copy(key, backup_key) # type: ignore[arg-type]
-                else:
-                    print("redis backup exists, rolling back")
-                    await redis_conn.copy(backup_key, key, replace=True) # type: ignore[arg-type]
-
-    async def _redis_cleanup(self, redis_conn: Redis[str], keys: list[str], height: int, rollback: bool):
-        if height != 0:
-            now = time.monotonic()
-            history = False
-            if self.redis_last_history_time + 21600 < now:
-                self.redis_last_history_time = now
-                history = True
-            for key in keys:
-                backup_key = f"{key}:rollback_backup:{height}"
-                if await redis_conn.exists(backup_key) == 1:
-                    if rollback:
-                        await redis_conn.copy(backup_key, key, replace=True) # type: ignore[arg-type]
-                    else:
-                        if history:
-                            history_key = f"{key}:history:{height - 1}"
-                            await redis_conn.rename(backup_key, history_key) # type: ignore[arg-type]
-                            await redis_conn.expire(history_key, 60 * 60 * 24 * 3)
-                        else:
-                            await redis_conn.delete(backup_key)
+                await execute_operations(cast("Database", self), cur, mapping_buffer, operations)
 
     @profile
-    async def _save_block(self, block: Block):
+    async def _save_block(self, block: Block, tip: Optional[TipState]) -> TipState:
+        return await self._save_blocks([block], tip)
+
+    async def _save_blocks(self, blocks: list[Block], tip: Optional[TipState]) -> TipState:
+        # all blocks are committed in one transaction, with one redis journal for the whole batch
+        height = blocks[0].height
         try:
             async with self.pool.connection() as conn:
                 signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
                 async with conn.transaction():
                     async with conn.cursor() as cur:
-                        height = block.height
-                        # redis is not protected by transaction so manually saving here
-                        await self._backup_redis_hash_key(self.redis, self.redis_keys, height)
+                        # redis is not protected by transaction so changes are journaled to undo them on failure
+                        # daily leaderboards of every day in the batch, a batch can cross midnight
+                        await self.redis_journal.begin(self.redis, height, [
+                            DatabaseLeaderboard.leaderboard_key(key, day)
+                            for day in sorted({block.header.metadata.timestamp // 86400 for block in blocks})
+                            for key in DatabaseLeaderboard.leaderboard_keys
+                        ])
                         signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
 
                         try:
-                            if block.height != 0:
-                                block_reward, coinbase_reward = block.compute_rewards(
-                                    await cast("Database", self).get_latest_coinbase_target(),
-                                    await cast("Database", self).get_latest_cumulative_proof_target()
-                                )
-                                puzzle_reward = coinbase_reward * 2 // 3
-
-                                await cur.execute("SELECT total_supply FROM block ORDER BY id DESC LIMIT 1")
-                                if (res := await cur.fetchone()) is None:
-                                    raise RuntimeError("failed to retrieve total supply")
-                                supply_tracker = _SupplyTracker(res["total_supply"])
-                            else:
-                                block_reward, coinbase_reward, puzzle_reward = 0, 0, 0
-                                supply_tracker = _SupplyTracker(0)
-
-                            # TODO: use data from proper fee calculation
-                            # supply_tracker.burn(await block.get_total_burnt_fee(cast("Database", self)))
-                            for ct in block.transactions:
-                                ct: ConfirmedTransaction
-                                fee = ct.transaction.fee
-                                if isinstance(fee, Fee):
-                                    supply_tracker.burn(fee.amount[0])
-                                elif fee.value is not None:
-                                    supply_tracker.burn(fee.value.amount[0])
-
-                            # TODO: use data from fee calculation
-                            # block_reward += await block.get_total_priority_fee(cast("Database", self))
-
-                            for ratification in block.ratifications:
-                                if isinstance(ratification, BlockRewardRatify):
-                                    # TODO: remove this
-                                    block_reward = ratification.amount
-                                    if ratification.amount != block_reward:
-                                        raise RuntimeError("invalid block reward")
-                                elif isinstance(ratification, PuzzleRewardRatify):
-                                    if ratification.amount != puzzle_reward:
-                                        raise RuntimeError("invalid puzzle reward")
-                                elif isinstance(ratification, GenesisRatify):
-                                    await self._pre_ratify(cur, ratification, supply_tracker)
-
-                            from interpreter.interpreter import finalize_block
-                            reject_reasons = await finalize_block(cast("Database", self), cur, block)
-
-                            await cur.execute(
-                                "INSERT INTO block (height, block_hash, previous_hash, previous_state_root, transactions_root, "
-                                "finalize_root, ratifications_root, solutions_root, subdag_root, round, cumulative_weight, "
-                                "cumulative_proof_target, coinbase_target, proof_target, last_coinbase_target, "
-                                "last_coinbase_timestamp, timestamp, block_reward, coinbase_reward, total_supply, confirm_timestamp) "
-                                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
-                                "RETURNING id",
-                                (block.height, str(block.block_hash), str(block.previous_hash), str(block.header.previous_state_root),
-                                 str(block.header.transactions_root), str(block.header.finalize_root), str(block.header.ratifications_root),
-                                 str(block.header.solutions_root), str(block.header.subdag_root), block.round,
-                                 block.header.metadata.cumulative_weight, block.header.metadata.cumulative_proof_target,
-                                 block.header.metadata.coinbase_target, block.header.metadata.proof_target,
-                                 block.header.metadata.last_coinbase_target, block.header.metadata.last_coinbase_timestamp,
-                                 block.header.metadata.timestamp, block_reward, coinbase_reward, supply_tracker.supply, 0)
-                            ) # total supply will be rewritten after everything
-                            if (res := await cur.fetchone()) is None:
-                                raise RuntimeError("failed to insert row into database")
-                            block_db_id = res["id"]
-
-                            # dag_transmission_ids: tuple[dict[str, int], dict[str, int]] = {}, {}
-
-                            if isinstance(block.authority, BeaconAuthority):
-                                await cur.execute(
-                                    "INSERT INTO authority (block_id, type, signature) VALUES (%s, %s, %s)",
-                                    (block_db_id, block.authority.type.name, str(block.authority.signature))
-                                )
-                                subdag_copy_data = []
-                                validators_copy_data = []
-                            elif isinstance(block.authority, QuorumAuthority):
-                                await cur.execute(
-                                    "INSERT INTO authority (block_id, type) VALUES (%s, %s) RETURNING id",
-                                    (block_db_id, block.authority.type.name)
-                                )
-                                if (res := await cur.fetchone()) is None:
-                                    raise RuntimeError("failed to insert row into database")
-                                # authority_db_id = res["id"]
-                                subdag = block.authority.subdag
-                                subdag_copy_data: list[tuple[int, int, str, str, int, str, int, str]] = []
-                                committee = await self._get_committee_mapping_unchecked(self.redis)
-                                validators: set[str] = set()
-                                validators_copy_data: list[tuple[int, str]] = []
-                                max_timestamp = 0
-                                for round_, certificates in subdag.subdag.items():
-                                    for index, certificate in enumerate(certificates):
-                                        if certificate.batch_header.timestamp > max_timestamp:
-                                            max_timestamp = certificate.batch_header.timestamp
-                                        if round_ != certificate.batch_header.round:
-                                            raise ValueError("invalid subdag round")
-                                        # Wow, so now we stopped storing the subdags altogether as we are not really reusing them
-                                        #
-                                        # subdag_copy_data.append((
-                                        #     authority_db_id, round_, str(certificate.batch_header.batch_id),
-                                        #     str(certificate.batch_header.author), certificate.batch_header.timestamp,
-                                        #     str(certificate.batch_header.signature), index, str(certificate.batch_header.committee_id)
-                                        # ))
-                                        if len(validators) != len(committee):
-                                            for signature in certificate.signatures:
-                                                validators.add(cached_compute_key_to_address(signature.compute_key))
-                                            validators.add(str(certificate.batch_header.author))
-                                await cur.execute("UPDATE block SET confirm_timestamp = %s WHERE id = %s", (max_timestamp, block_db_id))
-                                for validator in validators:
-                                    validators_copy_data.append((block_db_id, validator))
-                                            # await cur.execute(
-                                            #     "INSERT INTO dag_vertex (authority_id, round, batch_certificate_id, batch_id, "
-                                            #     "author, timestamp, author_signature, index) "
-                                            #     "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
-                                            #     (authority_db_id, round_, str(certificate.certificate_id), str(certificate.batch_header.batch_id),
-                                            #      str(certificate.batch_header.author), certificate.batch_header.timestamp,
-                                            #      str(certificate.batch_header.signature), index)
-                                            # )
-                                        # if (res := await cur.fetchone()) is None:
-                                        #     raise RuntimeError("failed to insert row into database")
-                                        # vertex_db_id = res["id"]
-
-                                        # if isinstance(certificate, BatchCertificate1):
-                                        #     for sig_index, (signature, timestamp) in enumerate(certificate.signatures):
-                                        #         await cur.execute(
-                                        #             "INSERT INTO dag_vertex_signature (vertex_id, signature, timestamp, index) "
-                                        #             "VALUES (%s, %s, %s, %s)",
-                                        #             (vertex_db_id, str(signature), timestamp, sig_index)
-                                        #         )
-                                        # elif isinstance(certificate, BatchCertificate2):
-                                        #     for sig_index, signature in enumerate(certificate.signatures):
-                                        #         await cur.execute(
-                                        #             "INSERT INTO dag_vertex_signature (vertex_id, signature, index) "
-                                        #             "VALUES (%s, %s, %s)",
-                                        #             (vertex_db_id, str(signature), sig_index)
-                                        #         )
-                                        #
-                                        # prev_cert_ids = certificate.batch_header.previous_certificate_ids
-                                        # await cur.execute(
-                                        #     "SELECT v.id, batch_certificate_id FROM dag_vertex v "
-                                        #     "JOIN UNNEST(%s::text[]) WITH ORDINALITY c(id, ord) ON v.batch_certificate_id = c.id "
-                                        #     "ORDER BY ord",
-                                        #     (list(map(str, prev_cert_ids)),)
-                                        # )
-                                        # res = await cur.fetchall()
-                                        # temp allow
-                                        # if len(res) != len(prev_cert_ids):
-                                        #     raise RuntimeError("dag referenced unknown previous certificate")
-                                        # prev_vertex_db_ids = {x["batch_certificate_id"]: x["id"] for x in res}
-                                        # adj_copy_data: list[tuple[int, int, int]] = []
-                                        # for prev_index, prev_cert_id in enumerate(prev_cert_ids):
-                                        #     if str(prev_cert_id) in prev_vertex_db_ids:
-                                        #         adj_copy_data.append((vertex_db_id, prev_vertex_db_ids[str(prev_cert_id)], prev_index))
-                                        # async with cur.copy("COPY dag_vertex_adjacency (vertex_id, previous_vertex_id, index) FROM STDIN") as copy:
-                                        #     for row in adj_copy_data:
-                                        #         await copy.write_row(row)
-
-                                        # tid_copy_data: list[tuple[int, str, int, Optional[str], Optional[str]]] = []
-                                        # for tid_index, transmission_id in enumerate(certificate.batch_header.transmission_ids):
-                                        #     if isinstance(transmission_id, SolutionTransmissionID):
-                                        #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, str(transmission_id.id), None))
-                                        #         dag_transmission_ids[0][str(transmission_id.id)] = vertex_db_id
-                                        #     elif isinstance(transmission_id, TransactionTransmissionID):
-                                        #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, None, str(transmission_id.id)))
-                                        #         dag_transmission_ids[1][str(transmission_id.id)] = vertex_db_id
-                                        #     elif isinstance(transmission_id, RatificationTransmissionID):
-                                        #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, None, None))
-                                        #     else:
-                                        #         raise NotImplementedError
-                                        # async with cur.copy("COPY dag_vertex_transmission_id (vertex_id, type, index, commitment, transaction_id) FROM STDIN") as copy:
-                                        #     for row in tid_copy_data:
-                                        #         await copy.write_row(row)
-                            else:
-                                raise NotImplementedError
-                            if subdag_copy_data:
-                                async with cur.copy(
-                                    "COPY dag_vertex (authority_id, round, batch_id, "
-                                    "author, timestamp, author_signature, index, committee_id) FROM STDIN"
-                                ) as copy:
-                                    for row in subdag_copy_data:
-                                        await copy.write_row(row)
-                            if validators_copy_data:
-                                async with cur.copy("COPY block_validator (block_id, validator) FROM STDIN") as copy:
-                                    for row in validators_copy_data:
-                                        await copy.write_row(row)
-
-                            ignore_deploy_txids: list[str] = []
-                            program_name_seen: dict[str, str] = {}
-                            for confirmed_transaction in block.transactions:
-                                if isinstance(confirmed_transaction, AcceptedDeploy):
-                                    transaction_id = str(confirmed_transaction.transaction.id)
-                                    transaction = confirmed_transaction.transaction
-                                    if isinstance(transaction, DeployTransaction):
-                                        program_name = str(transaction.deployment.program.id)
-                                        if program_name in program_name_seen:
-                                            ignore_deploy_txids.append(program_name_seen[program_name])
-                                        program_name_seen[program_name] = transaction_id
-                                    else:
-                                        raise ValueError("expected deploy transaction")
-
-                            for ct_index, confirmed_transaction in enumerate(block.transactions):
-                                confirmed_transaction: ConfirmedTransaction
-                                await cur.execute(
-                                    "INSERT INTO confirmed_transaction (block_id, index, type) VALUES (%s, %s, %s) RETURNING id",
-                                    (block_db_id, confirmed_transaction.index, confirmed_transaction.type.name)
-                                )
-                                if (res := await cur.fetchone()) is None:
-                                    raise RuntimeError("failed to insert row into database")
-                                confirmed_transaction_db_id = res["id"]
-
-                                transaction = confirmed_transaction.transaction
-
-                                # track supply for credit split fee
-                                if isinstance(transaction, ExecuteTransaction):
-                                    transitions = transaction.execution.transitions
-                                    for transition in transitions:
-                                        if transition.program_id == "credits.aleo" and transition.function_name == "split":
-                                            supply_tracker.burn(10000)
-
-                                await self._insert_transaction(cur, self.redis, transaction, confirmed_transaction, ct_index, ignore_deploy_txids,
-                                                               confirmed_transaction_db_id, reject_reasons)
-
-                                update_copy_data: list[tuple[int, str, str, str]] = []
-                                for index, finalize_operation in enumerate(confirmed_transaction.finalize):
-                                    await cur.execute(
-                                        "INSERT INTO finalize_operation (confirmed_transaction_id, type, index) "
-                                        "VALUES (%s, %s, %s) RETURNING id",
-                                        (confirmed_transaction_db_id, finalize_operation.type.name, index)
-                                    )
-                                    if (res := await cur.fetchone()) is None:
-                                        raise RuntimeError("failed to insert row into database")
-                                    finalize_operation_db_id: int = res["id"]
-                                    if isinstance(finalize_operation, InitializeMapping):
-                                        await cur.execute(
-                                            "INSERT INTO finalize_operation_initialize_mapping (finalize_operation_id, "
-                                            "mapping_id) VALUES (%s, %s)",
-                                            (finalize_operation_db_id, str(finalize_operation.mapping_id))
-                                        )
-                                    elif isinstance(finalize_operation, InsertKeyValue):
-                                        await cur.execute(
-                                            "INSERT INTO finalize_operation_insert_kv (finalize_operation_id, "
-                                            "mapping_id, key_id, value_id) VALUES (%s, %s, %s, %s)",
-                                            (finalize_operation_db_id, str(finalize_operation.mapping_id),
-                                             str(finalize_operation.key_id), str(finalize_operation.value_id))
-                                        )
-                                    elif isinstance(finalize_operation, UpdateKeyValue):
-                                        update_copy_data.append((
-                                            finalize_operation_db_id, str(finalize_operation.mapping_id),
-                                            str(finalize_operation.key_id), str(finalize_operation.value_id)
-                                        ))
-                                    elif isinstance(finalize_operation, RemoveKeyValue):
-                                        await cur.execute(
-                                            "INSERT INTO finalize_operation_remove_kv (finalize_operation_id, "
-                                            "mapping_id, key_id) VALUES (%s, %s, %s)",
-                                            (finalize_operation_db_id, str(finalize_operation.mapping_id),
-                                             str(finalize_operation.key_id))
-                                        )
-                                    elif isinstance(finalize_operation, ReplaceMapping):
-                                        await cur.execute(
-                                            "INSERT INTO finalize_operation_replace_mapping (finalize_operation_id, "
-                                            "mapping_id) VALUES (%s, %s)",
-                                            (finalize_operation_db_id, str(finalize_operation.mapping_id))
-                                        )
-                                    elif isinstance(finalize_operation, RemoveMapping):
-                                        await cur.execute(
-                                            "INSERT INTO finalize_operation_remove_mapping (finalize_operation_id, "
-                                            "mapping_id) VALUES (%s, %s)",
-                                            (finalize_operation_db_id, str(finalize_operation.mapping_id))
-                                        )
-                                if update_copy_data:
-                                    async with cur.copy("COPY finalize_operation_update_kv (finalize_operation_id, mapping_id, key_id, value_id) FROM STDIN") as copy:
-                                        for row in update_copy_data:
-                                            await copy.write_row(row)
-
-                            for index, ratify in enumerate(block.ratifications):
-                                if isinstance(ratify, GenesisRatify):
-                                    await cur.execute(
-                                        "INSERT INTO ratification (block_id, index, type) VALUES (%s, %s, %s)",
-                                        (block_db_id, index, ratify.type.name)
-                                    )
-                                    public_balances = ratify.public_balances
-                                    for address, balance in public_balances:
-                                        await cur.execute(
-                                            "INSERT INTO ratification_genesis_balance (address, amount) VALUES (%s, %s)",
-                                            (str(address), balance)
-                                        )
-                                    bonded_balances = ratify.bonded_balances
-                                    for address, validator, withdrawal, amount in bonded_balances:
-                                        await cur.execute(
-                                            "INSERT INTO ratification_genesis_bonded (staker, validator, withdrawal, amount) "
-                                            "VALUES (%s, %s, %s, %s)",
-                                            (str(address), str(validator), str(withdrawal), amount)
-                                        )
-                                elif isinstance(ratify, (BlockRewardRatify, PuzzleRewardRatify)):
-                                    await cur.execute(
-                                        "INSERT INTO ratification (block_id, index, type, amount) VALUES (%s, %s, %s, %s)",
-                                        (block_db_id, index, ratify.type.name, ratify.amount)
-                                    )
-                                else:
-                                    raise NotImplementedError
-
-                            address_puzzle_rewards: dict[str, int] = defaultdict(int)
-
-                            if block.solutions.value is not None:
-                                prover_solutions = block.solutions.value.solutions
-                                solutions: list[tuple[Solution, int, int]] = []
-                                prover_solutions_target = list(zip(
-                                    prover_solutions,
-                                    [solution.target for solution in prover_solutions]
-                                ))
-                                target_sum = sum(target for _, target in prover_solutions_target)
-                                for prover_solution, target in prover_solutions_target:
-                                    solutions.append((prover_solution, target, puzzle_reward * target // target_sum))
-
-                                await cur.execute(
-                                    "INSERT INTO puzzle_solution (block_id, target_sum) "
-                                    "VALUES (%s, %s) RETURNING id",
-                                    (block_db_id, target_sum)
-                                )
-                                if (res := await cur.fetchone()) is None:
-                                    raise RuntimeError("failed to insert row into database")
-                                puzzle_solution_db_id = res["id"]
-                                copy_data: list[tuple[int, str, u64, int, int, str, str]] = []
-                                for solution, target, reward in solutions:
-                                    solution: Solution
-                                    # dag_vertex_db_id = dag_transmission_ids[0][str(partial_solution.commitment)]
-                                    copy_data.append(
-                                        (puzzle_solution_db_id, str(solution.partial_solution.address), solution.partial_solution.counter,
-                                         solution.target, reward, str(solution.partial_solution.epoch_hash), str(solution.partial_solution.solution_id))
-                                    )
-                                    if reward > 0:
-                                        address_puzzle_rewards[str(solution.partial_solution.address)] += reward
-                                if not os.environ.get("DEBUG_SKIP_COINBASE"):
-                                    async with cur.copy("COPY solution (puzzle_solution_id, address, counter, target, reward, epoch_hash, solution_id) FROM STDIN") as copy:
-                                        for row in copy_data:
-                                            await copy.write_row(row)
-                                    for address, reward in address_puzzle_rewards.items():
-                                        pipe = self.redis.pipeline()
-                                        pipe.hincrby("address_puzzle_reward", address, reward)
-                                        await pipe.execute() # type: ignore
-
-                            for aborted in block.aborted_transaction_ids:
-                                await cur.execute(
-                                    "INSERT INTO block_aborted_transaction_id (block_id, transaction_id) VALUES (%s, %s)",
-                                    (block_db_id, str(aborted))
-                                )
-                                await self._process_aborted_transaction(cur, aborted)
-
-                            for aborted in block.aborted_solution_ids:
-                                await cur.execute(
-                                    "INSERT INTO block_aborted_solution_id (block_id, solution_id) VALUES (%s, %s)",
-                                    (block_db_id, str(aborted))
-                                )
-
-                            await self._post_ratify(
-                                cur, self.redis, block.height, block.round, block.ratifications.ratifications,
-                                address_puzzle_rewards, supply_tracker
-                            )
-
-                            if os.environ.get("DEBUG_MAPPING_DUMP", False):
-                                async def read_redis_mapping(key: str) -> list[tuple[str, str]]:
-                                    data = await self.redis.hgetall(key)
-                                    r: list[tuple[str, str]] = []
-                                    for d in data.values():
-                                        d = json.loads(d)
-                                        key = str(Plaintext.load(BytesIO(bytes.fromhex(d["key"]))))
-                                        value = Value.load(BytesIO(bytes.fromhex(d["value"])))
-                                        if isinstance(value, PlaintextValue):
-                                            plaintext = value.plaintext
-                                            if isinstance(plaintext, StructPlaintext):
-                                                s = ""
-                                                members = plaintext.members
-                                                for k, v in members:
-                                                    if not s:
-                                                        s += f"{{\n  {str(k)}: {str(v)}"
-                                                    else:
-                                                        s += f",\n  {str(k)}: {str(v)}"
-                                                s += "\n}"
-                                            else:
-                                                s = str(plaintext)
-                                        else:
-                                            s = str(value)
-                                        r.append((key, s))
-                                    return sorted(r, key=lambda x: x[0])
-
-                                def write_mapping_debug(data: list[tuple[str, str]], path: str):
-                                    with open(path, "w") as f:
-                                        for key, value in data:
-                                            f.write(f"{key} -> {value}\n")
-
-                                os.makedirs(f"/tmp/mapping_debug/{block.height}/self", exist_ok=True)
-                                committee_data = await read_redis_mapping("credits.aleo:committee")
-                                write_mapping_debug(committee_data, f"/tmp/mapping_debug/{block.height}/self/committee")
-                                delegated_data = await read_redis_mapping("credits.aleo:delegated")
-                                write_mapping_debug(delegated_data, f"/tmp/mapping_debug/{block.height}/self/delegated")
-                                bonded_data = await read_redis_mapping("credits.aleo:bonded")
-                                write_mapping_debug(bonded_data, f"/tmp/mapping_debug/{block.height}/self/bonded")
-                                await cur.execute(
-                                    "SELECT key, value FROM mapping_value mv "
-                                    "JOIN mapping m ON mv.mapping_id = m.id "
-                                    "WHERE m.program_id = 'credits.aleo' AND m.mapping = 'account'"
-                                )
-                                account_data = await cur.fetchall()
-                                values: list[tuple[str, str]] = []
-                                for ad in account_data:
-                                    key = str(Plaintext.load(BytesIO(ad["key"])))
-                                    value = Value.load(BytesIO(ad["value"]))
-                                    if isinstance(value, PlaintextValue):
-                                        plaintext = value.plaintext
-                                        if isinstance(plaintext, StructPlaintext):
-                                            s = ""
-                                            members = plaintext.members
-                                            for k, v in members:
-                                                if not s:
-                                                    s += f"{{\n  {str(k)}: {str(v)}"
-                                                else:
-                                                    s += f",\n  {str(k)}: {str(v)}"
-                                            s += "\n}"
-                                        else:
-                                            s = str(plaintext)
-                                    else:
-                                        s = str(value)
-                                    values.append((key, s))
-
-                                write_mapping_debug(sorted(values, key=lambda x: x[0]), f"/tmp/mapping_debug/{block.height}/self/account")
-
-
-                            await cur.execute(
-                                "UPDATE block SET total_supply = %s WHERE id = %s",
-                                (supply_tracker.supply, block_db_id)
-                            )
-
-                            puzzle_diff = puzzle_reward - supply_tracker.actual_puzzle_reward
-                            if puzzle_diff != 0:
-                                await cur.execute(
-                                    "INSERT INTO stats (name, value) VALUES ('puzzle_reward_diff', %s) "
-                                    "ON CONFLICT (name) DO UPDATE SET value = stats.value + %s",
-                                    (puzzle_diff, puzzle_diff)
-                                )
-
-                            block_diff = int(block_reward) - supply_tracker.actual_block_reward
-                            if block_diff != 0:
-                                await cur.execute(
-                                    "INSERT INTO stats (name, value) VALUES ('block_reward_diff', %s) "
-                                    "ON CONFLICT (name) DO UPDATE SET value = stats.value + %s",
-                                    (block_diff, block_diff)
-                                )
-
-                            if block.height % 100 == 0:
-                                # temporarily disable this as it seems we don't have lingering unconfirmed tx anymore
-                                pass
-                                # await self.cleanup_unconfirmed_transactions()
+                            for block in blocks:
+                                tip = await self._insert_block(cur, block, tip)
 
                             signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
-                            await self._redis_cleanup(self.redis, self.redis_keys, block.height, False)
+                            await self.redis_journal.commit()
 
-                            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseBlockAdded, block.header.metadata.height))
+                            for block in blocks:
+                                await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseBlockAdded, block.header.metadata.height))
                         except Exception as e:
                             signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
-                            await self._redis_cleanup(self.redis, self.redis_keys, block.height, True)
+                            await self.redis_journal.rollback()
                             signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+                            if len(blocks) > 1:
+                                # mapping changes of the earlier blocks in the batch were rolled back too
+                                global_mapping_cache.clear()
+                            # mappings initialized by the failed blocks were rolled back
+                            global_mapping_registry.clear()
                             await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                             raise
                 signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+            if self.block_segments is not None:
+                # the blocks are committed already, a later append or archive.py backfill-segments fills the gap
+                try:
+                    await self._append_block_segments(blocks)
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            # a failed update leaves an older height in network_speed, which is rebuilt with the next batch
+            try:
+                await self._update_network_speed(blocks)
+            except Exception as e:
+                await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            return cast(TipState, tip)
         except KeyboardInterrupt as e:
             import traceback
             traceback.print_exc()
             raise
 
+    async def _append_block_segments(self, blocks: list[Block]):
+        block_segments = cast(BlockSegmentStore, self.block_segments)
+        next_height = block_segments.next_height
+        # short gaps are left by a crash between commit and append, or by a revert; longer ones need archive.py.
+        # Only exact bytes from block_raw fill them, blocks rebuilt from the tables would stay in the segments for good
+        if 0 < next_height < blocks[0].height <= next_height + 1000:
+            async with self.pool.connection() as conn:
+                raw_blocks = await DatabaseBlock._get_raw_block_data(next_height, blocks[0].height, conn)
+            block_segments.append_raw(sorted(raw_blocks.items()))
+            next_height = block_segments.next_height
+        if next_height < blocks[0].height:
+            raise RuntimeError(
+                f"block segments are missing blocks {next_height} to {blocks[0].height - 1}, "
+                "fill them with archive.py backfill-segments"
+            )
+        block_segments.append(blocks)
+
+    async def _update_network_speed(self, blocks: list[Block]):
+        # network_speed holds the latest height, timestamp and proof target and the summed work in the window,
+        # network_speed:window has one "height:work" member per block with solutions, scored by timestamp.
+        # Only written after commit, anything that doesn't continue from the stored height rebuilds it from the database.
+        interval = DatabaseAddress.network_speed_interval
+        state = await self.redis.hgetall("network_speed")
+        if not state or int(state["height"]) != blocks[0].height - 1:
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    latest, window = await DatabaseAddress._get_network_speed_window(cur)
+            if latest is None:
+                return
+            height, timestamp, proof_target = latest["height"], latest["timestamp"], latest["proof_target"]
+            work = sum(int(row["work"]) for row in window)
+            pipe = self.redis.pipeline()
+            pipe.delete("network_speed:window")
+            if window:
+                pipe.zadd("network_speed:window", {f"{row['height']}:{row['work']}": row["timestamp"] for row in window})
+        else:
+            proof_target = int(state["proof_target"])
+            work = int(state["work"])
+            timestamp = blocks[-1].header.metadata.timestamp
+            added: dict[str, int] = {}
+            for block in blocks:
+                if block.solutions.value is not None and block.header.metadata.timestamp > timestamp - interval:
+                    block_work = len(block.solutions.value.solutions) * proof_target
+                    added[f"{block.height}:{block_work}"] = block.header.metadata.timestamp
+                    work += block_work
+                proof_target = block.header.metadata.proof_target
+            height = blocks[-1].height
+            expired = await self.redis.zrangebyscore("network_speed:window", "-inf", timestamp - interval)
+            work -= sum(int(member.split(":")[1]) for member in expired)
+            pipe = self.redis.pipeline()
+            pipe.zremrangebyscore("network_speed:window", "-inf", timestamp - interval)
+            if added:
+                pipe.zadd("network_speed:window", added)
+        pipe.hset("network_speed", mapping={"height": height, "timestamp": timestamp, "proof_target": proof_target, "work": work})
+        await pipe.execute() # type: ignore
+
+    async def _insert_block(self, cur: psycopg.AsyncCursor[DictRow], block: Block, tip: Optional[TipState]) -> TipState:
+
+        if block.height != 0:
+            if tip is None or tip.height != block.height - 1:
+                # read through the transaction as the previous block might not be committed yet
+                from db.block import DatabaseBlock
+                tip = await DatabaseBlock.get_tip_state_with_cur(cur)
+                if tip is None:
+                    raise RuntimeError("failed to retrieve total supply")
+            block_reward, coinbase_reward = block.compute_rewards(tip.coinbase_target, tip.cumulative_proof_target)
+            puzzle_reward = coinbase_reward * 2 // 3
+
+            supply_tracker = _SupplyTracker(tip.total_supply)
+        else:
+            block_reward, coinbase_reward, puzzle_reward = 0, 0, 0
+            supply_tracker = _SupplyTracker(0)
+
+        # TODO: use data from proper fee calculation
+        # supply_tracker.burn(await block.get_total_burnt_fee(cast("Database", self)))
+        fee_sum = 0
+        for ct in block.transactions:
+            ct: ConfirmedTransaction
+            fee = ct.transaction.fee
+            if isinstance(fee, Fee):
+                supply_tracker.burn(fee.amount[0])
+                fee_sum += sum(fee.amount)
+            elif fee.value is not None:
+                supply_tracker.burn(fee.value.amount[0])
+                fee_sum += sum(fee.value.amount)
+
+        # TODO: use data from fee calculation
+        # block_reward += await block.get_total_priority_fee(cast("Database", self))
+
+        mapping_buffer = MappingBuffer()
+
+        for ratification in block.ratifications:
+            if isinstance(ratification, BlockRewardRatify):
+                # TODO: remove this
+                block_reward = ratification.amount
+                if ratification.amount != block_reward:
+                    raise RuntimeError("invalid block reward")
+            elif isinstance(ratification, PuzzleRewardRatify):
+                if ratification.amount != puzzle_reward:
+                    raise RuntimeError("invalid puzzle reward")
+            elif isinstance(ratification, GenesisRatify):
+                await self._pre_ratify(cur, mapping_buffer, ratification, supply_tracker)
+
+        address_stats = _AddressStats()
+        for ct in block.transactions:
+            await self._update_address_stats(cur, address_stats, ct.transaction)
+
+        from interpreter.interpreter import finalize_block
+        reject_reasons = await finalize_block(cast("Database", self), cur, mapping_buffer, block)
+
+        block_transitions = [
+            t for ct in block.transactions for t in _TransitionBuffer.transaction_transitions(ct.transaction, ct)
+        ]
+        if block.solutions.value is not None:
+            partial_solution_count = len(block.solutions.value.solutions)
+        else:
+            partial_solution_count = 0
+
+        await cur.execute(
+            "INSERT INTO block (height, block_hash, previous_hash, previous_state_root, transactions_root, "
+            "finalize_root, ratifications_root, solutions_root, subdag_root, round, cumulative_weight, "
+            "cumulative_proof_target, coinbase_target, proof_target, last_coinbase_target, "
+            "last_coinbase_timestamp, timestamp, block_reward, coinbase_reward, total_supply, confirm_timestamp, "
+            "transaction_count, partial_solution_count, transition_count, fee_sum) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+            "RETURNING id",
+            (block.height, str(block.block_hash), str(block.previous_hash), str(block.header.previous_state_root),
+             str(block.header.transactions_root), str(block.header.finalize_root), str(block.header.ratifications_root),
+             str(block.header.solutions_root), str(block.header.subdag_root), block.round,
+             block.header.metadata.cumulative_weight, block.header.metadata.cumulative_proof_target,
+             block.header.metadata.coinbase_target, block.header.metadata.proof_target,
+             block.header.metadata.last_coinbase_target, block.header.metadata.last_coinbase_timestamp,
+             block.header.metadata.timestamp, block_reward, coinbase_reward, supply_tracker.supply, 0,
+             len(block.transactions), partial_solution_count, len(block_transitions), fee_sum)
+        ) # total supply will be rewritten after everything
+        if (res := await cur.fetchone()) is None:
+            raise RuntimeError("failed to insert row into database")
+        block_db_id = res["id"]
+        if self.store_raw_blocks:
+            await cur.execute(
+                "INSERT INTO block_raw (block_id, data) VALUES (%s, %s)",
+                (block_db_id, block.dump())
+            )
+
+        # dag_transmission_ids: tuple[dict[str, int], dict[str, int]] = {}, {}
+
+        if isinstance(block.authority, BeaconAuthority):
+            await cur.execute(
+                "INSERT INTO authority (block_id, type, signature) VALUES (%s, %s, %s)",
+                (block_db_id, block.authority.type.name, str(block.authority.signature))
+            )
+            subdag_copy_data = []
+            validators_copy_data = []
+        elif isinstance(block.authority, QuorumAuthority):
+            await cur.execute(
+                "INSERT INTO authority (block_id, type) VALUES (%s, %s) RETURNING id",
+                (block_db_id, block.authority.type.name)
+            )
+            if (res := await cur.fetchone()) is None:
+                raise RuntimeError("failed to insert row into database")
+            # authority_db_id = res["id"]
+            subdag = block.authority.subdag
+            subdag_copy_data: list[tuple[int, int, str, str, int, str, int, str]] = []
+            committee = await self._get_committee_mapping_unchecked(self.redis)
+            validators: set[str] = set()
+            validators_copy_data: list[tuple[int, str]] = []
+            max_timestamp = 0
+            for round_, certificates in subdag.subdag.items():
+                for index, certificate in enumerate(certificates):
+                    if certificate.batch_header.timestamp > max_timestamp:
+                        max_timestamp = certificate.batch_header.timestamp
+                    if round_ != certificate.batch_header.round:
+                        raise ValueError("invalid subdag round")
+                    # Wow, so now we stopped storing the subdags altogether as we are not really reusing them
+                    #
+                    # subdag_copy_data.append((
+                    #     authority_db_id, round_, str(certificate.batch_header.batch_id),
+                    #     str(certificate.batch_header.author), certificate.batch_header.timestamp,
+                    #     str(certificate.batch_header.signature), index, str(certificate.batch_header.committee_id)
+                    # ))
+                    if len(validators) != len(committee):
+                        for signature in certificate.signatures:
+                            validators.add(cached_compute_key_to_address(signature.compute_key))
+                        validators.add(str(certificate.batch_header.author))
+            await cur.execute("UPDATE block SET confirm_timestamp = %s WHERE id = %s", (max_timestamp, block_db_id))
+            for validator in validators:
+                validators_copy_data.append((block_db_id, validator))
+                        # await cur.execute(
+                        #     "INSERT INTO dag_vertex (authority_id, round, batch_certificate_id, batch_id, "
+                        #     "author, timestamp, author_signature, index) "
+                        #     "VALUES (%s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
+                        #     (authority_db_id, round_, str(certificate.certificate_id), str(certificate.batch_header.batch_id),
+                        #      str(certificate.batch_header.author), certificate.batch_header.timestamp,
+                        #      str(certificate.batch_header.signature), index)
+                        # )
+                    # if (res := await cur.fetchone()) is None:
+                    #     raise RuntimeError("failed to insert row into database")
+                    # vertex_db_id = res["id"]
+
+                    # if isinstance(certificate, BatchCertificate1):
+                    #     for sig_index, (signature, timestamp) in enumerate(certificate.signatures):
+                    #         await cur.execute(
+                    #             "INSERT INTO dag_vertex_signature (vertex_id, signature, timestamp, index) "
+                    #             "VALUES (%s, %s, %s, %s)",
+                    #             (vertex_db_id, str(signature), timestamp, sig_index)
+                    #         )
+                    # elif isinstance(certificate, BatchCertificate2):
+                    #     for sig_index, signature in enumerate(certificate.signatures):
+                    #         await cur.execute(
+                    #             "INSERT INTO dag_vertex_signature (vertex_id, signature, index) "
+                    #             "VALUES (%s, %s, %s)",
+                    #             (vertex_db_id, str(signature), sig_index)
+                    #         )
+                    #
+                    # prev_cert_ids = certificate.batch_header.previous_certificate_ids
+                    # await cur.execute(
+                    #     "SELECT v.id, batch_certificate_id FROM dag_vertex v "
+                    #     "JOIN UNNEST(%s::text[]) WITH ORDINALITY c(id, ord) ON v.batch_certificate_id = c.id "
+                    #     "ORDER BY ord",
+                    #     (list(map(str, prev_cert_ids)),)
+                    # )
+                    # res = await cur.fetchall()
+                    # temp allow
+                    # if len(res) != len(prev_cert_ids):
+                    #     raise RuntimeError("dag referenced unknown previous certificate")
+                    # prev_vertex_db_ids = {x["batch_certificate_id"]: x["id"] for x in res}
+                    # adj_copy_data: list[tuple[int, int, int]] = []
+                    # for prev_index, prev_cert_id in enumerate(prev_cert_ids):
+                    #     if str(prev_cert_id) in prev_vertex_db_ids:
+                    #         adj_copy_data.append((vertex_db_id, prev_vertex_db_ids[str(prev_cert_id)], prev_index))
+                    # async with cur.copy("COPY dag_vertex_adjacency (vertex_id, previous_vertex_id, index) FROM STDIN") as copy:
+                    #     for row in adj_copy_data:
+                    #         await copy.write_row(row)
+
+                    # tid_copy_data: list[tuple[int, str, int, Optional[str], Optional[str]]] = []
+                    # for tid_index, transmission_id in enumerate(certificate.batch_header.transmission_ids):
+                    #     if isinstance(transmission_id, SolutionTransmissionID):
+                    #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, str(transmission_id.id), None))
+                    #         dag_transmission_ids[0][str(transmission_id.id)] = vertex_db_id
+                    #     elif isinstance(transmission_id, TransactionTransmissionID):
+                    #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, None, str(transmission_id.id)))
+                    #         dag_transmission_ids[1][str(transmission_id.id)] = vertex_db_id
+                    #     elif isinstance(transmission_id, RatificationTransmissionID):
+                    #         tid_copy_data.append((vertex_db_id, transmission_id.type.name, tid_index, None, None))
+                    #     else:
+                    #         raise NotImplementedError
+                    # async with cur.copy("COPY dag_vertex_transmission_id (vertex_id, type, index, commitment, transaction_id) FROM STDIN") as copy:
+                    #     for row in tid_copy_data:
+                    #         await copy.write_row(row)
+        else:
+            raise NotImplementedError
+        if subdag_copy_data:
+            async with cur.copy(
+                "COPY dag_vertex (authority_id, round, batch_id, "
+                "author, timestamp, author_signature, index, committee_id) FROM STDIN"
+            ) as copy:
+                for row in subdag_copy_data:
+                    await copy.write_row(row)
+        if validators_copy_data:
+            async with cur.copy("COPY block_validator (block_id, validator) FROM STDIN") as copy:
+                for row in validators_copy_data:
+                    await copy.write_row(row)
+
+        ignore_deploy_txids: list[str] = []
+        program_name_seen: dict[str, str] = {}
+        for confirmed_transaction in block.transactions:
+            if isinstance(confirmed_transaction, AcceptedDeploy):
+                transaction_id = str(confirmed_transaction.transaction.id)
+                transaction = confirmed_transaction.transaction
+                if isinstance(transaction, DeployTransaction):
+                    program_name = str(transaction.deployment.program.id)
+                    if program_name in program_name_seen:
+                        ignore_deploy_txids.append(program_name_seen[program_name])
+                    program_name_seen[program_name] = transaction_id
+                else:
+                    raise ValueError("expected deploy transaction")
+
+        # existence checks are batched here so the pipeline below doesn't sync on every transaction
+        await cur.execute(
+            "SELECT transaction_id FROM transaction WHERE transaction_id = ANY(%s::text[])",
+            ([str(ct.transaction.id) for ct in block.transactions],)
+        )
+        existing_transactions = {res["transaction_id"] for res in await cur.fetchall()}
+
+        # check for existing transactions and remove unconfirmed transactions
+        # wasteful for now, just a strange edge case avoidance
+        # TODO: refactor
+        execute_transition_ids: list[str] = []
+        fee_transition_ids: list[str] = []
+        for confirmed_transaction in block.transactions:
+            transaction = confirmed_transaction.transaction
+            if str(transaction.id) in existing_transactions:
+                continue
+            if isinstance(confirmed_transaction, AcceptedDeploy):
+                if not isinstance(transaction, DeployTransaction):
+                    raise RuntimeError("expected a deploy transaction for accepted deploy")
+                fee_transition_ids.append(str(cast(Fee, transaction.fee).transition.id))
+            elif isinstance(confirmed_transaction, AcceptedExecute):
+                if not isinstance(transaction, ExecuteTransaction):
+                    raise RuntimeError("expected an execute transaction for accepted execute")
+                execute_transition_ids.extend(str(x.id) for x in transaction.execution.transitions)
+                if (fee := cast(Option[Fee], transaction.fee).value) is not None:
+                    fee_transition_ids.append(str(fee.transition.id))
+        if execute_transition_ids or fee_transition_ids:
+            await cur.execute(
+                "SELECT tx.id, tx.transaction_id FROM transaction tx "
+                "JOIN transaction_execute te on tx.id = te.transaction_id "
+                "JOIN transition t on te.id = t.transaction_execute_id "
+                "WHERE t.transition_id = ANY(%s::text[]) AND tx.confirmed_transaction_id IS NULL "
+                "UNION "
+                "SELECT tx.id, tx.transaction_id FROM transaction tx "
+                "JOIN fee f on tx.id = f.transaction_id "
+                "JOIN transition t on f.id = t.fee_id "
+                "WHERE t.transition_id = ANY(%s::text[]) AND tx.confirmed_transaction_id IS NULL",
+                (execute_transition_ids, fee_transition_ids)
+            )
+            for row in await cur.fetchall():
+                print("removing strange unconfirmed transaction:", row["transaction_id"])
+                await cur.execute(
+                    "DELETE FROM transaction WHERE id = %s",
+                    (row["id"],)
+                )
+                existing_transactions.discard(row["transaction_id"])
+
+        transition_buffer = _TransitionBuffer()
+        await transition_buffer.reserve(cur, block_transitions, list(block.transactions))
+        await transition_buffer.load_existing_transitions(cur, block_transitions)
+        finalize_operation_buffer = _FinalizeOperationBuffer()
+        await finalize_operation_buffer.reserve(cur, block)
+
+        # COPY is not allowed in pipeline mode, the buffers are flushed after it
+        async with self._pipeline(cur):
+            for ct_index, confirmed_transaction in enumerate(block.transactions):
+                confirmed_transaction: ConfirmedTransaction
+                confirmed_transaction_db_id = await transition_buffer.next_id(cur, "confirmed_transaction")
+                await cur.execute(
+                    "INSERT INTO confirmed_transaction (id, block_id, index, type) VALUES (%s, %s, %s, %s)",
+                    (confirmed_transaction_db_id, block_db_id, confirmed_transaction.index, confirmed_transaction.type.name)
+                )
+
+                transaction = confirmed_transaction.transaction
+
+                # track supply for credit split fee
+                if isinstance(transaction, ExecuteTransaction):
+                    transitions = transaction.execution.transitions
+                    for transition in transitions:
+                        if transition.program_id == "credits.aleo" and transition.function_name == "split":
+                            supply_tracker.burn(10000)
+
+                await self._insert_transaction(cur, self.redis, transition_buffer, transaction, confirmed_transaction, ct_index,
+                                               ignore_deploy_txids, confirmed_transaction_db_id, reject_reasons,
+                                               first_seen=str(transaction.id) not in existing_transactions)
+
+                for index, finalize_operation in enumerate(confirmed_transaction.finalize):
+                    await finalize_operation_buffer.add(cur, confirmed_transaction_db_id, index, finalize_operation)
+
+        await finalize_operation_buffer.flush(cur)
+        await transition_buffer.flush(cur)
+
+        async with self._pipeline(cur):
+            for index, ratify in enumerate(block.ratifications):
+                if isinstance(ratify, GenesisRatify):
+                    await cur.execute(
+                        "INSERT INTO ratification (block_id, index, type) VALUES (%s, %s, %s)",
+                        (block_db_id, index, ratify.type.name)
+                    )
+                    public_balances = ratify.public_balances
+                    for address, balance in public_balances:
+                        await cur.execute(
+                            "INSERT INTO ratification_genesis_balance (address, amount) VALUES (%s, %s)",
+                            (str(address), balance)
+                        )
+                    bonded_balances = ratify.bonded_balances
+                    for address, validator, withdrawal, amount in bonded_balances:
+                        await cur.execute(
+                            "INSERT INTO ratification_genesis_bonded (staker, validator, withdrawal, amount) "
+                            "VALUES (%s, %s, %s, %s)",
+                            (str(address), str(validator), str(withdrawal), amount)
+                        )
+                elif isinstance(ratify, (BlockRewardRatify, PuzzleRewardRatify)):
+                    await cur.execute(
+                        "INSERT INTO ratification (block_id, index, type, amount) VALUES (%s, %s, %s, %s)",
+                        (block_db_id, index, ratify.type.name, ratify.amount)
+                    )
+                else:
+                    raise NotImplementedError
+
+        address_puzzle_rewards: dict[str, int] = defaultdict(int)
+
+        if block.solutions.value is not None:
+            prover_solutions = block.solutions.value.solutions
+            solutions: list[tuple[Solution, int, int]] = []
+            prover_solutions_target = list(zip(
+                prover_solutions,
+                [solution.target for solution in prover_solutions]
+            ))
+            target_sum = sum(target for _, target in prover_solutions_target)
+            for prover_solution, target in prover_solutions_target:
+                solutions.append((prover_solution, target, puzzle_reward * target // target_sum))
+
+            await cur.execute(
+                "INSERT INTO puzzle_solution (block_id, target_sum) "
+                "VALUES (%s, %s) RETURNING id",
+                (block_db_id, target_sum)
+            )
+            if (res := await cur.fetchone()) is None:
+                raise RuntimeError("failed to insert row into database")
+            puzzle_solution_db_id = res["id"]
+            copy_data: list[tuple[int, str, u64, int, int, str, str]] = []
+            for solution, target, reward in solutions:
+                solution: Solution
+                # dag_vertex_db_id = dag_transmission_ids[0][str(partial_solution.commitment)]
+                copy_data.append(
+                    (puzzle_solution_db_id, str(solution.partial_solution.address), solution.partial_solution.counter,
+                     solution.target, reward, str(solution.partial_solution.epoch_hash), str(solution.partial_solution.solution_id))
+                )
+                if reward > 0:
+                    address_puzzle_rewards[str(solution.partial_solution.address)] += reward
+            if not os.environ.get("DEBUG_SKIP_COINBASE"):
+                async with cur.copy("COPY solution (puzzle_solution_id, address, counter, target, reward, epoch_hash, solution_id) FROM STDIN") as copy:
+                    for row in copy_data:
+                        await copy.write_row(row)
+                for address, reward in address_puzzle_rewards.items():
+                    address_stats.add("address_puzzle_reward", address, reward)
+
+                # running solution count and reward totals in stats
+                solution_stats: list[tuple[str, int]] = []
+                for count_name, reward_name in DatabaseAddress._solution_stats_names(block.height, block.header.metadata.timestamp):
+                    solution_stats.append((count_name, len(prover_solutions)))
+                    solution_stats.append((reward_name, sum(reward for _, _, reward in solutions)))
+                # per minute solution count and work (previous proof target per solution) of each prover
+                address_solution_counts: dict[str, int] = defaultdict(int)
+                for solution in prover_solutions:
+                    address_solution_counts[str(solution.partial_solution.address)] += 1
+                bucket = block.header.metadata.timestamp - block.header.metadata.timestamp % 60
+                proof_target = cast(TipState, tip).proof_target
+                async with self._pipeline(cur):
+                    await cur.executemany(
+                        "INSERT INTO address_solution_bucket (address, timestamp, solution_count, work) "
+                        "VALUES (%s, %s, %s, %s) "
+                        "ON CONFLICT (address, timestamp) DO UPDATE SET "
+                        "solution_count = address_solution_bucket.solution_count + excluded.solution_count, "
+                        "work = address_solution_bucket.work + excluded.work",
+                        [(address, bucket, count, count * proof_target) for address, count in address_solution_counts.items()]
+                    )
+                    await cur.executemany(
+                        "INSERT INTO stats (name, value) VALUES (%s, %s) "
+                        "ON CONFLICT (name) DO UPDATE SET value = stats.value + excluded.value",
+                        solution_stats
+                    )
+
+        async with self._pipeline(cur):
+            for aborted in block.aborted_transaction_ids:
+                await cur.execute(
+                    "INSERT INTO block_aborted_transaction_id (block_id, transaction_id) VALUES (%s, %s)",
+                    (block_db_id, str(aborted))
+                )
+                await self._process_aborted_transaction(cur, aborted)
+
+            for aborted in block.aborted_solution_ids:
+                await cur.execute(
+                    "INSERT INTO block_aborted_solution_id (block_id, solution_id) VALUES (%s, %s)",
+                    (block_db_id, str(aborted))
+                )
+
+            await self._post_ratify(
+                cur, self.redis, mapping_buffer, block.height, block.round, block.ratifications.ratifications,
+                address_puzzle_rewards, supply_tracker, address_stats
+            )
+
+        # per minute signed and eligible block counts and stake of each committee member, from the committee
+        # and validators written above
+        await cur.execute(
+            "INSERT INTO validator_participation_bucket "
+            "(address, timestamp, signed_count, eligible_count, signed_stake, eligible_stake) "
+            "SELECT chm.address, %s, (bv.validator IS NOT NULL)::int, 1, "
+            "CASE WHEN bv.validator IS NOT NULL THEN chm.stake ELSE 0 END, chm.stake "
+            "FROM committee_history ch "
+            "JOIN committee_history_member chm ON chm.committee_id = ch.id "
+            "LEFT JOIN block_validator bv ON bv.block_id = %s AND bv.validator = chm.address "
+            "WHERE ch.height = %s "
+            "ON CONFLICT (address, timestamp) DO UPDATE SET "
+            "signed_count = validator_participation_bucket.signed_count + excluded.signed_count, "
+            "eligible_count = validator_participation_bucket.eligible_count + excluded.eligible_count, "
+            "signed_stake = validator_participation_bucket.signed_stake + excluded.signed_stake, "
+            "eligible_stake = validator_participation_bucket.eligible_stake + excluded.eligible_stake",
+            (block.header.metadata.timestamp - block.header.metadata.timestamp % 60, block_db_id, block.height)
+        )
+        await mapping_buffer.flush(cur)
+        await address_stats.apply(self.redis, self.redis_journal, block.header.metadata.timestamp)
+
+        if os.environ.get("DEBUG_MAPPING_DUMP", False):
+            async def read_redis_mapping(key: str) -> list[tuple[str, str]]:
+                data = await self.redis.hgetall(key)
+                r: list[tuple[str, str]] = []
+                for d in data.values():
+                    d = json.loads(d)
+                    key = str(Plaintext.load(BytesIO(bytes.fromhex(d["key"]))))
+                    value = Value.load(BytesIO(bytes.fromhex(d["value"])))
+                    if isinstance(value, PlaintextValue):
+                        plaintext = value.plaintext
+                        if isinstance(plaintext, StructPlaintext):
+                            s = ""
+                            members = plaintext.members
+                            for k, v in members:
+                                if not s:
+                                    s += f"{{\n  {str(k)}: {str(v)}"
+                                else:
+                                    s += f",\n  {str(k)}: {str(v)}"
+                            s += "\n}"
+                        else:
+                            s = str(plaintext)
+                    else:
+                        s = str(value)
+                    r.append((key, s))
+                return sorted(r, key=lambda x: x[0])
+
+            def write_mapping_debug(data: list[tuple[str, str]], path: str):
+                with open(path, "w") as f:
+                    for key, value in data:
+                        f.write(f"{key} -> {value}\n")
+
+            os.makedirs(f"/tmp/mapping_debug/{block.height}/self", exist_ok=True)
+            committee_data = await read_redis_mapping("credits.aleo:committee")
+            write_mapping_debug(committee_data, f"/tmp/mapping_debug/{block.height}/self/committee")
+            delegated_data = await read_redis_mapping("credits.aleo:delegated")
+            write_mapping_debug(delegated_data, f"/tmp/mapping_debug/{block.height}/self/delegated")
+            bonded_data = await read_redis_mapping("credits.aleo:bonded")
+            write_mapping_debug(bonded_data, f"/tmp/mapping_debug/{block.height}/self/bonded")
+            await cur.execute(
+                "SELECT key, value FROM mapping_value mv "
+                "JOIN mapping m ON mv.mapping_id = m.id "
+                "WHERE m.program_id = 'credits.aleo' AND m.mapping = 'account'"
+            )
+            account_data = await cur.fetchall()
+            values: list[tuple[str, str]] = []
+            for ad in account_data:
+                key = str(Plaintext.load(BytesIO(ad["key"])))
+                value = Value.load(BytesIO(ad["value"]))
+                if isinstance(value, PlaintextValue):
+                    plaintext = value.plaintext
+                    if isinstance(plaintext, StructPlaintext):
+                        s = ""
+                        members = plaintext.members
+                        for k, v in members:
+                            if not s:
+                                s += f"{{\n  {str(k)}: {str(v)}"
+                            else:
+                                s += f",\n  {str(k)}: {str(v)}"
+                        s += "\n}"
+                    else:
+                        s = str(plaintext)
+                else:
+                    s = str(value)
+                values.append((key, s))
+
+            write_mapping_debug(sorted(values, key=lambda x: x[0]), f"/tmp/mapping_debug/{block.height}/self/account")
+
+
+        async with self._pipeline(cur):
+            await cur.execute(
+                "UPDATE block SET total_supply = %s WHERE id = %s",
+                (supply_tracker.supply, block_db_id)
+            )
+
+            puzzle_diff = puzzle_reward - supply_tracker.actual_puzzle_reward
+            if puzzle_diff != 0:
+                await cur.execute(
+                    "INSERT INTO stats (name, value) VALUES ('puzzle_reward_diff', %s) "
+                    "ON CONFLICT (name) DO UPDATE SET value = stats.value + %s",
+                    (puzzle_diff, puzzle_diff)
+                )
+
+            block_diff = int(block_reward) - supply_tracker.actual_block_reward
+            if block_diff != 0:
+                await cur.execute(
+                    "INSERT INTO stats (name, value) VALUES ('block_reward_diff', %s) "
+                    "ON CONFLICT (name) DO UPDATE SET value = stats.value + %s",
+                    (block_diff, block_diff)
+                )
+
+        if block.height % 100 == 0:
+            # temporarily disable this as it seems we don't have lingering unconfirmed tx anymore
+            pass
+            # await self.cleanup_unconfirmed_transactions()
+
+        return TipState(
+            block.height, block.block_hash, block.header.metadata.timestamp, block.header.metadata.coinbase_target,
+            block.header.metadata.cumulative_proof_target, block.header.metadata.proof_target, supply_tracker.supply
+        )
+
     async def cleanup_unconfirmed_transactions(self):
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -1719,15 +2030,22 @@ class DatabaseInsert(DatabaseBase):
                     (int(time.time()) - 86400 * 7,)
                 )
 
-    async def save_block(self, block: Block):
-        await self._save_block(block)
+    async def save_block(self, block: Block, tip: Optional[TipState] = None) -> TipState:
+        return await self._save_block(block, tip)
+
+    async def save_blocks(self, blocks: list[Block], tip: Optional[TipState] = None) -> TipState:
+        return await self._save_blocks(blocks, tip)
 
     async def save_unconfirmed_transaction(self, transaction: Transaction):
         if isinstance(transaction, FeeTransaction):
             raise RuntimeError("rejected transaction cannot be unconfirmed")
         async with self.pool.connection() as conn:
-            async with conn.cursor() as cur:
-                await self._insert_transaction(cur, self.redis, transaction)
+            async with conn.transaction():
+                async with conn.cursor() as cur:
+                    transition_buffer = _TransitionBuffer()
+                    await transition_buffer.reserve(cur, _TransitionBuffer.transaction_transitions(transaction))
+                    await self._insert_transaction(cur, self.redis, transition_buffer, transaction)
+                    await transition_buffer.flush(cur)
 
     async def save_feedback(self, contact: str, content: str):
         async with self.pool.connection() as conn:
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+import psycopg
+from psycopg.rows import DictRow
+from redis.asyncio import Redis
+
+from aleo_types import *
+from explorer.types import Message as ExplorerMessage
+from .base import DatabaseBase
+
+
+class DatabaseLeaderboard(DatabaseBase):
+
+    # Every address_* redis hash has a leaderboard:address_* sorted set with the same totals, and a
+    # leaderboard:address_*:day:{timestamp // 86400} sorted set per UTC day, both updated with the hash.
+    leaderboard_keys = [
+        "address_puzzle_reward",
+        "address_stake_reward",
+        "address_transfer_in",
+        "address_transfer_out",
+        "address_fee",
+    ]
+
+    # the incentive program ran from 2024-07-01 16:00 to 2024-07-15 16:00 UTC, its rankings are kept separately
+    incentive_start = 1719849600
+    incentive_end = 1721059200
+    incentive_key = "leaderboard:address_puzzle_reward:incentive"
+
+    @staticmethod
+    def leaderboard_key(key: str, day: Optional[int] = None) -> str:
+        if day is None:
+            return f"leaderboard:{key}"
+        return f"leaderboard:{key}:day:{day}"
+
+    async def _get_leaderboard_key(self, key: str, days: Optional[tuple[int, int]]) -> str:
+        # days is a [start, end) range of UTC days, merged into a short lived sorted set
+        if key not in self.leaderboard_keys:
+            raise ValueError("invalid leaderboard")
+        if days is None:
+            return self.leaderboard_key(key)
+        start, end = days
+        if end - start == 1:
+            return self.leaderboard_key(key, start)
+        window_key = f"leaderboard:{key}:window:{start}:{end}"
+        if await self.redis.exists(window_key) == 0:
+            pipe = self.redis.pipeline()
+            pipe.zunionstore(window_key, [self.leaderboard_key(key, day) for day in range(start, end)])
+            pipe.expire(window_key, 60)
+            await pipe.execute() # type: ignore
+        return window_key
+
+    async def get_leaderboard(self, key: str, start: int, end: int, days: Optional[tuple[int, int]] = None) -> list[dict[str, Any]]:
+        try:
+            leaderboard_key = await self._get_leaderboard_key(key, days)
+            data = await self.redis.zrevrange(leaderboard_key, start, end - 1, withscores=True)
+            return [{"address": address, "value": int(value)} for address, value in data]
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
+
+    async def get_leaderboard_count(self, key: str, days: Optional[tuple[int, int]] = None) -> int:
+        try:
+            return await self.redis.zcard(await self._get_leaderboard_key(key, days))
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
+
+    async def get_leaderboard_rank(self, key: str, address: str, days: Optional[tuple[int, int]] = None) -> Optional[tuple[int, int]]: # (rank from 0, value)
+        try:
+            leaderboard_key = await self._get_leaderboard_key(key, days)
+            rank = await self.redis.zrevrank(leaderboard_key, address)
+            if rank is None:
+                return None
+            return rank, int(cast(float, await self.redis.zscore(leaderboard_key, address)))
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
+
+    @staticmethod
+    async def build_incentive_leaderboard(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        # static once the database is past the end of the program, rebuilt every minute until then
+        key = DatabaseLeaderboard.incentive_key
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT timestamp FROM block ORDER BY height DESC LIMIT 1")
+            res = await cur.fetchone()
+            complete = res is not None and res["timestamp"] >= DatabaseLeaderboard.incentive_end
+            await cur.execute(
+                "SELECT s.address, sum(s.reward) AS reward FROM solution s "
+                "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
+                "JOIN block b ON ps.block_id = b.id "
+                "WHERE b.timestamp > %s AND b.timestamp < %s "
+                "GROUP BY s.address",
+                (DatabaseLeaderboard.incentive_start, DatabaseLeaderboard.incentive_end)
+            )
+            rewards = {row["address"]: int(row["reward"]) for row in await cur.fetchall()}
+            await cur.execute(
+                "INSERT INTO stats (name, value) VALUES ('incentive_reward', %s) "
+                "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                (sum(rewards.values()),)
+            )
+        pipe = redis.pipeline()
+        pipe.delete(key)
+        if rewards:
+            pipe.zadd(key, rewards) # type: ignore[arg-type]
+        pipe.set(f"{key}:built", 1)
+        if not complete:
+            pipe.expire(key, 60)
+            pipe.expire(f"{key}:built", 60)
+        await pipe.execute() # type: ignore
+
+    async def _ensure_incentive_leaderboard(self):
+        if await self.redis.exists(f"{self.incentive_key}:built") == 0:
+            async with self.pool.connection() as conn:
+                await self.build_incentive_leaderboard(conn, self.redis)
+
+    async def get_incentive_address_count(self) -> int:
+        try:
+            await self._ensure_incentive_leaderboard()
+            return await self.redis.zcard(self.incentive_key)
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
+
+    async def get_incentive_addresses(self, start: int, end: int) -> list[dict[str, Any]]:
+        try:
+            await self._ensure_incentive_leaderboard()
+            data = await self.redis.zrevrange(self.incentive_key, start, end - 1, withscores=True)
+            return [{"address": address, "reward": int(reward)} for address, reward in data]
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
+
+    async def get_incentive_total_reward(self) -> Decimal:
+        try:
+            await self._ensure_incentive_leaderboard()
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    await cur.execute("SELECT value FROM stats WHERE name = 'incentive_reward'")
+                    if (res := await cur.fetchone()) is None:
+                        return Decimal(0)
+                    return res["value"]
+        except Exception as e:
+            await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+            raise
@@ -2,6 +2,7 @@
 from .address import DatabaseAddress
 from .block import DatabaseBlock
 from .insert import DatabaseInsert
+from .leaderboard import DatabaseLeaderboard
 from .mapping import DatabaseMapping
 from .migrate import DatabaseMigrate
 from .program import DatabaseProgram
@@ -9,6 +10,6 @@ from .search import DatabaseSearch
 from .util import DatabaseUtil
 from .validator import DatabaseValidator
 
-class Database(DatabaseAddress, DatabaseBlock, DatabaseInsert, DatabaseMapping, DatabaseMigrate, DatabaseProgram,
-               DatabaseSearch, DatabaseUtil, DatabaseValidator):
+class Database(DatabaseAddress, DatabaseBlock, DatabaseInsert, DatabaseLeaderboard, DatabaseMapping, DatabaseMigrate,
+               DatabaseProgram, DatabaseSearch, DatabaseUtil, DatabaseValidator):
     pass
\ No newline at end of file
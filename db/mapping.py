@@ -6,10 +6,90 @@ import psycopg.sql
 from aleo_types import *
 from aleo_types.cached import cached_get_mapping_id
 from explorer.types import Message as ExplorerMessage
+from util.global_cache import global_mapping_registry
+from util.redis_journal import RedisJournal
 from .base import DatabaseBase
 
 
+class MappingBuffer:
+    # Mapping writes of one block. mapping_value changes are coalesced per key and mapping_history keeps
+    # every change, with previous_id chained in memory; flush() writes everything with a few statements.
+
+    def __init__(self):
+        # (mapping_id, key_id) -> (value_id, key, value), value_id is None for removed keys
+        self.values: dict[tuple[str, str], tuple[Optional[str], bytes, Optional[bytes]]] = {}
+        # (mapping_id, height, key_id, key, value, from_transaction)
+        self.history: list[tuple[str, int, str, bytes, Optional[bytes], bool]] = []
+
+    def set(self, mapping_id: str, key_id: str, value_id: Optional[str], key: bytes, value: Optional[bytes],
+            height: int, from_transaction: bool, track_value: bool):
+        if track_value:
+            self.values[(mapping_id, key_id)] = (value_id, key, value)
+        self.history.append((mapping_id, height, key_id, key, value, from_transaction))
+
+    async def flush(self, cur: psycopg.AsyncCursor[dict[str, Any]]):
+        if not self.history:
+            return
+        mapping_db_ids: dict[str, int] = {}
+        for mapping_id in {h[0] for h in self.history}:
+            if (mapping_db_id := await global_mapping_registry.get_id(cur, mapping_id)) is None:
+                raise ValueError(f"mapping {mapping_id} not found")
+            mapping_db_ids[mapping_id] = mapping_db_id
+
+        key_ids = list({h[2] for h in self.history})
+        await cur.execute(
+            "SELECT key_id, last_history_id FROM mapping_history_last_id WHERE key_id = ANY(%s)",
+            (key_ids,)
+        )
+        last_ids: dict[str, int] = {r["key_id"]: r["last_history_id"] for r in await cur.fetchall()}
+
+        await cur.execute(
+            "SELECT ARRAY(SELECT nextval('mapping_history_id_seq') FROM generate_series(1, %s)) AS ids",
+            (len(self.history),)
+        )
+        if (res := await cur.fetchone()) is None:
+            raise ValueError("failed to reserve mapping history ids")
+        async with cur.copy(
+            "COPY mapping_history (id, mapping_id, height, key_id, key, value, from_transaction, previous_id) FROM STDIN"
+        ) as copy:
+            for history_id, (mapping_id, height, key_id, key, value, from_transaction) in zip(res["ids"], self.history):
+                await copy.write_row(
+                    (history_id, mapping_db_ids[mapping_id], height, key_id, key, value, from_transaction, last_ids.get(key_id))
+                )
+                last_ids[key_id] = history_id
+        await cur.execute(
+            "INSERT INTO mapping_history_last_id (key_id, last_history_id) "
+            "SELECT * FROM unnest(%s::text[], %s::bigint[]) "
+            "ON CONFLICT (key_id) DO UPDATE SET last_history_id = excluded.last_history_id",
+            (key_ids, [last_ids[k] for k in key_ids])
+        )
+
+        updated = [(mapping_db_ids[m], k, v) for (m, k), v in self.values.items() if v[0] is not None]
+        removed = [(mapping_db_ids[m], k) for (m, k), v in self.values.items() if v[0] is None]
+        if updated:
+            await cur.execute(
+                "INSERT INTO mapping_value (mapping_id, key_id, value_id, key, value) "
+                "SELECT * FROM unnest(%s::integer[], %s::text[], %s::text[], %s::bytea[], %s::bytea[]) "
+                "ON CONFLICT (mapping_id, key_id) DO UPDATE SET value_id = excluded.value_id, value = excluded.value",
+                (
+                    [u[0] for u in updated], [u[1] for u in updated], [u[2][0] for u in updated],
+                    [u[2][1] for u in updated], [u[2][2] for u in updated]
+                )
+            )
+        if removed:
+            await cur.execute(
+                "DELETE FROM mapping_value mv USING unnest(%s::integer[], %s::text[]) AS r(mapping_id, key_id) "
+                "WHERE mv.mapping_id = r.mapping_id AND mv.key_id = r.key_id",
+                ([r[0] for r in removed], [r[1] for r in removed])
+            )
+        self.values.clear()
+        self.history.clear()
+
+
 class DatabaseMapping(DatabaseBase):
+
+    redis_journal: RedisJournal
+
     async def get_mapping_cache_with_cur(self, cur: psycopg.AsyncCursor[dict[str, Any]], program_name: str,
                                          mapping_name: str) -> dict[Field, Any]:
         if program_name == "credits.aleo" and mapping_name in ["committee", "bonded", "delegated"]:
@@ -23,11 +103,12 @@ class DatabaseMapping(DatabaseBase):
         else:
             mapping_id = Field.loads(cached_get_mapping_id(program_name, mapping_name))
             try:
+                mapping_db_id = await global_mapping_registry.get_id(cur, str(mapping_id))
+                if mapping_db_id is None:
+                    return {}
                 await cur.execute(
-                    "SELECT key_id, key, value FROM mapping_value mv "
-                    "JOIN mapping m on mv.mapping_id = m.id "
-                    "WHERE m.mapping_id = %s ",
-                    (str(mapping_id),)
+                    "SELECT key_id, key, value FROM mapping_value WHERE mapping_id = %s",
+                    (mapping_db_id,)
                 )
                 data = await cur.fetchall()
                 def transform(d: dict[str, Any]):
@@ -56,11 +137,12 @@ class DatabaseMapping(DatabaseBase):
                             return None
                         return bytes.fromhex(json.loads(data)["value"])
                     else:
+                        mapping_db_id = await global_mapping_registry.get_id_by_name(cur, program_id, mapping)
+                        if mapping_db_id is None:
+                            return None
                         await cur.execute(
-                            "SELECT value FROM mapping_value mv "
-                            "JOIN mapping m on mv.mapping_id = m.id "
-                            "WHERE m.program_id = %s AND m.mapping = %s AND mv.key_id = %s",
-                            (program_id, mapping, key_id)
+                            "SELECT value FROM mapping_value WHERE mapping_id = %s AND key_id = %s",
+                            (mapping_db_id, key_id)
                         )
                         res = await cur.fetchone()
                         if res is None:
@@ -74,11 +156,12 @@ class DatabaseMapping(DatabaseBase):
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
                 try:
+                    mapping_db_id = await global_mapping_registry.get_id_by_name(cur, program_id, mapping)
+                    if mapping_db_id is None:
+                        return 0
                     await cur.execute(
-                        "SELECT COUNT(*) FROM mapping_value mv "
-                        "JOIN mapping m on mv.mapping_id = m.id "
-                        "WHERE m.program_id = %s AND m.mapping = %s",
-                        (program_id, mapping)
+                        "SELECT COUNT(*) FROM mapping_value WHERE mapping_id = %s",
+                        (mapping_db_id,)
                     )
                     if (res := await cur.fetchone()) is None:
                         return 0
@@ -101,13 +184,15 @@ class DatabaseMapping(DatabaseBase):
                         data = await conn.hscan(f"{program_id}:{mapping}", cursor, count=count)
                         return {Field.loads(k): transform(json.loads(v)) for k, v in data[1].items()}, data[0]
                     else:
+                        mapping_db_id = await global_mapping_registry.get_id_by_name(cur, program_id, mapping)
+                        if mapping_db_id is None:
+                            return {}, 0
                         cursor_clause = psycopg.sql.SQL("AND mv.id < {} ").format(psycopg.sql.Literal(cursor)) if cursor > 0 else psycopg.sql.SQL("")
                         await cur.execute(
                             psycopg.sql.Composed([
                                 psycopg.sql.SQL(
                                     "SELECT mv.id, key_id, key, value FROM mapping_value mv "
-                                    "JOIN mapping m on mv.mapping_id = m.id "
-                                    "WHERE m.program_id = %s AND m.mapping = %s "
+                                    "WHERE mv.mapping_id = %s "
                                 ),
                                 cursor_clause,
                                 psycopg.sql.SQL(
@@ -115,7 +200,7 @@ class DatabaseMapping(DatabaseBase):
                                     "LIMIT %s"
                                 )
                             ]),
-                            (program_id, mapping, count)
+                            (mapping_db_id, count)
                         )
                         data = await cur.fetchall()
                         def transform(d: dict[str, Any]):
@@ -137,11 +222,12 @@ class DatabaseMapping(DatabaseBase):
                         conn = self.redis
                         return await conn.hlen(f"{program_id}:{mapping}")
                     else:
+                        mapping_db_id = await global_mapping_registry.get_id_by_name(cur, program_id, mapping)
+                        if mapping_db_id is None:
+                            return 0
                         await cur.execute(
-                            "SELECT COUNT(*) FROM mapping_value mv "
-                            "JOIN mapping m on mv.mapping_id = m.id "
-                            "WHERE m.program_id = %s AND m.mapping = %s",
-                            (program_id, mapping)
+                            "SELECT COUNT(*) FROM mapping_value WHERE mapping_id = %s",
+                            (mapping_db_id,)
                         )
                         if (res := await cur.fetchone()) is None:
                             return 0
@@ -153,13 +239,25 @@ class DatabaseMapping(DatabaseBase):
     async def initialize_mapping(self, cur: psycopg.AsyncCursor[dict[str, Any]], mapping_id: str, program_id: str, mapping: str):
         try:
             await cur.execute(
-                "INSERT INTO mapping (mapping_id, program_id, mapping) VALUES (%s, %s, %s)",
+                "INSERT INTO mapping (mapping_id, program_id, mapping) VALUES (%s, %s, %s) RETURNING id",
                 (mapping_id, program_id, mapping)
             )
+            if (res := await cur.fetchone()) is None:
+                raise ValueError("failed to insert mapping")
+            global_mapping_registry.add(res["id"], mapping_id, program_id, mapping)
         except Exception as e:
             await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
             raise
 
+    async def load_mapping_registry(self):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    await global_mapping_registry.load(cur)
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
+
     async def initialize_builtin_mapping(self, mapping_id: str, program_id: str, mapping: str):
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -173,9 +271,9 @@ class DatabaseMapping(DatabaseBase):
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
-    async def update_mapping_key_value(self, cur: psycopg.AsyncCursor[dict[str, Any]], program_name: str,
-                                       mapping_name: str, mapping_id: str, key_id: str, value_id: str,
-                                       key: bytes, value: bytes, height: int, from_transaction: bool):
+    async def update_mapping_key_value(self, buffer: MappingBuffer, program_name: str, mapping_name: str,
+                                       mapping_id: str, key_id: str, value_id: str, key: bytes, value: bytes,
+                                       height: int, from_transaction: bool):
         try:
             limited_tracking = program_name == "credits.aleo" and mapping_name in ["committee", "bonded", "delegated"]
             if limited_tracking:
@@ -184,89 +282,27 @@ class DatabaseMapping(DatabaseBase):
                     "key": key.hex(),
                     "value": value.hex(),
                 }
+                await self.redis_journal.save(f"{program_name}:{mapping_name}", [key_id])
                 await conn.hset(f"{program_name}:{mapping_name}", key_id, json.dumps(data))
 
             if not limited_tracking or from_transaction:
-                await cur.execute("SELECT id FROM mapping WHERE mapping_id = %s", (mapping_id,))
-                mapping = await cur.fetchone()
-                if mapping is None:
-                    raise ValueError(f"mapping {mapping_id} not found")
-                mapping_id = mapping['id']
-
-                if not limited_tracking:
-                    await cur.execute(
-                        "INSERT INTO mapping_value (mapping_id, key_id, value_id, key, value) "
-                        "VALUES (%s, %s, %s, %s, %s) "
-                        "ON CONFLICT (mapping_id, key_id) DO UPDATE SET value_id = %s, value = %s",
-                        (mapping_id, key_id, value_id, key, value, value_id, value)
-                    )
-
-                await cur.execute(
-                    "SELECT last_history_id FROM mapping_history_last_id WHERE key_id = %s",
-                    (key_id,)
-                )
-                previous_id = res['last_history_id'] if (res := await cur.fetchone()) is not None else None
-
-                await cur.execute(
-                    "INSERT INTO mapping_history (mapping_id, height, key_id, key, value, from_transaction, previous_id) "
-                    "VALUES (%s, %s, %s, %s, %s, %s, %s) "
-                    "RETURNING id",
-                    (mapping_id, height, key_id, key, value, from_transaction, previous_id)
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise ValueError("failed to insert mapping history")
-                latest_id = res['id']
-                await cur.execute(
-                    "INSERT INTO mapping_history_last_id (key_id, last_history_id) VALUES (%s, %s) "
-                    "ON CONFLICT (key_id) DO UPDATE SET last_history_id = %s",
-                    (key_id, latest_id, latest_id)
-                )
+                buffer.set(mapping_id, key_id, value_id, key, value, height, from_transaction, not limited_tracking)
 
         except Exception as e:
             await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
             raise
 
-    async def remove_mapping_key_value(self, cur: psycopg.AsyncCursor[dict[str, Any]], program_name: str,
-                                       mapping_name: str, mapping_id: str, key_id: str, key: bytes, height: int,
-                                       from_transaction: bool):
+    async def remove_mapping_key_value(self, buffer: MappingBuffer, program_name: str, mapping_name: str,
+                                       mapping_id: str, key_id: str, key: bytes, height: int, from_transaction: bool):
         try:
             limited_tracking = program_name == "credits.aleo" and mapping_name in ["committee", "bonded", "delegated"]
             if limited_tracking:
                 conn = self.redis
+                await self.redis_journal.save(f"{program_name}:{mapping_name}", [key_id])
                 await conn.hdel(f"{program_name}:{mapping_name}", key_id)
 
             if not limited_tracking or from_transaction:
-                await cur.execute("SELECT id FROM mapping WHERE mapping_id = %s", (mapping_id,))
-                mapping = await cur.fetchone()
-                if mapping is None:
-                    raise ValueError(f"mapping {mapping_id} not found")
-                mapping_id = mapping['id']
-                if not limited_tracking:
-                    await cur.execute(
-                        "DELETE FROM mapping_value WHERE mapping_id = %s AND key_id = %s",
-                        (mapping_id, key_id)
-                    )
-
-                await cur.execute(
-                    "SELECT last_history_id FROM mapping_history_last_id WHERE key_id = %s",
-                    (key_id,)
-                )
-                previous_id = res['last_history_id'] if (res := await cur.fetchone()) is not None else None
-
-                await cur.execute(
-                    "INSERT INTO mapping_history (mapping_id, height, key_id, key, value, from_transaction, previous_id) "
-                    "VALUES (%s, %s, %s, %s, NULL, %s, %s) "
-                    "RETURNING id",
-                    (mapping_id, height, key_id, key, from_transaction, previous_id)
-                )
-                if (res := await cur.fetchone()) is None:
-                    raise ValueError("failed to insert mapping history")
-                latest_id = res['id']
-                await cur.execute(
-                    "INSERT INTO mapping_history_last_id (key_id, last_history_id) VALUES (%s, %s) "
-                    "ON CONFLICT (key_id) DO UPDATE SET last_history_id = %s",
-                    (key_id, latest_id, latest_id)
-                )
+                buffer.set(mapping_id, key_id, None, key, None, height, from_transaction, not limited_tracking)
 
         except Exception as e:
             await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
@@ -390,13 +426,15 @@ class DatabaseMapping(DatabaseBase):
                             if (data := mapping_data.get(key_id)) is None:
                                 return None
                             return bytes.fromhex(data)
+                    mapping_db_id = await global_mapping_registry.get_id_by_name(cur, program_id, mapping)
+                    if mapping_db_id is None:
+                        return None
                     await cur.execute(
-                        "SELECT value FROM mapping_history mh "
-                        "JOIN mapping m on mh.mapping_id = m.id "
-                        "WHERE m.program_id = %s AND m.mapping = %s AND mh.key_id = %s AND mh.height <= %s "
-                        "ORDER BY mh.id DESC "
+                        "SELECT value FROM mapping_history "
+                        "WHERE mapping_id = %s AND key_id = %s AND height <= %s "
+                        "ORDER BY id DESC "
                         "LIMIT 1",
-                        (program_id, mapping, key_id, height)
+                        (mapping_db_id, key_id, height)
                     )
                     if (res := await cur.fetchone()) is None:
                         return None
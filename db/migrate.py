@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from collections import defaultdict
 from typing import Awaitable, LiteralString
 
 import psycopg
@@ -10,6 +11,7 @@ from redis.asyncio.client import Redis
 from aleo_types import *
 from explorer.types import Message as ExplorerMessage
 from .base import DatabaseBase
+from .leaderboard import DatabaseLeaderboard
 
 
 class DatabaseMigrate(DatabaseBase):
@@ -26,6 +28,12 @@ class DatabaseMigrate(DatabaseBase):
             (7, self.migrate_7_rebuild_solution_id_index_with_ops),
             (8, self.migrate_8_fix_missing_fee_stats),
             (9, self.migrate_9_fix_object_orders),
+            (10, self.migrate_10_add_block_raw_table),
+            (11, self.migrate_11_add_block_counters),
+            (12, self.migrate_12_add_address_solution_bucket),
+            (13, self.migrate_13_add_validator_participation_bucket),
+            (14, self.migrate_14_add_solution_stats),
+            (15, self.migrate_15_add_leaderboards),
         ]
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -159,4 +167,192 @@ create table validator_info
 
     @staticmethod
     async def migrate_9_fix_object_orders(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
-        await conn.execute(cast(LiteralString, open("db/migrate_9.sql").read()))
\ No newline at end of file
+        await conn.execute(cast(LiteralString, open("db/migrate_9.sql").read()))
+
+    @staticmethod
+    async def migrate_10_add_block_raw_table(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        await conn.execute("""
+create table block_raw
+(
+    block_id integer not null
+        constraint block_raw_pk
+            primary key
+        constraint block_raw_block_id_fk
+            references block
+            on delete cascade,
+    data     bytea   not null
+)""")
+
+    @staticmethod
+    async def migrate_11_add_block_counters(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        async with conn.cursor() as cur:
+            await cur.execute("alter table block add column transaction_count integer not null default 0")
+            await cur.execute("alter table block add column partial_solution_count integer not null default 0")
+            await cur.execute("alter table block add column transition_count integer not null default 0")
+            await cur.execute("alter table block add column fee_sum numeric(20,0) not null default 0")
+            await cur.execute("""
+                update block b set transaction_count = c.count
+                from (select block_id, count(*) from confirmed_transaction group by block_id) c
+                where c.block_id = b.id
+            """)
+            await cur.execute("""
+                update block b set partial_solution_count = c.count
+                from (
+                    select ps.block_id, count(*)
+                    from puzzle_solution ps
+                             join solution s on s.puzzle_solution_id = ps.id
+                    group by ps.block_id
+                ) c
+                where c.block_id = b.id
+            """)
+            await cur.execute("""
+                update block b set transition_count = c.count
+                from (
+                    select ct.block_id, count(*)
+                    from confirmed_transaction ct
+                             join transaction tx on tx.confirmed_transaction_id = ct.id
+                             join transaction_execute te on te.transaction_id = tx.id
+                             join transition ts on ts.transaction_execute_id = te.id
+                    group by ct.block_id
+                ) c
+                where c.block_id = b.id
+            """)
+            await cur.execute("""
+                update block b set transition_count = transition_count + c.count
+                from (
+                    select ct.block_id, count(*)
+                    from confirmed_transaction ct
+                             join transaction tx on tx.confirmed_transaction_id = ct.id
+                             join fee f on f.transaction_id = tx.id
+                             join transition ts on ts.fee_id = f.id
+                    group by ct.block_id
+                ) c
+                where c.block_id = b.id
+            """)
+
+        # fee amounts are only in the fee transition inputs: base and priority fee are inputs 0 and 1 of
+        # fee_public, 1 and 2 of fee_private
+        fee_sums: dict[int, int] = defaultdict(int)
+        async with conn.cursor(name="migrate_11_fees") as cur:
+            await cur.execute("""
+                select ct.block_id, tip.plaintext
+                from confirmed_transaction ct
+                         join transaction tx on tx.confirmed_transaction_id = ct.id
+                         join fee f on f.transaction_id = tx.id
+                         join transition ts on ts.fee_id = f.id
+                         join transition_input ti on ti.transition_id = ts.id
+                         join transition_input_public tip on tip.transition_input_id = ti.id
+                where (ts.function_name = 'fee_public' and ti.index in (0, 1))
+                   or (ts.function_name = 'fee_private' and ti.index in (1, 2))
+            """)
+            async for row in cur:
+                plaintext = cast(LiteralPlaintext, Plaintext.load(BytesIO(row["plaintext"])))
+                fee_sums[row["block_id"]] += int(cast(int, plaintext.literal.primitive))
+        async with conn.cursor() as cur:
+            await cur.executemany(
+                "update block set fee_sum = %s where id = %s",
+                [(fee_sum, block_id) for block_id, fee_sum in fee_sums.items()]
+            )
+
+    @staticmethod
+    async def migrate_12_add_address_solution_bucket(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        async with conn.cursor() as cur:
+            await cur.execute("""
+create table address_solution_bucket
+(
+    address        text          not null,
+    timestamp      bigint        not null,
+    solution_count integer       not null,
+    work           numeric(40,0) not null,
+    constraint address_solution_bucket_pk
+        primary key (address, timestamp)
+)""")
+            await cur.execute("""
+                insert into address_solution_bucket (address, timestamp, solution_count, work)
+                select s.address, b.timestamp - b.timestamp % 60, count(*), sum(p.proof_target)
+                from solution s
+                         join puzzle_solution ps on s.puzzle_solution_id = ps.id
+                         join block b on ps.block_id = b.id
+                         join block p on p.height = b.height - 1
+                group by 1, 2
+            """)
+
+    @staticmethod
+    async def migrate_13_add_validator_participation_bucket(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        async with conn.cursor() as cur:
+            await cur.execute("""
+create table validator_participation_bucket
+(
+    address        text          not null,
+    timestamp      bigint        not null,
+    signed_count   integer       not null,
+    eligible_count integer       not null,
+    signed_stake   numeric(40,0) not null,
+    eligible_stake numeric(40,0) not null,
+    constraint validator_participation_bucket_pk
+        primary key (address, timestamp)
+)""")
+            await cur.execute(
+                "create index validator_participation_bucket_timestamp_index on validator_participation_bucket (timestamp)"
+            )
+            await cur.execute("""
+                insert into validator_participation_bucket
+                    (address, timestamp, signed_count, eligible_count, signed_stake, eligible_stake)
+                select chm.address, b.timestamp - b.timestamp % 60,
+                       count(bv.validator), count(*),
+                       coalesce(sum(chm.stake) filter (where bv.validator is not null), 0), sum(chm.stake)
+                from committee_history ch
+                         join committee_history_member chm on chm.committee_id = ch.id
+                         join block b on ch.height = b.height
+                         left join block_validator bv on bv.block_id = b.id and bv.validator = chm.address
+                group by 1, 2
+            """)
+
+    @staticmethod
+    async def migrate_14_add_solution_stats(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        async with conn.cursor() as cur:
+            await cur.execute("""
+                with s as (
+                    select b.height / 360 as epoch, b.timestamp / 86400 as day, count(*) as count, sum(s.reward) as reward
+                    from solution s
+                             join puzzle_solution ps on s.puzzle_solution_id = ps.id
+                             join block b on ps.block_id = b.id
+                    group by 1, 2
+                )
+                insert into stats (name, value)
+                select 'solution_count', coalesce(sum(count), 0) from s
+                union all
+                select 'solution_reward', coalesce(sum(reward), 0) from s
+                union all
+                select 'solution_count:epoch:' || epoch, sum(count) from s group by epoch
+                union all
+                select 'solution_reward:epoch:' || epoch, sum(reward) from s group by epoch
+                union all
+                select 'solution_count:day:' || day, sum(count) from s group by day
+                union all
+                select 'solution_reward:day:' || day, sum(reward) from s group by day
+                on conflict (name) do update set value = excluded.value
+            """)
+
+    @staticmethod
+    async def migrate_15_add_leaderboards(conn: psycopg.AsyncConnection[DictRow], redis: Redis[str]):
+        for key in DatabaseLeaderboard.leaderboard_keys:
+            data = await redis.hgetall(key)
+            if data:
+                await redis.zadd(DatabaseLeaderboard.leaderboard_key(key), {address: int(value) for address, value in data.items()})
+        # only puzzle rewards can be split by day from the database, the other daily leaderboards start empty
+        day_rewards: dict[int, dict[str, int]] = defaultdict(dict)
+        async with conn.cursor(name="migrate_15_puzzle_rewards") as cur:
+            await cur.execute("""
+                select b.timestamp / 86400 as day, s.address, sum(s.reward) as reward
+                from solution s
+                         join puzzle_solution ps on s.puzzle_solution_id = ps.id
+                         join block b on ps.block_id = b.id
+                where s.reward > 0
+                group by 1, 2
+            """)
+            async for row in cur:
+                day_rewards[row["day"]][row["address"]] = int(row["reward"])
+        for day, rewards in day_rewards.items():
+            await redis.zadd(DatabaseLeaderboard.leaderboard_key("address_puzzle_reward", day), rewards) # type: ignore[arg-type]
+        await DatabaseLeaderboard.build_incentive_leaderboard(conn, redis)
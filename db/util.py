@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import signal
+from collections import defaultdict
 
 from aleo_explorer_rust import get_value_id
 
 from aleo_types import *
 from explorer.types import Message as ExplorerMessage
+from util.block_segments import BlockSegmentStore
+from util.global_cache import global_block_cache, global_mapping_registry
+from .address import DatabaseAddress
 from .base import DatabaseBase
 from .block import DatabaseBlock
+from .leaderboard import DatabaseLeaderboard
 
 
 class DatabaseUtil(DatabaseBase):
 
     redis_keys: list[str]
+    block_segments: Optional[BlockSegmentStore]
 
     @staticmethod
     def get_addresses_from_struct(plaintext: StructPlaintext):
@@ -43,7 +49,12 @@ class DatabaseUtil(DatabaseBase):
                 await conn.execute("TRUNCATE TABLE mapping_committee_history RESTART IDENTITY CASCADE")
                 await conn.execute("TRUNCATE TABLE mapping_delegated_history RESTART IDENTITY CASCADE")
                 await conn.execute("TRUNCATE TABLE ratification_genesis_balance RESTART IDENTITY CASCADE")
+                await conn.execute("TRUNCATE TABLE address_solution_bucket")
+                await conn.execute("TRUNCATE TABLE validator_participation_bucket")
+                await conn.execute("TRUNCATE TABLE stats")
                 await self.redis.flushall()
+                global_mapping_registry.clear()
+                global_block_cache.clear()
             except Exception as e:
                 await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                 raise
@@ -200,6 +211,32 @@ class DatabaseUtil(DatabaseBase):
                                         "WHERE p.program_id = %s AND p.id = pf.program_id AND pf.name = %s",
                                         (str(ts.program_id), str(ts.function_name))
                                     )
+                        await cur.execute(
+                            "SELECT b.height, b.timestamp, count(*), sum(s.reward) FROM solution s "
+                            "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
+                            "JOIN block b ON ps.block_id = b.id "
+                            "WHERE b.height > %s "
+                            "GROUP BY b.height, b.timestamp",
+                            (last_backup_height,)
+                        )
+                        solution_stats: dict[str, int] = defaultdict(int)
+                        for row in await cur.fetchall():
+                            for count_name, reward_name in DatabaseAddress._solution_stats_names(row["height"], row["timestamp"]):
+                                solution_stats[count_name] += row["count"]
+                                solution_stats[reward_name] += int(row["sum"])
+                        await cur.executemany(
+                            "UPDATE stats SET value = value - %s WHERE name = %s",
+                            [(value, name) for name, value in solution_stats.items()]
+                        )
+
+                        await cur.execute("SELECT timestamp FROM block WHERE height = %s", (last_backup_height + 1,))
+                        if (res := await cur.fetchone()) is not None:
+                            # buckets are per minute, so the one the reverted blocks start in is rebuilt
+                            bucket = res["timestamp"] - res["timestamp"] % 60
+                            first_reverted_day = res["timestamp"] // 86400
+                        else:
+                            bucket = None
+                            first_reverted_day = None
                         await cur.execute(
                             "DELETE FROM block WHERE height > %s",
                             (last_backup_height,)
@@ -208,6 +245,33 @@ class DatabaseUtil(DatabaseBase):
                             "DELETE FROM committee_history WHERE height > %s",
                             (last_backup_height,)
                         )
+                        if bucket is not None:
+                            await cur.execute("DELETE FROM address_solution_bucket WHERE timestamp >= %s", (bucket,))
+                            await cur.execute(
+                                "INSERT INTO address_solution_bucket (address, timestamp, solution_count, work) "
+                                "SELECT s.address, b.timestamp - b.timestamp %% 60, count(*), sum(p.proof_target) "
+                                "FROM solution s "
+                                "JOIN puzzle_solution ps ON s.puzzle_solution_id = ps.id "
+                                "JOIN block b ON ps.block_id = b.id "
+                                "JOIN block p ON p.height = b.height - 1 "
+                                "WHERE b.timestamp >= %s "
+                                "GROUP BY 1, 2",
+                                (bucket,)
+                            )
+                            await cur.execute("DELETE FROM validator_participation_bucket WHERE timestamp >= %s", (bucket,))
+                            await cur.execute(
+                                "INSERT INTO validator_participation_bucket "
+                                "(address, timestamp, signed_count, eligible_count, signed_stake, eligible_stake) "
+                                "SELECT chm.address, b.timestamp - b.timestamp %% 60, count(bv.validator), count(*), "
+                                "coalesce(sum(chm.stake) FILTER (WHERE bv.validator IS NOT NULL), 0), sum(chm.stake) "
+                                "FROM committee_history ch "
+                                "JOIN committee_history_member chm ON chm.committee_id = ch.id "
+                                "JOIN block b ON ch.height = b.height "
+                                "LEFT JOIN block_validator bv ON bv.block_id = b.id AND bv.validator = chm.address "
+                                "WHERE b.timestamp >= %s "
+                                "GROUP BY 1, 2",
+                                (bucket,)
+                            )
 
                         for redis_key in self.redis_keys:
                             backup_key = f"{redis_key}:history:{last_backup_height}"
@@ -215,13 +279,67 @@ class DatabaseUtil(DatabaseBase):
                             await self.redis.persist(redis_key)
                             await self.redis.expire(backup_key, 259200)
 
-                            # remove rollback backup as well
-                            _, keys = await self.redis.scan(0, f"{redis_key}:rollback_backup:*", 100)
-                            for key in keys:
-                                await self.redis.delete(key)
+                            # remove rollback backup and journal as well
+                            for pattern in (f"{redis_key}:rollback_backup:*", f"{redis_key}:journal:*"):
+                                _, keys = await self.redis.scan(0, pattern, 100)
+                                for key in keys:
+                                    await self.redis.delete(key)
+                        # rebuilt from the database with the next block
+                        await self.redis.delete("network_speed", "network_speed:window")
+
+                        # all time leaderboards follow the restored hashes, daily ones go back to their history copy
+                        for key in DatabaseLeaderboard.leaderboard_keys:
+                            leaderboard_key = DatabaseLeaderboard.leaderboard_key(key)
+                            data = await self.redis.hgetall(key)
+                            pipe = self.redis.pipeline()
+                            pipe.delete(leaderboard_key)
+                            if data:
+                                pipe.zadd(leaderboard_key, {address: int(value) for address, value in data.items()})
+                            await pipe.execute() # type: ignore
+                            if first_reverted_day is None:
+                                continue
+                            cursor = 0
+                            while True:
+                                cursor, day_keys = await self.redis.scan(cursor, f"{leaderboard_key}:day:*", 1000)
+                                for day_key in day_keys:
+                                    parts = day_key.split(":")
+                                    if len(parts) != 4 or int(parts[3]) < first_reverted_day:
+                                        continue
+                                    backup_key = f"{day_key}:history:{last_backup_height}"
+                                    if await self.redis.exists(backup_key):
+                                        await self.redis.copy(backup_key, day_key, replace=True) # type: ignore[arg-type]
+                                    else:
+                                        await self.redis.delete(day_key)
+                                if cursor == 0:
+                                    break
+
+                        global_mapping_registry.clear()
+                        global_block_cache.clear()
+                        if self.block_segments is not None:
+                            self.block_segments.truncate(last_backup_height + 1)
 
                     except Exception as e:
                         await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                         signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
                         raise
-        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
\ No newline at end of file
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+
+    async def save_raw_blocks(self, blocks: list[Block]) -> int:
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                try:
+                    count = 0
+                    async with conn.transaction():
+                        for block in blocks:
+                            # skip blocks that are not the ones in the database
+                            await cur.execute(
+                                "INSERT INTO block_raw (block_id, data) "
+                                "SELECT id, %s FROM block WHERE height = %s AND block_hash = %s "
+                                "ON CONFLICT DO NOTHING",
+                                (block.dump(), block.height, str(block.block_hash))
+                            )
+                            count += cur.rowcount
+                    return count
+                except Exception as e:
+                    await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
+                    raise
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import psycopg
+from psycopg.rows import DictRow
+
 from aleo_types import *
 from explorer.types import Message as ExplorerMessage
 from .base import DatabaseBase
@@ -46,33 +49,31 @@ class DatabaseValidator(DatabaseBase):
                         timestamp = res["timestamp"]
                     else:
                         return []
-                    await cur.execute(
-                        "SELECT validator, count(validator) FROM block_validator bv "
-                        "JOIN block b ON bv.block_id = b.id "
-                        "WHERE b.timestamp > %s "
-                        "GROUP BY validator",
-                        (timestamp - 86400,)
-                    )
-                    res = await cur.fetchall()
-                    validator_counts = {v["validator"]: v["count"] for v in res}
-                    await cur.execute(
-                        "SELECT address, count(chm.address) FROM committee_history_member chm "
-                        "JOIN committee_history ch ON chm.committee_id = ch.id "
-                        "JOIN block b ON ch.height = b.height "
-                        "WHERE b.timestamp > %s "
-                        "GROUP BY address",
-                        (timestamp - 86400,)
-                    )
-                    res = await cur.fetchall()
-                    validator_in_counts = {v["address"]: v["count"] for v in res}
+                    uptimes = await self._get_validator_uptimes(cur, [v["address"] for v in validators], timestamp)
                     for validator in validators:
-                        validator["uptime"] = validator_counts.get(validator["address"], 0) / validator_in_counts.get(validator["address"], 1)
+                        validator["uptime"] = uptimes.get(validator["address"], 0)
 
                     return validators
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
 
+    @staticmethod
+    def _bucket_start(timestamp: int) -> int:
+        # first minute of validator_participation_bucket in a window ending at timestamp
+        return timestamp - timestamp % 60
+
+    @staticmethod
+    async def _get_validator_uptimes(cur: psycopg.AsyncCursor[DictRow], addresses: list[str], timestamp: int) -> dict[str, float]:
+        await cur.execute(
+            "SELECT address, sum(signed_count) AS signed, sum(eligible_count) AS eligible "
+            "FROM validator_participation_bucket "
+            "WHERE address = ANY(%s) AND timestamp >= %s "
+            "GROUP BY address",
+            (addresses, DatabaseValidator._bucket_start(timestamp - 86400))
+        )
+        return {row["address"]: int(row["signed"]) / int(row["eligible"]) for row in await cur.fetchall() if row["eligible"]}
+
     async def get_validator_uptime(self, address: str) -> Optional[float]:
         async with self.pool.connection() as conn:
             async with conn.cursor() as cur:
@@ -83,30 +84,7 @@ class DatabaseValidator(DatabaseBase):
                         timestamp = res["timestamp"]
                     else:
                         return None
-                    await cur.execute(
-                        "SELECT count(validator) FROM block_validator bv "
-                        "JOIN block b ON bv.block_id = b.id "
-                        "WHERE b.timestamp > %s AND validator = %s",
-                        (timestamp - 86400, address)
-                    )
-                    res = await cur.fetchone()
-                    if res:
-                        validator_counts = res["count"]
-                    else:
-                        validator_counts = 0
-                    await cur.execute(
-                        "SELECT count(chm.address) FROM committee_history_member chm "
-                        "JOIN committee_history ch ON chm.committee_id = ch.id "
-                        "JOIN block b ON ch.height = b.height "
-                        "WHERE b.timestamp > %s AND chm.address = %s",
-                        (timestamp - 86400, address)
-                    )
-                    res = await cur.fetchone()
-                    if res:
-                        block_count = res["count"]
-                    else:
-                        return None
-                    return validator_counts / block_count
+                    return (await self._get_validator_uptimes(cur, [address], timestamp)).get(address, 0)
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
@@ -141,33 +119,14 @@ class DatabaseValidator(DatabaseBase):
                     else:
                         return 0
                     await cur.execute(
-                        "SELECT sum(stake) FROM committee_history_member chm "
-                        "JOIN committee_history ch ON chm.committee_id = ch.id "
-                        "JOIN block b ON ch.height = b.height "
-                        "WHERE b.timestamp > %s",
-                        (timestamp - 300,)
-                    )
-                    res = await cur.fetchone()
-                    if res:
-                        validator_total_stake_count = res["sum"]
-                    else:
-                        return 0
-                    await cur.execute(
-                        "SELECT sum(stake) FROM committee_history_member chm "
-                        "JOIN committee_history ch ON chm.committee_id = ch.id "
-                        "JOIN block b ON ch.height = b.height "
-                        "JOIN block_validator bv ON b.id = bv.block_id and bv.validator = chm.address "
-                        "WHERE b.timestamp > %s",
-                        (timestamp - 300,)
+                        "SELECT sum(signed_stake) AS signed, sum(eligible_stake) AS eligible "
+                        "FROM validator_participation_bucket WHERE timestamp >= %s",
+                        (self._bucket_start(timestamp - 300),)
                     )
                     res = await cur.fetchone()
-                    if res:
-                        validator_stake_count = res["sum"]
-                    else:
-                        return 0
-                    if validator_stake_count is None or validator_total_stake_count is None:
+                    if res is None or not res["eligible"]:
                         return 0
-                    return validator_stake_count / validator_total_stake_count
+                    return int(res["signed"]) / int(res["eligible"])
                 except Exception as e:
                     await self.message_callback(ExplorerMessage(ExplorerMessage.Type.DatabaseError, e))
                     raise
@@ -2,6 +2,7 @@ import asyncio
 import os
 import traceback
 from sys import stdout
+from typing import Optional
 
 from aleo_types import Block, BlockHash
 from api import api
@@ -10,9 +11,11 @@ from interpreter.interpreter import init_builtin_program
 # from node.light_node import LightNodeState
 from node import Network
 from node import Node
+from node.decode import FrameDecoder
+from node.sync import BlockSync
 from webapi import webapi
 from webui import webui
-from .types import Request, Message, ExplorerRequest
+from .types import Request, Message, ExplorerRequest, TipState
 
 
 class Explorer:
@@ -20,7 +23,7 @@ class Explorer:
     def __init__(self):
         self.task = None
         self.message_queue: asyncio.Queue[Message] = asyncio.Queue()
-        self.node = None
+        self.nodes: list[Node] = []
         self.db = Database(server=os.environ["DB_HOST"], user=os.environ["DB_USER"], password=os.environ["DB_PASS"],
                            database=os.environ["DB_DATABASE"], schema=os.environ["DB_SCHEMA"],
                            redis_server=os.environ["REDIS_HOST"], redis_port=int(os.environ["REDIS_PORT"]),
@@ -32,6 +35,7 @@ class Explorer:
         self.dev_mode = False
         self.latest_height = 0
         self.latest_block_hash: BlockHash = Network.genesis_block.block_hash
+        self.tip: Optional[TipState] = None
 
     def start(self):
         self.task = asyncio.create_task(self.main_loop())
@@ -46,6 +50,8 @@ class Explorer:
             await self.db.save_unconfirmed_transaction(request.tx)
         elif isinstance(request, Request.ProcessBlock):
             await self.add_block(request.block)
+        elif isinstance(request, Request.ProcessBlocks):
+            await self.add_blocks(request.blocks)
         elif isinstance(request, Request.GetBlockByHeight):
             return await self.db.get_block_by_height(request.height)
         elif isinstance(request, Request.GetBlockHashByHeight):
@@ -69,25 +75,30 @@ class Explorer:
             else:
                 await self.add_block(Network.genesis_block)
 
+    async def prepare(self):
+        await self.db.connect()
+        await self.db.migrate()
+        await self.check_clear()
+        await self.check_dev_mode()
+        await self.check_genesis()
+        await self.check_revert()
+        await self.db.load_mapping_registry()
+        tip = await self.db.get_tip_state()
+        if tip is None:
+            raise ValueError("no block in database")
+        self.set_tip(tip)
+        print(f"latest height: {self.latest_height}")
+
     async def main_loop(self):
         try:
-            await self.db.connect()
-            await self.db.migrate()
-            await self.check_clear()
-            await self.check_dev_mode()
-            await self.check_genesis()
-            await self.check_revert()
-            latest_height = await self.db.get_latest_height()
-            if latest_height is None:
-                raise ValueError("no block in database")
-            self.latest_height = latest_height
-            latest_block_hash = await self.db.get_block_hash_by_height(self.latest_height)
-            if latest_block_hash is None:
-                raise ValueError("no block in database")
-            self.latest_block_hash = latest_block_hash
-            print(f"latest height: {self.latest_height}")
-            self.node = Node(explorer_message=self.message, explorer_request=self.node_request)
-            await self.node.connect(os.environ.get("P2P_NODE_HOST", "127.0.0.1"), int(os.environ.get("P2P_NODE_PORT", "4133")))
+            await self.prepare()
+            block_sync = BlockSync(explorer_request=self.node_request)
+            frame_decoder = FrameDecoder()
+            for host, port in self.get_peers():
+                node = Node(explorer_message=self.message, explorer_request=self.node_request, block_sync=block_sync,
+                            frame_decoder=frame_decoder)
+                await node.connect(host, port)
+                self.nodes.append(node)
             _ = asyncio.create_task(webapi.run())
             _ = asyncio.create_task(webui.run())
             _ = asyncio.create_task(api.run())
@@ -116,19 +127,47 @@ class Explorer:
             traceback.print_exc()
             raise
 
+    @staticmethod
+    def get_peers() -> list[tuple[str, int]]:
+        # P2P_NODE_PEERS=host:port,host:port for syncing from multiple trusted peers
+        peers = os.environ.get("P2P_NODE_PEERS")
+        if not peers:
+            return [(os.environ.get("P2P_NODE_HOST", "127.0.0.1"), int(os.environ.get("P2P_NODE_PORT", "4133")))]
+        result: list[tuple[str, int]] = []
+        for peer in peers.split(","):
+            host, port = peer.strip().rsplit(":", 1)
+            result.append((host, int(port)))
+        return result
+
     async def add_block(self, block: Block):
         if block in [Network.genesis_block, Network.dev_genesis_block]:
             for program in Network.builtin_programs:
                 await init_builtin_program(self.db, program)
-            await self.db.save_block(block)
+            self.tip = await self.db.save_block(block)
             return
         if block.previous_hash != self.latest_block_hash:
             print(f"ignoring block {block} because previous block hash does not match")
         else:
             print(f"adding block {block}")
-            await self.db.save_block(block)
-            self.latest_height = block.header.metadata.height
-            self.latest_block_hash = block.block_hash
+            self.set_tip(await self.db.save_block(block, self.tip))
+
+    async def add_blocks(self, blocks: list[Block]):
+        if len(blocks) == 1:
+            await self.add_block(blocks[0])
+            return
+        previous_hash = self.latest_block_hash
+        for block in blocks:
+            if block.previous_hash != previous_hash:
+                print(f"ignoring blocks {blocks[0]} to {blocks[-1]} because previous block hash does not match")
+                return
+            previous_hash = block.block_hash
+        print(f"adding blocks {blocks[0]} to {blocks[-1]}")
+        self.set_tip(await self.db.save_blocks(blocks, self.tip))
+
+    def set_tip(self, tip: TipState):
+        self.tip = tip
+        self.latest_height = tip.height
+        self.latest_block_hash = tip.block_hash
 
     async def get_latest_block(self):
         return await self.db.get_latest_block()
@@ -139,14 +178,14 @@ class Explorer:
             self.dev_mode = True
 
         if await self.db.get_latest_height() is not None:
-            db_genesis = await self.db.get_block_by_height(0)
-            if db_genesis is None:
+            db_genesis_header = await self.db.get_block_header_by_height(0)
+            if db_genesis_header is None:
                 return
             if self.dev_mode:
                 genesis_block = Network.dev_genesis_block
             else:
                 genesis_block = Network.genesis_block
-            if db_genesis.header.transactions_root != genesis_block.header.transactions_root:
+            if db_genesis_header.transactions_root != genesis_block.header.transactions_root:
                 await self.clear_database()
 
     async def clear_database(self):
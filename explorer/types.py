@@ -1,7 +1,7 @@
 from enum import IntEnum
 from typing import Any
 
-from aleo_types import Block, Transaction
+from aleo_types import Block, BlockHash, Transaction
 
 
 class Message:
@@ -20,6 +20,20 @@ class Message:
         self.type = type_
         self.data = data
 
+class TipState:
+    # The latest block, as far as inserting the next one needs it. Kept by Explorer and only loaded from
+    # the database at startup.
+
+    def __init__(self, height: int, block_hash: BlockHash, timestamp: int, coinbase_target: int,
+                 cumulative_proof_target: int, proof_target: int, total_supply: int):
+        self.height = height
+        self.block_hash = block_hash
+        self.timestamp = timestamp
+        self.coinbase_target = coinbase_target
+        self.cumulative_proof_target = cumulative_proof_target
+        self.proof_target = proof_target
+        self.total_supply = total_supply
+
 class ExplorerRequest:
     pass
 
@@ -29,6 +43,10 @@ class Request:
         def __init__(self, block: Block):
             self.block = block
 
+    class ProcessBlocks(ExplorerRequest):
+        def __init__(self, blocks: list[Block]):
+            self.blocks = blocks
+
     class ProcessUnconfirmedTransaction(ExplorerRequest):
         def __init__(self, tx: Transaction):
             self.tx = tx
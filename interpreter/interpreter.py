@@ -3,6 +3,7 @@ import psycopg
 from aleo_types import *
 from aleo_types.cached import cached_get_key_id, cached_get_mapping_id
 from db import Database
+from db.mapping import MappingBuffer
 from interpreter.finalizer import execute_finalizer, ExecuteError, mapping_cache_read, profile
 from interpreter.utils import FinalizeState
 from util.global_cache import global_mapping_cache, global_program_cache, MappingCacheDict, get_program
@@ -156,7 +157,8 @@ async def finalize_execute(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]
     return expected_operations, operations, reject_reason
 
 @profile
-async def finalize_block(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]], block: Block) -> list[Optional[str]]:
+async def finalize_block(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]], mapping_buffer: MappingBuffer,
+                         block: Block) -> list[Optional[str]]:
     finalize_state = FinalizeState(block)
     reject_reasons: list[Optional[str]] = []
     for confirmed_transaction in block.transactions.transactions:
@@ -198,12 +200,13 @@ async def finalize_block(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]],
                 global_mapping_cache.clear()
                 raise
 
-        await execute_operations(db, cur, operations)
+        await execute_operations(db, cur, mapping_buffer, operations)
         reject_reasons.append(reject_reason)
     return reject_reasons
 
 
-async def execute_operations(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]], operations: list[dict[str, Any]]):
+async def execute_operations(db: Database, cur: psycopg.AsyncCursor[dict[str, Any]], mapping_buffer: MappingBuffer,
+                             operations: list[dict[str, Any]]):
     for operation in operations:
         match operation["type"]:
             case FinalizeOperation.Type.InitializeMapping:
@@ -220,7 +223,7 @@ async def execute_operations(db: Database, cur: psycopg.AsyncCursor[dict[str, An
                 program_name = operation["program_name"]
                 mapping_name = operation["mapping_name"]
                 from_transaction = operation["from_transaction"]
-                await db.update_mapping_key_value(cur, program_name, mapping_name, str(mapping_id), str(key_id), str(value_id), key.dump(), value.dump(), operation["height"], from_transaction)
+                await db.update_mapping_key_value(mapping_buffer, program_name, mapping_name, str(mapping_id), str(key_id), str(value_id), key.dump(), value.dump(), operation["height"], from_transaction)
             case FinalizeOperation.Type.RemoveKeyValue:
                 mapping_id = operation["mapping_id"]
                 key_id = operation["key_id"]
@@ -229,7 +232,7 @@ async def execute_operations(db: Database, cur: psycopg.AsyncCursor[dict[str, An
                 mapping_name = operation["mapping_name"]
                 from_transaction = operation["from_transaction"]
                 height = operation["height"]
-                await db.remove_mapping_key_value(cur, program_name, mapping_name, str(mapping_id), str(key_id), key.dump(), height, from_transaction)
+                await db.remove_mapping_key_value(mapping_buffer, program_name, mapping_name, str(mapping_id), str(key_id), key.dump(), height, from_transaction)
             case _:
                 raise NotImplementedError
 
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import pickle
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from aleo_types import *  # too many types
+
+
+def _parameterize(base: type, key: Any) -> type:
+    return base[key].__origin__
+
+
+class _FramePickler(pickle.Pickler):
+    # Parameterized types like Vec[Block, u8] are created on the fly by __class_getitem__ and can't be
+    # pickled by reference, so they are pickled as base[key] instead. tp_cache returns the same class again.
+    def reducer_override(self, obj: Any) -> Any:
+        if not isinstance(obj, type) or len(obj.__bases__) != 1:
+            return NotImplemented
+        base = obj.__bases__[0]
+        if "__class_getitem__" not in base.__dict__:
+            return NotImplemented
+        if getattr(sys.modules.get(obj.__module__), obj.__qualname__, None) is obj:
+            return NotImplemented
+        keys = [v for k, v in obj.__dict__.items() if not (k.startswith("__") and k.endswith("__"))]
+        if len(keys) != 1:
+            return NotImplemented
+        return _parameterize, (base, keys[0])
+
+
+def _decode_frame(data: bytes) -> bytes:
+    frame = Frame.load(BytesIO(data))
+    result = BytesIO()
+    _FramePickler(result, protocol=pickle.HIGHEST_PROTOCOL).dump(frame)
+    return result.getvalue()
+
+
+class FrameDecoder:
+    """
+    Decodes frames, optionally in worker processes.
+
+    Only block responses are sent to the pool; small messages are cheaper to decode in place.
+    """
+
+    def __init__(self):
+        workers = int(os.environ.get("P2P_DECODE_WORKERS", 0))
+        self.pool: Optional[ProcessPoolExecutor] = None
+        if workers > 0:
+            self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    async def decode(self, data: bytes) -> Frame:
+        if self.pool is None or int.from_bytes(data[:2], "little") != Message.Type.BlockResponse:
+            return Frame.load(BytesIO(data))
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.pool, _decode_frame, data)
+        except Exception:
+            traceback.print_exc()
+            print("Failed to decode frame in worker process, decoding in place")
+            return Frame.load(BytesIO(data))
+        return pickle.loads(result)
@@ -1,7 +1,5 @@
 import asyncio
-import os
 import random
-import time
 import traceback
 from asyncio import StreamReader, StreamWriter
 from typing import Awaitable
@@ -10,6 +8,8 @@ import explorer.types as explorer
 from aleo_types import *  # too many types
 # from .light_node import LightNodeState
 from . import Network
+from .decode import FrameDecoder
+from .sync import BlockSync
 
 # Do not open PR about this value.
 # The deviation from the node's behavior is for lower sync delays.
@@ -19,12 +19,14 @@ PING_SLEEP_IN_SECS = 3
 
 
 class Node:
-    def __init__(self, explorer_message: Callable[[explorer.Message], Awaitable[None]], explorer_request: Callable[[explorer.ExplorerRequest], Awaitable[Any]]):
+    def __init__(self, explorer_message: Callable[[explorer.Message], Awaitable[None]], explorer_request: Callable[[explorer.ExplorerRequest], Awaitable[Any]], block_sync: BlockSync, frame_decoder: FrameDecoder):
         self.reader: Optional[StreamReader] = None
         self.writer: Optional[StreamWriter] = None
         self.worker_task: asyncio.Task[None]
         self.explorer_message = explorer_message
         self.explorer_request = explorer_request
+        self.block_sync = block_sync
+        self.frame_decoder = frame_decoder
 
         self.node_ip: str
         self.node_port: int
@@ -35,16 +37,14 @@ class Node:
         self.peer_block_height = 0
         self.is_fork = False
         self.peer_block_locators: Optional[BlockLocators] = None
-        self.block_requests: list[int] = []
-        self.block_requests_deadline = float('inf')
         self.ping_task = None
-        self.is_syncing = False
         # self.light_node_state = light_node_state
 
     async def connect(self, ip: str, port: int):
         self.node_port = port
         self.node_ip = ip
         self.worker_task = asyncio.create_task(self.worker(ip, port))
+        self.block_sync.register(self, self._sync)
 
     async def worker(self, host: str, port: int):
         try:
@@ -77,7 +77,7 @@ class Node:
                     frame = await self.reader.readexactly(size)
                 except:
                     raise Exception("connection closed")
-                await self.parse_message(Frame.load(BytesIO(frame)))
+                await self.parse_message(await self.frame_decoder.decode(frame))
         except Exception:
             traceback.print_exc()
             await self.explorer_message(explorer.Message(explorer.Message.Type.NodeDisconnected, None))
@@ -101,14 +101,8 @@ class Node:
             if self.handshake_state != 1:
                 raise Exception("handshake is not done")
             msg = frame.message
-            for block in msg.blocks.value:
-                height = block.header.metadata.height
-                if height in self.block_requests:
-                    self.block_requests.remove(height)
-                    await self.explorer_request(explorer.Request.ProcessBlock(block))
-            if not self.block_requests:
-                self.is_syncing = False
-                self.block_requests_deadline = float('inf')
+            await self.block_sync.add_blocks(self, list(msg.blocks.value))
+            if not self.block_sync.is_busy(self):
                 self.is_fork = False
             await self._sync()
 
@@ -203,8 +197,7 @@ class Node:
                 is_fork=Option[bool_](is_fork),
             )
             await self.send_message(pong)
-            if not self.is_syncing:
-                await self._sync()
+            await self._sync()
 
         elif isinstance(frame.message, Pong):
             if self.handshake_state != 1:
@@ -231,35 +224,20 @@ class Node:
             print("unhandled message type:", frame.message.type)
 
     async def _sync(self):
-        batch_size = int(os.environ.get("P2P_BLOCK_BATCH_SIZE", 1))
-        if self.block_requests_deadline < time.time():
-            self.block_requests.clear()
-            self.block_requests_deadline = float("inf")
-            self.is_syncing = False
+        if self.handshake_state != 1:
+            return
         locators = self.peer_block_locators
         if locators is None:
             return
         recents = locators.recents
         self.peer_block_height = max(recents.keys())
-        if self.is_syncing:
-            next_block = self.block_requests[0]
-            self.block_requests_deadline = time.time() + 30
-            msg = BlockRequest(start_height=u32(next_block), end_height=u32(min(max(self.block_requests) + 1, next_block + batch_size)))
-            await self.send_message(msg)
-        else:
-            latest_height = await self.explorer_request(explorer.Request.GetLatestHeight())
-            if latest_height >= self.peer_block_height:
-                return
-
-            start_block_height = latest_height + 1
-            end_block_height = min(self.peer_block_height + 1, start_block_height + batch_size)
-            print(f"Synchronizing from block {start_block_height} to {end_block_height}")
-            self.is_syncing = True
-
-            self.block_requests.extend(range(start_block_height, end_block_height))
-            self.block_requests_deadline = time.time() + 30
-            msg = BlockRequest(start_height=u32(start_block_height), end_height=u32(end_block_height))
-            await self.send_message(msg)
+        request = await self.block_sync.next_request(self, self.peer_block_height)
+        if request is None:
+            return
+        start_block_height, end_block_height = request
+        print(f"Synchronizing from block {start_block_height} to {end_block_height} from {self.node_ip}:{self.node_port}")
+        msg = BlockRequest(start_height=u32(start_block_height), end_height=u32(end_block_height))
+        await self.send_message(msg)
 
     async def send_ping(self):
         ping = Ping(
@@ -299,9 +277,7 @@ class Node:
         self.peer_cumulative_weight = 0
         self.is_fork = False
         self.peer_block_locators = None
-        self.block_requests = []
-        self.block_requests_deadline = float('inf')
-        self.is_syncing = False
+        self.block_sync.release(self)
         if self.ping_task is not None:
             self.ping_task.cancel()
         await asyncio.sleep(11)
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import time
+import traceback
+from typing import Awaitable
+
+import explorer.types as explorer
+from aleo_types import *  # too many types
+
+
+class _Chunk:
+    def __init__(self, start: int, end: int):
+        self.start = start
+        self.end = end
+        self.remaining = set(range(start, end))
+        self.peer: Optional[object] = None
+        self.deadline = float("inf")
+        # whether the current request for this chunk is still unanswered
+        self.requested = False
+        self.requested_at = 0.0
+        self.reassigned = False
+
+
+class _BatchSizer:
+    """
+    Tunes the BlockRequest range size.
+
+    The size grows while the time per block keeps going down, and shrinks on timeouts and when blocks
+    pile up in front of the database.
+    """
+
+    def __init__(self):
+        self.min_size = max(1, int(os.environ.get("P2P_BLOCK_BATCH_SIZE", 1)))
+        self.max_size = max(self.min_size, int(os.environ.get("P2P_BLOCK_BATCH_SIZE_MAX", 100)))
+        self.size = self.min_size
+        self.last_time_per_block = float("inf")
+        self.last_shrink = 0.0
+
+        self.report_interval = 30
+        self.last_report = time.time()
+        self.received_blocks = 0
+        self.committed_blocks = 0
+
+    def on_chunk_done(self, size: int, elapsed: float):
+        self.received_blocks += size
+        # chunks cut short by the chain tip say nothing about the batch size
+        if size < self.size:
+            return
+        time_per_block = elapsed / size
+        if time_per_block < self.last_time_per_block:
+            self.size = min(self.max_size, self.size + max(1, self.size // 2))
+        elif time_per_block > self.last_time_per_block * 1.2:
+            self.size = max(self.min_size, self.size - max(1, self.size // 4))
+        self.last_time_per_block = time_per_block
+
+    def shrink(self):
+        now = time.time()
+        if now - self.last_shrink < 1:
+            return
+        self.last_shrink = now
+        self.size = max(self.min_size, self.size // 2)
+        self.last_time_per_block = float("inf")
+
+    def on_commit(self, count: int):
+        self.committed_blocks += count
+        now = time.time()
+        elapsed = now - self.last_report
+        if elapsed < self.report_interval:
+            return
+        print(f"Sync: batch size {self.size}, received {self.received_blocks / elapsed:.2f} blocks/s, "
+              f"committed {self.committed_blocks / elapsed:.2f} blocks/s")
+        self.last_report = now
+        self.received_blocks = 0
+        self.committed_blocks = 0
+
+
+class BlockSync:
+    """
+    Shared block download state for all peers.
+
+    The missing height range is split into chunks which are handed out to peers, blocks are reordered
+    and committed in order by block_worker through ProcessBlock.
+    """
+
+    def __init__(self, explorer_request: Callable[[explorer.ExplorerRequest], Awaitable[Any]]):
+        self.explorer_request = explorer_request
+        self.prefetch_blocks = max(1, int(os.environ.get("P2P_PREFETCH_BLOCKS", 64)))
+        self.stall_timeout = float(os.environ.get("P2P_SYNC_STALL_SECS", 10))
+        # far behind the peers, commit several blocks per database transaction
+        self.catchup_batch_blocks = max(1, int(os.environ.get("CATCHUP_BATCH_BLOCKS", 50)))
+        self.catchup_distance = int(os.environ.get("CATCHUP_BATCH_DISTANCE", 1000))
+        self.peer_height = 0
+        self.batch_sizer = _BatchSizer()
+
+        self.block_queue: asyncio.Queue[Block] = asyncio.Queue()
+        # highest height handed to the commit stage
+        self.fetched_height = 0
+        # blocks received out of order, waiting for the ones before them
+        self.pending_blocks: dict[int, Block] = {}
+        self.chunks: list[_Chunk] = []
+        self.lock = asyncio.Lock()
+        self.peers: dict[object, Callable[[], Awaitable[None]]] = {}
+        self.worker_task: Optional[asyncio.Task[None]] = None
+
+    def register(self, peer: object, sync: Callable[[], Awaitable[None]]):
+        self.peers[peer] = sync
+        if self.worker_task is None:
+            self.worker_task = asyncio.create_task(self.block_worker())
+
+    async def block_worker(self):
+        while True:
+            block = await self.block_queue.get()
+            blocks = [block]
+            if self.peer_height - block.header.metadata.height > self.catchup_distance:
+                while len(blocks) < self.catchup_batch_blocks and not self.block_queue.empty():
+                    blocks.append(self.block_queue.get_nowait())
+            height = blocks[-1].header.metadata.height
+            try:
+                if len(blocks) == 1:
+                    await self.explorer_request(explorer.Request.ProcessBlock(block))
+                else:
+                    await self.explorer_request(explorer.Request.ProcessBlocks(blocks))
+                if await self.explorer_request(explorer.Request.GetLatestHeight()) < height:
+                    raise ValueError(f"block {height} was not added")
+                self.batch_sizer.on_commit(len(blocks))
+            except Exception:
+                traceback.print_exc()
+                print("Dropping prefetched blocks")
+                self.reset()
+            # the prefetch window moved, let idle peers request more
+            for peer, sync in list(self.peers.items()):
+                if not self.is_busy(peer):
+                    try:
+                        await sync()
+                    except Exception:
+                        traceback.print_exc()
+
+    def reset(self):
+        while not self.block_queue.empty():
+            self.block_queue.get_nowait()
+        self.fetched_height = 0
+        self.pending_blocks.clear()
+        self.chunks.clear()
+
+    def is_busy(self, peer: object) -> bool:
+        return any(c.peer is peer and c.requested for c in self.chunks)
+
+    def release(self, peer: object):
+        for chunk in self.chunks:
+            if chunk.peer is peer:
+                chunk.peer = None
+                chunk.requested = False
+
+    async def next_request(self, peer: object, peer_height: int) -> Optional[tuple[int, int]]:
+        async with self.lock:
+            self.peer_height = max(self.peer_height, peer_height)
+            now = time.time()
+            for chunk in self.chunks:
+                if chunk.peer is peer:
+                    if chunk.requested and chunk.deadline > now:
+                        return None
+                    # partial response or stalled, request what is left
+                    if chunk.requested:
+                        self.batch_sizer.shrink()
+                    return self._assign(chunk, peer, now)
+
+            # take over chunks from stalled or disconnected peers first
+            for chunk in self.chunks:
+                if (chunk.peer is None or chunk.deadline < now) and chunk.end <= peer_height + 1:
+                    if chunk.peer is not None:
+                        print(f"Reassigning blocks {chunk.start} to {chunk.end} from a stalled peer")
+                        self.batch_sizer.shrink()
+                        chunk.reassigned = True
+                    return self._assign(chunk, peer, now)
+
+            latest_height = await self.explorer_request(explorer.Request.GetLatestHeight())
+            if self.fetched_height < latest_height:
+                self.fetched_height = latest_height
+                self.pending_blocks.clear()
+                self.chunks = [c for c in self.chunks if c.end > latest_height + 1]
+            start_height = max([self.fetched_height] + [c.end - 1 for c in self.chunks]) + 1
+            # do not fetch further ahead of the database than the prefetch window allows
+            end_height = min(peer_height + 1, start_height + self.batch_sizer.size, latest_height + self.prefetch_blocks + 1)
+            if start_height >= end_height:
+                return None
+            chunk = _Chunk(start_height, end_height)
+            chunk.requested_at = now
+            self.chunks.append(chunk)
+            return self._assign(chunk, peer, now)
+
+    def _assign(self, chunk: _Chunk, peer: object, now: float) -> tuple[int, int]:
+        chunk.peer = peer
+        chunk.requested = True
+        chunk.deadline = now + self.stall_timeout
+        return min(chunk.remaining), max(chunk.remaining) + 1
+
+    async def add_blocks(self, peer: object, blocks: list[Block]):
+        for block in blocks:
+            height = block.header.metadata.height
+            for chunk in self.chunks:
+                if height in chunk.remaining:
+                    chunk.remaining.remove(height)
+                    self.pending_blocks[height] = block
+                    break
+        now = time.time()
+        for chunk in self.chunks:
+            if chunk.peer is peer:
+                chunk.requested = False
+            if not chunk.remaining and not chunk.reassigned:
+                self.batch_sizer.on_chunk_done(chunk.end - chunk.start, now - chunk.requested_at)
+        self.chunks = [c for c in self.chunks if c.remaining]
+        while self.fetched_height + 1 in self.pending_blocks:
+            self.fetched_height += 1
+            await self.block_queue.put(self.pending_blocks.pop(self.fetched_height))
+        # the database is falling behind, keep requests small so they don't pile up
+        if self.block_queue.qsize() >= self.prefetch_blocks // 2:
+            self.batch_sizer.shrink()
@@ -0,0 +1,42 @@
+import os
+from io import BytesIO
+from typing import BinaryIO, Iterator
+
+from aleo_types import Block
+
+# Block archives are a sequence of records, each a 4 byte little endian length followed by Block.dump(),
+# the same bytes as block.genesis.
+
+
+def read_blocks(f: BinaryIO) -> Iterator[Block]:
+    while True:
+        size = f.read(4)
+        if not size:
+            return
+        if len(size) != 4:
+            raise ValueError("truncated block archive")
+        size = int.from_bytes(size, "little")
+        data = f.read(size)
+        if len(data) != size:
+            raise ValueError("truncated block archive")
+        yield Block.load(BytesIO(data))
+
+
+def read_archive_path(path: str) -> Iterator[Block]:
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path))
+    else:
+        files = [path]
+    for file in files:
+        if not os.path.isfile(file):
+            continue
+        with open(file, "rb") as f:
+            yield from read_blocks(f)
+
+
+def write_block(f: BinaryIO, block: Block):
+    write_raw_block(f, block.dump())
+
+
+def write_raw_block(f: BinaryIO, data: bytes):
+    f.write(len(data).to_bytes(4, "little") + data)
@@ -0,0 +1,135 @@
+import mmap
+import os
+import struct
+from io import BytesIO
+from typing import Optional, cast
+
+from aleo_types import Block
+
+# Segment files hold the same records as block archives, a 4 byte little endian length followed by Block.dump().
+# The index file has one (segment, offset) entry per height, starting from the genesis block.
+# Segment files are only ever appended to, so readers in other processes can keep them mapped.
+
+_index_entry = struct.Struct("<IQ")
+
+
+class _MemoryViewReader:
+    # the part of BytesIO that Block.load uses, reads straight from the mapped segment
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            end = len(self.view)
+        else:
+            end = min(self.pos + size, len(self.view))
+        data = self.view[self.pos:end].tobytes()
+        self.pos = end
+        return data
+
+
+class BlockSegmentStore:
+
+    def __init__(self, path: str, segment_size: int = 1 << 30):
+        self.path = path
+        self.segment_size = segment_size
+        os.makedirs(path, exist_ok=True)
+        self.index_fd = os.open(os.path.join(path, "index"), os.O_RDWR | os.O_CREAT, 0o644)
+        self.maps: dict[int, mmap.mmap] = {}
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"{segment:06d}.seg")
+
+    @property
+    def next_height(self) -> int:
+        return os.fstat(self.index_fd).st_size // _index_entry.size
+
+    def _read_index(self, height: int) -> Optional[tuple[int, int]]:
+        entry = os.pread(self.index_fd, _index_entry.size, height * _index_entry.size)
+        if len(entry) != _index_entry.size:
+            return None
+        return cast(tuple[int, int], _index_entry.unpack(entry))
+
+    def _map(self, segment: int, end: int) -> mmap.mmap:
+        mm = self.maps.get(segment)
+        if mm is None or len(mm) < end:
+            # the segment grew since it was mapped
+            with open(self._segment_path(segment), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[segment] = mm
+        return mm
+
+    def _record(self, height: int) -> Optional[memoryview]:
+        if height < 0 or height >= self.next_height:
+            return None
+        if (entry := self._read_index(height)) is None:
+            return None
+        segment, offset = entry
+        mm = self._map(segment, offset + 4)
+        size = int.from_bytes(mm[offset:offset + 4], "little")
+        mm = self._map(segment, offset + 4 + size)
+        return memoryview(mm)[offset + 4:offset + 4 + size]
+
+    def get(self, height: int) -> Optional[Block]:
+        if (record := self.get_with_size(height)) is None:
+            return None
+        return record[0]
+
+    def get_with_size(self, height: int) -> Optional[tuple[Block, int]]:
+        if (view := self._record(height)) is None:
+            return None
+        return Block.load(cast(BytesIO, _MemoryViewReader(view))), len(view)
+
+    def get_raw(self, height: int) -> Optional[bytes]:
+        if (view := self._record(height)) is None:
+            return None
+        return view.tobytes()
+
+    def get_range(self, start: int, end: int) -> list[Block]:
+        # same order as DatabaseBlock.get_blocks_range: from start down to, but not including, end
+        blocks: list[Block] = []
+        for height in range(min(start, self.next_height - 1), end, -1):
+            block = self.get(height)
+            if block is None:
+                break
+            blocks.append(block)
+        return blocks
+
+    def append(self, blocks: list[Block]) -> int:
+        return self.append_raw([(block.height, block.dump()) for block in blocks])
+
+    def append_raw(self, records: list[tuple[int, bytes]]) -> int:
+        # (height, Block.dump()) records, heights must continue the index, records already stored or after a gap are left out
+        next_height = self.next_height
+        if next_height == 0:
+            segment = 0
+        else:
+            segment = cast(tuple[int, int], self._read_index(next_height - 1))[0]
+        entries: list[bytes] = []
+        f = open(self._segment_path(segment), "ab")
+        try:
+            for height, data in records:
+                if height != next_height + len(entries):
+                    continue
+                if f.tell() >= self.segment_size:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    f.close()
+                    segment += 1
+                    f = open(self._segment_path(segment), "ab")
+                entries.append(_index_entry.pack(segment, f.tell()))
+                f.write(len(data).to_bytes(4, "little") + data)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+        # records are on disk before the index points at them
+        os.pwrite(self.index_fd, b"".join(entries), next_height * _index_entry.size)
+        return len(entries)
+
+    def truncate(self, height: int):
+        # drops heights >= height from the index, segment data is left in place and appended after
+        if height < self.next_height:
+            os.ftruncate(self.index_fd, max(0, height) * _index_entry.size)
@@ -1,4 +1,8 @@
 
+from collections import OrderedDict
+
+import psycopg
+
 from aleo_types import *
 
 MappingCacheDict = dict[Field, dict[str, Any]]
@@ -6,6 +10,121 @@ MappingCacheDict = dict[Field, dict[str, Any]]
 global_mapping_cache: dict[Field, MappingCacheDict] = {}
 global_program_cache: dict[str, Program] = {}
 
+
+class MappingRegistry:
+    # Rows of the mapping table, which only change when programs are deployed. Lookups that miss fall back
+    # to the database as other processes might have added the mapping since.
+
+    def __init__(self):
+        # mapping_id -> mapping.id
+        self.ids: dict[str, int] = {}
+        # (program_id, mapping) -> mapping_id
+        self.names: dict[tuple[str, str], str] = {}
+
+    def add(self, db_id: int, mapping_id: str, program_id: str, mapping: str):
+        self.ids[mapping_id] = db_id
+        self.names[(program_id, mapping)] = mapping_id
+
+    def clear(self):
+        self.ids.clear()
+        self.names.clear()
+
+    async def load(self, cur: psycopg.AsyncCursor[dict[str, Any]]):
+        await cur.execute("SELECT id, mapping_id, program_id, mapping FROM mapping")
+        self.clear()
+        for row in await cur.fetchall():
+            self.add(row["id"], row["mapping_id"], row["program_id"], row["mapping"])
+
+    async def get_id(self, cur: psycopg.AsyncCursor[dict[str, Any]], mapping_id: str) -> Optional[int]:
+        if (db_id := self.ids.get(mapping_id)) is not None:
+            return db_id
+        await cur.execute("SELECT id, program_id, mapping FROM mapping WHERE mapping_id = %s", (mapping_id,))
+        if (row := await cur.fetchone()) is None:
+            return None
+        self.add(row["id"], mapping_id, row["program_id"], row["mapping"])
+        return row["id"]
+
+    async def get_id_by_name(self, cur: psycopg.AsyncCursor[dict[str, Any]], program_id: str, mapping: str) -> Optional[int]:
+        if (mapping_id := self.names.get((program_id, mapping))) is not None:
+            return self.ids[mapping_id]
+        await cur.execute("SELECT id, mapping_id FROM mapping WHERE program_id = %s AND mapping = %s", (program_id, mapping))
+        if (row := await cur.fetchone()) is None:
+            return None
+        self.add(row["id"], row["mapping_id"], program_id, mapping)
+        return row["id"]
+
+
+global_mapping_registry = MappingRegistry()
+
+
+class BlockCache:
+    # Decoded blocks by height. Stored blocks don't change, so entries only need to go on revert or clear.
+    # The memory limit is checked against the serialized size, the decoded objects take a few times more.
+
+    def __init__(self, max_blocks: int = 1000, max_bytes: int = 256 * 1024 * 1024):
+        self.max_blocks = max_blocks
+        self.max_bytes = max_bytes
+        # height -> (block, serialized size)
+        self.blocks: OrderedDict[int, tuple[Block, int]] = OrderedDict()
+        self.heights: dict[str, int] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, height: int) -> Optional[Block]:
+        if (entry := self.blocks.get(height)) is None:
+            return None
+        self.blocks.move_to_end(height)
+        return entry[0]
+
+    def get(self, height: int) -> Optional[Block]:
+        # counted lookup, for the getters that avoid the database completely on a hit
+        if (block := self.peek(height)) is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return block
+
+    def get_by_hash(self, block_hash: str) -> Optional[Block]:
+        if (height := self.heights.get(block_hash)) is None:
+            self.misses += 1
+            return None
+        return self.get(height)
+
+    def add(self, block: Block, size: int):
+        # size is the length of block.dump(), callers pass the length of the bytes they decoded from
+        if self.max_blocks <= 0:
+            return
+        height = int(block.height)
+        if height in self.blocks:
+            self.blocks.move_to_end(height)
+            return
+        if size > self.max_bytes:
+            return
+        self.blocks[height] = (block, size)
+        self.heights[str(block.block_hash)] = height
+        self.size += size
+        while len(self.blocks) > self.max_blocks or self.size > self.max_bytes:
+            _, (evicted, evicted_size) = self.blocks.popitem(last=False)
+            del self.heights[str(evicted.block_hash)]
+            self.size -= evicted_size
+
+    def clear(self):
+        self.blocks.clear()
+        self.heights.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "blocks": len(self.blocks),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+global_block_cache = BlockCache()
+
 async def get_program(db: "Database", program_id: str) -> Program | None:
     try:
         return global_program_cache[program_id]
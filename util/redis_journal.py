@@ -0,0 +1,140 @@
+import json
+import time
+from typing import Iterable, Optional
+
+from redis.asyncio import Redis
+
+
+class RedisJournal:
+    """
+    Undo log for the redis hashes changed while inserting blocks.
+
+    Before a field is changed for the first time in a batch, its previous value (or null if it did not exist)
+    is saved to {key}:journal:{height}. Hashes that are rewritten as a whole are renamed to
+    {key}:rollback_backup:{height} first, which is O(1) and makes further field journaling unnecessary.
+    A full copy is only kept every 6 hours as {key}:history:{height - 1} for revert_to_last_backup.
+
+    Sorted sets can be created during a batch, so the previous scores of all of them go to one
+    sorted_set:journal:{height} hash that rollback can find without knowing their keys.
+    """
+
+    def __init__(self, keys: list[str]):
+        self.keys = keys
+        self.redis: Optional[Redis[str]] = None
+        self.height = 0
+        self.journaled: dict[str, set[str]] = {}
+        self.backed_up: set[str] = set()
+        self.last_history_time = time.monotonic() - 10800
+
+    def _journal_key(self, key: str) -> str:
+        return f"{key}:journal:{self.height}"
+
+    def _backup_key(self, key: str) -> str:
+        return f"{key}:rollback_backup:{self.height}"
+
+    def _sorted_set_journal_key(self) -> str:
+        return f"sorted_set:journal:{self.height}"
+
+    async def begin(self, redis_conn: Redis[str], height: int, extra_history_keys: Iterable[str] = ()):
+        # extra_history_keys are copied to history along with the journaled hashes
+        self.redis = redis_conn
+        self.height = height
+        self.journaled = {key: set() for key in self.keys}
+        self.backed_up = set()
+        if height == 0:
+            return
+        if (any([await redis_conn.exists(self._journal_key(key), self._backup_key(key)) for key in self.keys])
+                or await redis_conn.exists(self._sorted_set_journal_key())):
+            print("redis journal exists, rolling back")
+            await self.rollback()
+            self.height = height
+        now = time.monotonic()
+        if self.last_history_time + 21600 < now:
+            self.last_history_time = now
+            for key in [*self.keys, *extra_history_keys]:
+                if await redis_conn.exists(key) == 1:
+                    history_key = f"{key}:history:{height - 1}"
+                    await redis_conn.copy(key, history_key, replace=True) # type: ignore[arg-type]
+                    await redis_conn.expire(history_key, 60 * 60 * 24 * 3)
+
+    async def save(self, key: str, fields: Iterable[str]):
+        if self.height == 0 or self.redis is None or key in self.backed_up:
+            return
+        journaled = self.journaled.setdefault(key, set())
+        fields = list({f for f in fields if f not in journaled})
+        if not fields:
+            return
+        values = await self.redis.hmget(key, fields) # type: ignore[arg-type]
+        await self.redis.hset(self._journal_key(key), mapping={f: json.dumps(v) for f, v in zip(fields, values)}) # type: ignore[arg-type]
+        journaled.update(fields)
+
+    async def save_scores(self, key: str, members: Iterable[str]):
+        if self.height == 0 or self.redis is None:
+            return
+        journaled = self.journaled.setdefault(key, set())
+        members = list({m for m in members if m not in journaled})
+        if not members:
+            return
+        scores = await self.redis.zmscore(key, members) # type: ignore[arg-type]
+        await self.redis.hset(
+            self._sorted_set_journal_key(),
+            mapping={json.dumps([key, m]): json.dumps(score) for m, score in zip(members, scores)} # type: ignore[arg-type]
+        )
+        journaled.update(members)
+
+    async def replace(self, key: str, mapping: dict[str, str]):
+        if self.redis is None:
+            raise RuntimeError("redis journal not started")
+        pipe = self.redis.pipeline()
+        if self.height != 0 and key not in self.backed_up:
+            if await self.redis.exists(key) == 1:
+                pipe.rename(key, self._backup_key(key))
+                self.backed_up.add(key)
+            else:
+                # nothing to rename, journal the new fields so they get removed on rollback
+                await self.save(key, mapping)
+        pipe.delete(key)
+        pipe.hset(key, mapping=mapping) # type: ignore[arg-type]
+        await pipe.execute() # type: ignore
+
+    async def rollback(self):
+        if self.height == 0 or self.redis is None:
+            return
+        for key in self.keys:
+            backup_key = self._backup_key(key)
+            journal_key = self._journal_key(key)
+            # the field journal only has values older than the full backup, so it goes on top
+            if await self.redis.exists(backup_key) == 1:
+                await self.redis.rename(backup_key, key) # type: ignore[arg-type]
+            journal = await self.redis.hgetall(journal_key)
+            pipe = self.redis.pipeline()
+            for field, value in journal.items():
+                value = json.loads(value)
+                if value is None:
+                    pipe.hdel(key, field)
+                else:
+                    pipe.hset(key, field, value)
+            pipe.delete(journal_key)
+            await pipe.execute() # type: ignore
+        journal = await self.redis.hgetall(self._sorted_set_journal_key())
+        pipe = self.redis.pipeline()
+        for field, value in journal.items():
+            key, member = json.loads(field)
+            value = json.loads(value)
+            if value is None:
+                pipe.zrem(key, member)
+            else:
+                pipe.zadd(key, {member: value})
+        pipe.delete(self._sorted_set_journal_key())
+        await pipe.execute() # type: ignore
+        self.height = 0
+
+    async def commit(self):
+        if self.height == 0 or self.redis is None:
+            return
+        pipe = self.redis.pipeline()
+        for key in self.keys:
+            pipe.delete(self._journal_key(key), self._backup_key(key))
+        pipe.delete(self._sorted_set_journal_key())
+        await pipe.execute() # type: ignore
+        self.height = 0
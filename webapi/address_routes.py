@@ -1,3 +1,4 @@
+import time
 from io import BytesIO
 from typing import Any, cast, Optional
 
@@ -208,4 +209,84 @@ async def address_route(request: Request) -> CJSONResponse:
         "latest_height": await db.get_latest_height(),
     }
     result["resolved_addresses"] = await UIAddress.resolve_recursive_detached(result, db, {})
-    return CJSONResponse(result)
\ No newline at end of file
+    return CJSONResponse(result)
+
+
+@public_cache_seconds(60)
+async def address_speed_route(request: Request) -> CJSONResponse:
+    db: Database = request.app.state.db
+    address = request.path_params["address"]
+    try:
+        Address.loads(address)
+    except ValueError:
+        return CJSONResponse({"error": "Invalid address format"}, status_code=400)
+    try:
+        interval = request.query_params.get("interval")
+        if interval is not None:
+            interval = int(interval)
+            if not 60 <= interval <= 86400 * 30:
+                raise ValueError
+        hours = int(request.query_params.get("hours", 24))
+        if not 1 <= hours <= 24 * 30:
+            raise ValueError
+    except ValueError:
+        return CJSONResponse({"error": "Invalid interval or hours"}, status_code=400)
+    if interval is None:
+        speed, interval = await db.get_address_speed(address)
+    else:
+        speed, _ = await db.get_address_speed_by_interval(address, interval)
+    now = int(time.time())
+    end = now - now % 3600 + 3600
+    history = await db.get_address_speed_history(address, end - hours * 3600, end)
+    return CJSONResponse({
+        "address": address,
+        "speed": speed,
+        "speed_interval": interval,
+        "history": history,
+    })
+
+
+@public_cache_seconds(15)
+async def leaderboard_route(request: Request) -> CJSONResponse:
+    # name is puzzle_reward, stake_reward, transfer_in, transfer_out or fee
+    db: Database = request.app.state.db
+    key = f"address_{request.path_params['name']}"
+    if key not in db.leaderboard_keys:
+        return CJSONResponse({"error": "Leaderboard not found"}, status_code=404)
+    try:
+        page = int(request.query_params.get("p", 1))
+        days = request.query_params.get("days")
+        if days is not None:
+            days = int(days)
+            if not 1 <= days <= 90:
+                raise ValueError
+    except ValueError:
+        return CJSONResponse({"error": "Invalid page or days"}, status_code=400)
+    if days is None:
+        window = None
+    else:
+        today = int(time.time()) // 86400
+        window = (today - days + 1, today + 1)
+    total = await db.get_leaderboard_count(key, window)
+    total_pages = (total // 50) + 1
+    if page < 1 or page > total_pages:
+        return CJSONResponse({"error": "Invalid page"}, status_code=400)
+    start = 50 * (page - 1)
+    leaderboard = await db.get_leaderboard(key, start, start + 50, window)
+    result: dict[str, Any] = {
+        "leaderboard": [
+            {"rank": start + i + 1, "address": line["address"], "value": str(line["value"])}
+            for i, line in enumerate(leaderboard)
+        ],
+        "page": page,
+        "total_pages": total_pages,
+    }
+    address = request.query_params.get("address")
+    if address is not None:
+        rank = await db.get_leaderboard_rank(key, address, window)
+        if rank is None:
+            result["address_rank"] = None
+        else:
+            result["address_rank"] = {"rank": rank[0] + 1, "value": str(rank[1])}
+    result["resolved_addresses"] = await UIAddress.resolve_recursive_detached(result, db, {})
+    return CJSONResponse(result)
@@ -20,18 +20,46 @@ async def get_summary(db: Database):
     network_speed = await db.get_network_speed()
     validators = await db.get_current_validator_count()
     participation_rate = await db.get_network_participation_rate()
-    block = await db.get_latest_block()
+    header = await db.get_latest_block_header()
     summary = {
-        "latest_height": block.height,
-        "latest_timestamp": block.header.metadata.timestamp,
-        "proof_target": block.header.metadata.proof_target,
-        "coinbase_target": block.header.metadata.coinbase_target,
+        "latest_height": header.metadata.height,
+        "latest_timestamp": header.metadata.timestamp,
+        "proof_target": header.metadata.proof_target,
+        "coinbase_target": header.metadata.coinbase_target,
         "network_speed": network_speed,
         "validators": validators,
         "participation_rate": participation_rate,
     }
     return summary
 
+@public_cache_seconds(60)
+async def solution_stats_route(request: Request):
+    db: Database = request.app.state.db
+    period = request.query_params.get("period", "day")
+    if period not in ("epoch", "day"):
+        return CJSONResponse({"error": "Invalid period"}, status_code=400)
+    try:
+        end = request.query_params.get("end")
+        if end is None:
+            header = await db.get_latest_block_header()
+            if period == "epoch":
+                end = header.metadata.height // 360 + 1
+            else:
+                end = header.metadata.timestamp // 86400 + 1
+        else:
+            end = int(end)
+        start = int(request.query_params.get("start", end - 30))
+    except ValueError:
+        return CJSONResponse({"error": "Invalid start or end"}, status_code=400)
+    if start < 0 or not 0 < end - start <= 1000:
+        return CJSONResponse({"error": "Invalid start or end"}, status_code=400)
+    return CJSONResponse({
+        "total_solutions": await db.get_total_solution_count(),
+        "average_reward": await db.get_average_solution_reward(),
+        "period": period,
+        "stats": await db.get_solution_stats(period, start, end),
+    })
+
 @public_cache_seconds(5)
 async def recent_blocks_route(request: Request):
     db: Database = request.app.state.db
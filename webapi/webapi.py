@@ -17,10 +17,10 @@ from middleware.asgi_logger import AccessLoggerMiddleware
 from middleware.auth import AuthMiddleware
 from middleware.server_timing import ServerTimingMiddleware
 from util.set_proc_title import set_proc_title
-from .address_routes import address_route
+from .address_routes import address_route, address_speed_route, leaderboard_route
 from .chain_routes import blocks_route, get_summary, recent_blocks_route, index_update_route, block_route, search_route, \
     transaction_route, \
-    validators_route, transition_route
+    validators_route, transition_route, solution_stats_route
 from .error_routes import bad_request, not_found, internal_error
 from .utils import public_cache_seconds, out_of_sync_check, CJSONResponse
 
@@ -57,6 +57,7 @@ routes = [
     Route("/", index_route),
     Route("/sync", sync_info_route),
     Route("/summary", summary_route),
+    Route("/stats/solutions", solution_stats_route),
 
     Route("/block/recent", recent_blocks_route),
     Route("/block/index_update", index_update_route),
@@ -69,6 +70,8 @@ routes = [
     Route("/search", search_route),
 
     Route("/address/{address}", address_route),
+    Route("/address/{address}/speed", address_speed_route),
+    Route("/leaderboard/{name}", leaderboard_route),
 ]
 
 exc_handlers = {
@@ -88,6 +91,7 @@ async def startup():
                   redis_password=os.environ.get("REDIS_PASS"),
                   message_callback=noop)
     await db.connect()
+    await db.load_mapping_registry()
     # noinspection PyUnresolvedReferences
     app.state.db = db
     # noinspection PyUnresolvedReferences
@@ -17,7 +17,7 @@ from .utils import out_of_sync_check
 @htmx_template("calc.jinja2")
 async def calc_route(request: Request):
     db: Database = request.app.state.db
-    proof_target = (await db.get_latest_block()).header.metadata.proof_target
+    proof_target = (await db.get_latest_block_header()).metadata.proof_target
     total_solutions = await db.get_total_solution_count()
     avg_reward = await db.get_average_solution_reward()
     sync_info = await out_of_sync_check(request.app.state.session, db)
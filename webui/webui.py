@@ -46,7 +46,7 @@ async def index_route(request: Request):
     participation_rate = await db.get_network_participation_rate()
     sync_info = await out_of_sync_check(request.app.state.session, db)
     ctx = {
-        "latest_block": await db.get_latest_block(),
+        "latest_block_header": await db.get_latest_block_header(),
         "recent_blocks": recent_blocks,
         "network_speed": network_speed,
         "validators": validators,
@@ -178,6 +178,7 @@ async def startup():
                   redis_password=os.environ.get("REDIS_PASS"),
                   message_callback=noop)
     await db.connect()
+    await db.load_mapping_registry()
     # noinspection PyUnresolvedReferences
     app.state.db = db
     # noinspection PyUnresolvedReferences